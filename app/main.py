@@ -3,21 +3,29 @@ import pandas as pd
 import numpy as np
 import matplotlib
 matplotlib.use('Agg')  # Use the 'Agg' backend which doesn't require a display
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import yfinance as yf
 import io
-import base64
+import re
 import sys
 import os
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, timedelta, datetime
 
-# Add the parent directory to the Python path to import src modules
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Add the parent directory to the Python path to import src modules, unless
+# it is already there (installed .pth file or a previous Streamlit rerun)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
 
 try:
     from src.scoring.buffett import get_f_score
-    from src.technical.core import get_sma
-    from src.risk.position import position_size
+    from src.technical.core import get_sma, rolling_mean
+    from src.risk.position import position_sizes
+    from src.data.yf_util import get_ticker
+    from src.data.quote_summary import fetch_quotes
     from src.utils.universe import get_universe_tickers, get_sp500_tickers, get_nasdaq_tickers
 except ImportError as e:
     st.error(f"Error importing modules: {e}. Make sure the project is installed or PYTHONPATH is set correctly.")
@@ -34,32 +42,11 @@ st.set_page_config(
 # Custom CSS
 st.markdown("""
 <style>
-    .metric-card {
-        background-color: #2e3440;
-        border-radius: 5px;
-        padding: 12px;
-        margin: 5px 0px;
-        color: #ffffff;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-    }
     .main-header {
         font-size: 2.5rem;
         font-weight: bold;
         color: #0d3b66;
     }
-    .stock-card {
-        border: 1px solid #404756;
-        border-radius: 8px;
-        padding: 15px;
-        margin: 15px 0px;
-        background-color: #1f2937;
-    }
-    .chart-container {
-        border: 1px solid #404756;
-        border-radius: 8px;
-        padding: 10px;
-        background-color: #2e3440;
-    }
     .positive {
         color: #a3be8c;
     }
@@ -69,8 +56,88 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Number of concurrent Yahoo Finance requests when fetching per-ticker metadata
+INFO_FETCH_WORKERS = 8
+
+# Number of price charts rendered concurrently (one per top-stock column)
+CHART_WORKERS = 5
+
+# Seconds before cached market data (and the Ticker objects behind it) go stale
+CACHE_TTL = 3600
+
+# Shared HTTP session so concurrent Yahoo Finance requests reuse connections
+_yf_session = requests.Session()
+
+def _fetch_info(ticker):
+    """Fetch the metadata the dashboard displays for a single ticker from Yahoo Finance"""
+    info = get_ticker(ticker, session=_yf_session, max_age=CACHE_TTL).info
+    return {
+        'name': info.get('shortName', ticker),
+        'market_cap': info.get('marketCap', 0),
+        'pe_ratio': info.get('trailingPE', 0),
+        'dividend_yield': info.get('dividendYield', 0),
+        'beta': info.get('beta', 0),
+    }
+
+# Fields the dashboard reads from Yahoo's batch quote endpoint
+QUOTE_FIELDS = ('shortName', 'marketCap', 'trailingPE', 'trailingAnnualDividendYield', 'beta')
+
+def _quote_metrics(ticker, quote):
+    """Map a batch quote record onto the same fields as _fetch_info"""
+    return {
+        'name': quote.get('shortName', ticker),
+        'market_cap': quote.get('marketCap', 0),
+        'pe_ratio': quote.get('trailingPE', 0),
+        'dividend_yield': quote.get('trailingAnnualDividendYield', 0),
+        'beta': quote.get('beta', 0),
+    }
+
+# Index memberships change at most quarterly, so share them across sessions for a day
+UNIVERSE_TTL = 24 * 3600
+INDEX_UNIVERSES = ("SP500", "NASDAQ", "RUSSELL2000", "ALL")
+
+@st.cache_resource(ttl=UNIVERSE_TTL)
+def _fetch_universe_tickers(universe):
+    """Fetch index membership, raising LookupError so failed fetches aren't cached"""
+    if universe == "SP500":
+        tickers = get_sp500_tickers()
+    elif universe == "NASDAQ":
+        tickers = get_nasdaq_tickers()
+    else:
+        tickers = get_universe_tickers(universe)
+    if not tickers:
+        raise LookupError(f"No tickers found for {universe}")
+    return tuple(tickers)
+
+def _universe_tickers(universe):
+    """Get the shared, immutable ticker list for an index universe (empty on failure)"""
+    try:
+        return _fetch_universe_tickers(universe)
+    except LookupError:
+        return ()
+
+def _filter_mask(df, min_f_score=None, min_price=None, max_price=None):
+    """Combine the score and price filters into one boolean mask over df's rows"""
+    score = df['score'].to_numpy()
+    close = df['close'].to_numpy()
+    mask = np.ones(len(df), dtype=bool)
+    if min_f_score is not None:
+        mask &= score >= min_f_score
+    if min_price is not None:
+        mask &= close >= min_price
+    if max_price is not None:
+        mask &= close <= max_price
+    return mask
+
 # Cache functions for performance
-@st.cache_data(ttl=3600)
+@st.cache_data(ttl=CACHE_TTL, max_entries=8)
+def _universe_scores(universe):
+    """Get unfiltered F-scores for a universe, independent of the sidebar filters"""
+    return get_f_score(universe)
+
+# Per-ticker metadata is cached by get_ticker(), so re-running with different
+# filters only fetches symbols that have not been seen within CACHE_TTL
+@st.cache_data(ttl=CACHE_TTL, max_entries=32)
 def get_stocks_data(universe="SP500", max_price=None, min_price=None, min_f_score=None, demo=False):
     """Get stock data based on selected universe and filters"""
     if demo:
@@ -84,30 +151,17 @@ def get_stocks_data(universe="SP500", max_price=None, min_price=None, min_f_scor
             'pe_ratio': [28, 12, 60, 18, 22],
             'dividend_yield': [0.006, 0.02, 0, 0, 0],
             'beta': [1.2, 1.1, 1.3, 1.5, 1.8],
-            '52w_high': [180, 55, 220, 40, 95],
-            '52w_low': [110, 35, 190, 25, 70],
         }
         index = ['AAPL', 'F', 'AMZN', 'SOFI', 'SNAP']
         df = pd.DataFrame(data, index=index)
         # Apply filters
-        if min_f_score is not None:
-            df = df[df['score'] >= min_f_score]
-        if min_price is not None:
-            df = df[df['close'] >= min_price]
-        if max_price is not None:
-            df = df[df['close'] <= max_price]
+        df = df[_filter_mask(df, min_f_score, min_price, max_price)]
         return df.sort_values('score', ascending=False)
         
     try:
         # Get tickers based on selected universe
-        if universe == "SP500":
-            tickers = get_sp500_tickers()
-        elif universe == "NASDAQ":
-            tickers = get_nasdaq_tickers()
-        elif universe == "RUSSELL2000":
-            tickers = get_universe_tickers("RUSSELL2000")
-        elif universe == "ALL":
-            tickers = get_universe_tickers("ALL")
+        if universe in INDEX_UNIVERSES:
+            tickers = _universe_tickers(universe)
         else:
             tickers = universe.split(",")
         
@@ -115,117 +169,202 @@ def get_stocks_data(universe="SP500", max_price=None, min_price=None, min_f_scor
             st.warning(f"No tickers found for {universe}. Using mock data instead.")
             return get_stocks_data(universe, max_price, min_price, min_f_score, demo=True)
             
-        # Get F-scores
-        scores = get_f_score(universe)
+        # Get F-scores; cached per universe so filter changes don't recompute them
+        scores = _universe_scores(universe)
         
         if scores.empty:
             st.warning(f"No F-scores available for {universe}. Using mock data instead.")
             return get_stocks_data(universe, max_price, min_price, min_f_score, demo=True)
         
         # Apply filters
-        if min_f_score is not None:
-            scores = scores[scores['score'] >= min_f_score]
-        
-        if min_price is not None:
-            scores = scores[scores['close'] >= min_price]
-            
-        if max_price is not None:
-            scores = scores[scores['close'] <= max_price]
+        scores = scores[_filter_mask(scores, min_f_score, min_price, max_price)]
         
         if scores.empty:
             st.warning("No stocks match your criteria. Consider relaxing your filters.")
             # Return a subset of mock data that would match the criteria
             return get_stocks_data(universe, max_price, min_price, min_f_score, demo=True)
         
-        # Fetch additional metrics for each stock
-        metrics = pd.DataFrame(index=scores.index)
+        # Fetch additional metrics with batched quote requests first
+        rows, fetched, missing = [], [], []
+        quotes = fetch_quotes(scores.index, QUOTE_FIELDS, session=_yf_session)
         for ticker in scores.index:
-            try:
-                stock = yf.Ticker(ticker)
-                info = stock.info
-                metrics.loc[ticker, 'name'] = info.get('shortName', ticker)
-                metrics.loc[ticker, 'sector'] = info.get('sector', 'Unknown')
-                metrics.loc[ticker, 'industry'] = info.get('industry', 'Unknown')
-                metrics.loc[ticker, 'market_cap'] = info.get('marketCap', 0)
-                metrics.loc[ticker, 'pe_ratio'] = info.get('trailingPE', 0)
-                metrics.loc[ticker, 'price'] = info.get('currentPrice', scores.loc[ticker, 'close'])
-                metrics.loc[ticker, 'dividend_yield'] = info.get('dividendYield', 0)
-                metrics.loc[ticker, 'beta'] = info.get('beta', 0)
-                metrics.loc[ticker, '52w_high'] = info.get('fiftyTwoWeekHigh', 0)
-                metrics.loc[ticker, '52w_low'] = info.get('fiftyTwoWeekLow', 0)
-            except Exception as e:
-                st.error(f"Error fetching data for {ticker}: {e}")
-                continue
+            if ticker in quotes:
+                rows.append(_quote_metrics(ticker, quotes[ticker]))
+                fetched.append(ticker)
+            else:
+                missing.append(ticker)
+        
+        # Fall back to concurrent per-ticker lookups for anything the batch
+        # endpoint did not return; the requests are I/O-bound so overlapping
+        # them hides most of the network latency
+        with ThreadPoolExecutor(max_workers=INFO_FETCH_WORKERS) as executor:
+            futures = {
+                ticker: executor.submit(_fetch_info, ticker)
+                for ticker in missing
+            }
+            # Report errors from the script thread, where Streamlit calls are valid
+            for ticker, future in futures.items():
+                try:
+                    rows.append(future.result())
+                    fetched.append(ticker)
+                except Exception as e:
+                    st.error(f"Error fetching data for {ticker}: {e}")
+        # Build the frame once from plain records rather than cell-by-cell
+        metrics = pd.DataFrame(rows, index=fetched).reindex(scores.index)
         
-        # Merge scores with metrics
-        result = pd.concat([scores, metrics], axis=1)
+        # Merge scores with metrics; both share the same index, so a join avoids realignment
+        result = scores.join(metrics)
         return result.sort_values('score', ascending=False)
     except Exception as e:
         st.error(f"Error retrieving stock data: {e}")
         return get_stocks_data(universe, max_price, min_price, min_f_score, demo=True)
 
-@st.cache_data(ttl=3600)
-def get_stock_chart(ticker, period="6mo", demo=False):
-    """Get stock chart data and generate image"""
+@st.cache_data(ttl=CACHE_TTL, max_entries=32)
+def get_histories(tickers, period="6mo"):
+    """Download price history for several tickers in a single batched request"""
+    return yf.download(list(tickers), period=period, group_by='ticker', threads=True, progress=False)
+
+def _ticker_history(histories, ticker):
+    """Slice one ticker's OHLCV frame out of a batched download"""
+    if isinstance(histories.columns, pd.MultiIndex):
+        if ticker not in histories.columns.get_level_values(0):
+            return pd.DataFrame()
+        return histories[ticker].dropna(how='all')
+    return histories
+
+# Per-thread chart figure; Streamlit serves sessions on separate threads and
+# Matplotlib figures are not safe to share between them
+_chart_local = threading.local()
+
+def _chart_axes():
+    """Return this thread's reusable chart figure and axes, cleared for drawing"""
+    if getattr(_chart_local, 'fig', None) is None:
+        _chart_local.fig = Figure(figsize=(8, 4))
+        _chart_local.ax = _chart_local.fig.subplots()
+    _chart_local.ax.clear()
+    return _chart_local.fig, _chart_local.ax
+
+def _figure_to_png(fig):
+    """Render a figure to PNG bytes"""
+    buffer = io.BytesIO()
+    fig.tight_layout()
+    fig.savefig(buffer, format='png')
+    return buffer.getvalue()
+
+def _render_chart(ticker, period="6mo", demo=False, hist=None):
+    """Render a stock's price chart as PNG bytes, fetching its history if not given
+    
+    Makes no Streamlit calls, so it is safe to run on worker threads.
+    """
     if demo:
         # Return a simple mock chart (blank or with random data)
-        fig, ax = plt.subplots(figsize=(8, 4))
+        fig, ax = _chart_axes()
         x = np.arange(30)
         y = np.random.normal(100, 5, size=30)
         ax.plot(x, y)
         ax.set_title(f"{ticker} - Demo Chart")
         ax.set_ylabel("Price ($)")
         ax.grid(True, alpha=0.3)
-        buffer = io.BytesIO()
-        plt.tight_layout()
-        fig.savefig(buffer, format='png')
-        buffer.seek(0)
-        plt.close(fig)
-        return base64.b64encode(buffer.read()).decode()
-    stock = yf.Ticker(ticker)
-    hist = stock.history(period=period)
+        return _figure_to_png(fig)
+    if hist is None:
+        hist = get_ticker(ticker, session=_yf_session, max_age=CACHE_TTL).history(period=period)
     if hist.empty:
         return None
     
-    fig, ax = plt.subplots(figsize=(8, 4))
+    fig, ax = _chart_axes()
     ax.plot(hist.index, hist['Close'])
     ax.set_title(f"{ticker} - {period} Price History")
     ax.set_ylabel("Price ($)")
     ax.grid(True, alpha=0.3)
     
     # Add SMA lines
-    hist['SMA50'] = hist['Close'].rolling(window=50).mean()
-    hist['SMA200'] = hist['Close'].rolling(window=200).mean()
-    ax.plot(hist.index, hist['SMA50'], 'r--', alpha=0.7, label='50-day SMA')
-    ax.plot(hist.index, hist['SMA200'], 'b--', alpha=0.7, label='200-day SMA')
+    close = hist['Close'].to_numpy(dtype=float)
+    sma50 = rolling_mean(close, 50)
+    sma200 = rolling_mean(close, 200)
+    ax.plot(hist.index, sma50, 'r--', alpha=0.7, label='50-day SMA')
+    ax.plot(hist.index, sma200, 'b--', alpha=0.7, label='200-day SMA')
     ax.legend()
     
-    # Save to buffer and return as base64
-    buffer = io.BytesIO()
-    plt.tight_layout()
-    fig.savefig(buffer, format='png')
-    buffer.seek(0)
-    plt.close(fig)
+    return _figure_to_png(fig)
+
+def _render_charts(tickers, period="6mo", demo=False, histories=None):
+    """Render several stocks' charts concurrently, as a dict of ticker to PNG bytes
     
-    return base64.b64encode(buffer.read()).decode()
+    The worker threads only draw with ``_render_chart``; ``histories`` is a
+    batched ``get_histories`` download.
+    """
+    def render(ticker):
+        hist = None if histories is None else _ticker_history(histories, ticker)
+        return _render_chart(ticker, period, demo, hist)
+
+    with ThreadPoolExecutor(max_workers=CHART_WORKERS) as executor:
+        return dict(zip(tickers, executor.map(render, tickers)))
+
+# Charts are persisted to disk so a restarted app replays them without any
+# requests. Streamlit ignores ttl for persisted caches, so callers pass
+# date_bucket to roll the key daily.
+@st.cache_data(persist="disk", max_entries=256)
+def get_stock_charts(tickers, period="6mo", date_bucket=None):
+    """Get several stocks' price charts as a dict of ticker to PNG bytes
+    
+    Their history is downloaded in one batched request, only on a cache
+    miss. Must be called from the script thread, where the cache is read
+    and written. ``date_bucket`` is only part of the cache key, e.g.
+    ``date.today().isoformat()``.
+    """
+    return _render_charts(tickers, period, histories=get_histories(tickers, period=period))
 
 def calculate_position_sizes(stocks_df, buying_power, risk_pct):
     """Calculate suggested position size for each stock"""
-    positions = {}
-    for ticker in stocks_df.index:
-        price = stocks_df.loc[ticker, 'close']
-        atr = stocks_df.loc[ticker, 'atr']
-        size = position_size(price=price, atr=atr, account_size=buying_power, risk_pct=risk_pct)
-        positions[ticker] = {
-            'shares': int(size / price) if price > 0 else 0,
-            'dollars': round(size, 2),
-            'percentage': round((size / buying_power) * 100, 2) if buying_power > 0 else 0
-        }
-    return positions
+    price = stocks_df['close'].to_numpy(dtype=float)
+    size = position_sizes(price, stocks_df['atr'].to_numpy(dtype=float),
+                          account_size=buying_power, risk_pct=risk_pct)
+    shares = np.divide(size, price, out=np.zeros_like(size), where=price > 0).astype(int)
+    dollars = np.round(size, 2)
+    percentage = np.round(size / buying_power * 100, 2) if buying_power > 0 else np.zeros_like(size)
+    return {
+        ticker: {'shares': s, 'dollars': d, 'percentage': p}
+        for ticker, s, d, p in zip(stocks_df.index, shares.tolist(), dollars.tolist(), percentage.tolist())
+    }
+
+# Columns shown in the top-stocks table, with their display labels
+TOP_TABLE_COLUMNS = {
+    'name': 'Name',
+    'score': 'F-Score',
+    'close': 'Price',
+    'market_cap': 'Market Cap',
+    'pe_ratio': 'P/E Ratio',
+    'dividend_yield': 'Dividend Yield',
+    'beta': 'Beta',
+    'atr': 'ATR',
+    'shares': 'Shares',
+    'dollars': 'Position ($)',
+    'percentage': 'Portfolio %',
+}
+
+def top_stocks_table(stocks_df, positions):
+    """Build a formatted table of stocks and their suggested positions"""
+    table = stocks_df.join(pd.DataFrame.from_dict(positions, orient='index'))
+    table = table.reindex(columns=list(TOP_TABLE_COLUMNS)).rename(columns=TOP_TABLE_COLUMNS)
+    table['Market Cap'] = format_large_number_vec(table['Market Cap'])
+    return table.style.format({
+        'F-Score': '{:.0f}/9',
+        'Price': '${:.2f}',
+        'P/E Ratio': '{:.1f}',
+        'Dividend Yield': '{:.2%}',
+        'Beta': '{:.2f}',
+        'ATR': '${:.2f}',
+        'Shares': '{:.0f}',
+        'Position ($)': '${:,.2f}',
+        'Portfolio %': '{:.1f}%',
+    }, na_rep="N/A")
+
+# Separators accepted between custom tickers: commas and/or whitespace
+_TICKER_SEPARATORS = re.compile(r'[,\s]+')
 
 def parse_custom_tickers(text):
     """Parse custom ticker input"""
-    return [t.strip().upper() for t in text.replace(',', ' ').split() if t.strip()]
+    return [t.upper() for t in _TICKER_SEPARATORS.split(text) if t]
 
 def format_large_number(num):
     """Format large numbers with K, M, B suffixes"""
@@ -241,6 +380,48 @@ def format_large_number(num):
     else:
         return f"${num:.2f}"
 
+def format_large_number_vec(values):
+    """Format a whole column of large numbers with K, M, B suffixes"""
+    nums = np.asarray(values, dtype=float)
+    magnitude = np.abs(nums)
+    bins = [magnitude >= 1_000_000_000, magnitude >= 1_000_000, magnitude >= 1_000]
+    scaled = np.select(bins, [nums / 1_000_000_000, nums / 1_000_000, nums / 1_000], default=nums)
+    suffixes = np.select(bins, ['B', 'M', 'K'], default='')
+    return [f"${num:.2f}{suffix}" if not np.isnan(num) else "N/A" for num, suffix in zip(scaled, suffixes)]
+
+def render_results(stocks_df, buying_power, risk_pct, demo_mode):
+    """Render scanner results: top-stock table, price charts and full table"""
+    if stocks_df.empty:
+        st.warning("No stocks found matching your criteria. Try adjusting your filters.")
+        return
+    
+    # Calculate position sizes
+    positions = calculate_position_sizes(stocks_df, buying_power, risk_pct)
+    
+    # Display results
+    st.subheader("Top Stocks by F-Score")
+    
+    # Display the top 5 stocks as a single table
+    top_stocks = stocks_df.head(5)
+    st.dataframe(top_stocks_table(top_stocks, positions), use_container_width=True, hide_index=False)
+    
+    # Price charts side by side, rendered concurrently and placed in the main
+    # thread; demo charts are random, so they are drawn fresh and not cached
+    top_tickers = tuple(top_stocks.index)
+    if demo_mode:
+        charts = _render_charts(top_tickers, demo=True)
+    else:
+        charts = get_stock_charts(top_tickers, period="6mo", date_bucket=date.today().isoformat())
+    for col, ticker in zip(st.columns(len(top_tickers)), top_tickers):
+        with col:
+            chart_data = charts[ticker]
+            if chart_data:
+                st.image(chart_data, use_column_width=True)
+    
+    # Show full results table
+    with st.expander("View Full Results Table", expanded=False):
+        st.dataframe(stocks_df)
+
 # Main App
 def main():
     # Header
@@ -291,84 +472,22 @@ def main():
         min_dividend = st.slider("Minimum Dividend Yield (%)", min_value=0.0, max_value=10.0, value=0.0, step=0.5)
         max_pe = st.slider("Maximum P/E Ratio", min_value=1, max_value=100, value=50, step=1)
         
-    # Run the screener
+    # Run the screener; results are kept in session state so later reruns
+    # (e.g. sidebar tweaks) redraw them without repeating the scan
     if st.button("Run Scanner", key="run_scanner_button"):
         with st.spinner("Loading data and analyzing stocks..."):
             # Get stock data based on specified criteria
-            stocks_df = get_stocks_data(
+            st.session_state['stocks_df'] = get_stocks_data(
                 universe=selected_universe if selected_universe != "CUSTOM" else ",".join(custom_universe) if "custom_universe" in locals() else "MOCK_AFFORDABLE",
                 max_price=max_price,
                 min_price=min_price,
                 min_f_score=min_f_score,
                 demo=demo_mode
             )
-            
-            # If we got results, display them
-            if not stocks_df.empty:
-                # Calculate position sizes
-                positions = calculate_position_sizes(stocks_df, buying_power, risk_pct)
-                
-                # Display results
-                st.subheader("Top Stocks by F-Score")
-                
-                # Display the top 5 stocks
-                for ticker in stocks_df.head(5).index:
-                    # Get position information
-                    position_info = positions.get(ticker, {})
-                    shares = position_info.get('shares', 0)
-                    dollars = position_info.get('dollars', 0)
-                    percentage = position_info.get('percentage', 0)
-                    
-                    # Create a card for each stock
-                    with st.container():
-                        st.markdown(f"<div class='stock-card'>", unsafe_allow_html=True)
-                        
-                        # Stock header
-                        col1, col2, col3 = st.columns([2, 1, 1])
-                        with col1:
-                            stock_name = stocks_df.loc[ticker, 'name'] if 'name' in stocks_df.columns and not pd.isna(stocks_df.loc[ticker, 'name']) else ticker
-                            st.markdown(f"### {ticker} - {stock_name}")
-                            st.markdown(f"**F-Score:** {int(stocks_df.loc[ticker, 'score'])}/9")
-                        
-                        with col2:
-                            st.metric("Current Price", f"${stocks_df.loc[ticker, 'close']:.2f}")
-                        
-                        with col3:
-                            st.metric("Suggested Position", f"{shares} shares (${dollars:,.2f})")
-                        
-                        # Stock charts and metrics
-                        col1, col2 = st.columns([1, 1])
-                        
-                        with col1:
-                            # Display the stock chart
-                            chart_data = get_stock_chart(ticker, period="6mo", demo=demo_mode)
-                            if chart_data:
-                                st.markdown(f"<div class='chart-container'><img src='data:image/png;base64,{chart_data}' style='width:100%'></div>", unsafe_allow_html=True)
-                        
-                        with col2:
-                            # Metrics
-                            metrics_data = [
-                                ("Market Cap", format_large_number(stocks_df.loc[ticker, 'market_cap']) if 'market_cap' in stocks_df.columns else "N/A"),
-                                ("P/E Ratio", f"{stocks_df.loc[ticker, 'pe_ratio']:.1f}" if 'pe_ratio' in stocks_df.columns and not pd.isna(stocks_df.loc[ticker, 'pe_ratio']) else "N/A"),
-                                ("Dividend Yield", f"{stocks_df.loc[ticker, 'dividend_yield']*100:.2f}%" if 'dividend_yield' in stocks_df.columns and not pd.isna(stocks_df.loc[ticker, 'dividend_yield']) else "0.00%"),
-                                ("Beta", f"{stocks_df.loc[ticker, 'beta']:.2f}" if 'beta' in stocks_df.columns and not pd.isna(stocks_df.loc[ticker, 'beta']) else "N/A"),
-                                ("Portfolio %", f"{percentage:.1f}%"),
-                                ("ATR", f"${stocks_df.loc[ticker, 'atr']:.2f}")
-                            ]
-                            
-                            # Create a grid of metrics
-                            metric_cols = st.columns(2)
-                            for i, (label, value) in enumerate(metrics_data):
-                                with metric_cols[i % 2]:
-                                    st.markdown(f"<div class='metric-card'><span style='font-weight:bold'>{label}</span><br>{value}</div>", unsafe_allow_html=True)
-                        
-                        st.markdown("</div>", unsafe_allow_html=True)
-                
-                # Show full results table
-                with st.expander("View Full Results Table", expanded=False):
-                    st.dataframe(stocks_df)
-            else:
-                st.warning("No stocks found matching your criteria. Try adjusting your filters.")
+            st.session_state['scan_demo_mode'] = demo_mode
+    
+    if 'stocks_df' in st.session_state:
+        render_results(st.session_state['stocks_df'], buying_power, risk_pct, st.session_state['scan_demo_mode'])
     else:
         # Show placeholder messaging
         if st.session_state.get('has_run_scanner', False) == False:
@@ -8,10 +8,11 @@ import sys
 import pandas as pd
 from datetime import datetime
 
-# Add the project root to the Python path
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# Add the project root to the Python path, unless it is already there
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
 
-from src.risk.position import position_size
 
 def format_large_number(num):
     """Format large numbers with K, M, B suffixes"""
@@ -23,7 +24,7 @@ def format_large_number(num):
     elif abs(num) >= 1_000_000:
         return f"${num / 1_000_000:.2f}M"
     elif abs(num) >= 1_000:
-        return f"${num / 1_000_000:.2f}K"
+        return f"${num / 1_000:.2f}K"
     else:
         return f"${num:.2f}"
 
@@ -84,33 +85,23 @@ def get_buffett_recommendations(buying_power=270000, risk_pct=0.01, min_f_score=
         if max_price is not None:
             stocks_df = stocks_df[stocks_df['close'] <= max_price]
         
-        # Calculate position sizes
-        positions = {}
-        for ticker in stocks_df.index:
-            price = stocks_df.loc[ticker, 'close']
-            atr = stocks_df.loc[ticker, 'atr']
-            size = position_size(price=price, atr=atr, account_size=buying_power, risk_pct=risk_pct)
-            positions[ticker] = {
-                'shares': int(size / price) if price > 0 else 0,
-                'dollars': round(size, 2),
-                'percentage': round((size / buying_power) * 100, 2) if buying_power > 0 else 0
-            }
-        
         # Sort by F-score descending
         top_stocks = stocks_df.sort_values('score', ascending=False)
         
-        # Adjust allocations to ensure we don't exceed buying power
-        # We'll allocate equal amounts to top 5 stocks (each getting 20% of portfolio)
+        # Size positions to ensure we don't exceed buying power: we'll allocate
+        # equal amounts to top 5 stocks (each getting 20% of portfolio); every
+        # position is set here, so no ATR-based sizing is needed first
         max_allocation = 0.20  # 20% per position maximum
-        top_5_tickers = top_stocks.head(5).index
+        top_5_tickers = set(top_stocks.head(5).index)
+        position_dollars = buying_power * max_allocation
         
-        for ticker in positions:
+        positions = {}
+        for ticker, price in stocks_df['close'].items():
             if ticker in top_5_tickers:
-                position_dollars = buying_power * max_allocation
-                position_shares = int(position_dollars / stocks_df.loc[ticker, 'close'])
+                position_shares = int(position_dollars / price)
                 positions[ticker] = {
                     'shares': position_shares,
-                    'dollars': round(position_shares * stocks_df.loc[ticker, 'close'], 2),
+                    'dollars': round(position_shares * price, 2),
                     'percentage': round((max_allocation * 100), 2)
                 }
             else:
@@ -135,7 +126,7 @@ def generate_buffett_memo(stocks_df, positions, buying_power):
     """Generate a Buffett-style investment memo"""
     now = datetime.now().strftime("%B %d, %Y")
     
-    memo = f"""
+    parts = [f"""
 # BUFFETT INVESTMENT MEMO
 ## Date: {now}
 ## Account Value: ${buying_power:,}
@@ -148,32 +139,33 @@ strict criteria for quality, value, and financial strength.
 
 ## TOP RECOMMENDATIONS:
 
-"""
+"""]
     
     # Add top stock recommendations
-    for i, (ticker, row) in enumerate(stocks_df.iterrows(), 1):
+    for i, row in enumerate(stocks_df.itertuples(), 1):
+        ticker = row.Index
         position_info = positions.get(ticker, {})
         shares = position_info.get('shares', 0)
         dollars = position_info.get('dollars', 0)
         percentage = position_info.get('percentage', 0)
         
-        memo += f"""
-### {i}. {ticker} - {row['name']} - F-Score: {int(row['score'])}/9
-- Current Price: ${row['close']:.2f}
-- Market Cap: {format_large_number(row['market_cap'])}
-- P/E Ratio: {row['pe_ratio']:.1f}
-- Dividend Yield: {row['dividend_yield']*100:.2f}%
-- Beta: {row['beta']:.2f}
-- Volatility (ATR): ${row['atr']:.2f}
+        parts.append(f"""
+### {i}. {ticker} - {row.name} - F-Score: {int(row.score)}/9
+- Current Price: ${row.close:.2f}
+- Market Cap: {format_large_number(row.market_cap)}
+- P/E Ratio: {row.pe_ratio:.1f}
+- Dividend Yield: {row.dividend_yield*100:.2f}%
+- Beta: {row.beta:.2f}
+- Volatility (ATR): ${row.atr:.2f}
 - Suggested Position: {shares} shares (${dollars:,.2f})
 - Portfolio Allocation: {percentage}% of capital
-"""
+""")
     
     # Add conclusion
     total_invested = sum(positions.get(ticker, {}).get('dollars', 0) for ticker in stocks_df.index)
     remaining_capital = buying_power - total_invested
     
-    memo += f"""
+    parts.append(f"""
 ## ALLOCATION SUMMARY
 - Total Capital: ${buying_power:,.2f}
 - Allocated to Top Picks: ${total_invested:,.2f} ({total_invested/buying_power*100:.1f}%)
@@ -190,8 +182,8 @@ with strong fundamentals trading at reasonable valuations.
 
 Sincerely,
 Buffett Screener Algorithm
-"""
-    return memo
+""")
+    return ''.join(parts)
 
 if __name__ == "__main__":
     # Parameters
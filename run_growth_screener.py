@@ -7,10 +7,13 @@ import os
 import sys
 import pandas as pd
 import argparse
-from datetime import datetime, timedelta
+from datetime import datetime
 import numpy as np
-import yfinance as yf
 import traceback
+import multiprocessing as mp
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
 
 # Add the project root to the Python path
 project_root = os.path.dirname(os.path.abspath(__file__))
@@ -19,135 +22,262 @@ sys.path.insert(0, project_root)
 # Import required modules
 from src.utils.universe import get_universe_tickers
 from src.risk.position import position_size
+from src.utils.yf_cache import cached_info, cached_infos, cached_histories
+from src.scoring.growth_numba import score_growth_batch
+from src.data.quote_summary import fetch_market_caps, fetch_last_prices
+from src.utils.yf_session import SESSION, make_session
 
-def get_growth_metrics(ticker):
+# Number of tickers fetched concurrently; the work is network-bound
+FETCH_WORKERS = 24
+
+# Number of batches processed in parallel worker processes. Each one runs
+# FETCH_WORKERS fetch threads, so this is capped to stay within Yahoo
+# Finance's rate limits rather than scaled to every core
+BATCH_PROCESSES = min(4, os.cpu_count() or 1)
+
+# Largest market cap screened by the SMALLCAP universe
+SMALLCAP_MAX_MARKET_CAP = 2e9
+
+def fetch_info(ticker):
+    """Fetch the Yahoo Finance info dict for a stock, or None on failure"""
+    try:
+        return cached_info(ticker, session=SESSION)
+    except Exception as e:
+        print(f"Error fetching data for {ticker}: {e}")
+        return None
+
+def fetch_infos(tickers):
+    """Fetch info dicts for several stocks
+    
+    Uses one quoteSummary request per stock, falling back to the full
+    ``yf.Ticker.info`` lookup (made concurrently) for any it could not get.
+    Stocks with no info at all are left out.
+    """
+    try:
+        infos = cached_infos(tickers, session=SESSION)
+    except Exception as e:
+        print(f"Error fetching quote summaries: {e}")
+        infos = {}
+    missing = [ticker for ticker in tickers if ticker not in infos]
+    if missing:
+        with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+            infos.update(
+                (ticker, info)
+                for ticker, info in zip(missing, executor.map(fetch_info, missing))
+                if info is not None
+            )
+    return infos
+
+def fetch_histories(tickers, period="6mo"):
+    """Get price history for several stocks, downloading any not cached in a single batched request"""
+    return cached_histories(tickers, period=period)
+
+def prefilter_by_price(tickers, min_price, max_price):
+    """Keep the tickers whose latest price is within the price range
+    
+    Uses batched quote requests for the price alone, so out-of-range stocks
+    are dropped before their history and info are fetched. Tickers without
+    a quoted price are kept for the price filter on their history. Returns
+    the tickers unchanged if no prices could be fetched.
+    """
+    try:
+        prices = fetch_last_prices(tickers, session=SESSION)
+    except Exception as e:
+        print(f"Could not prefilter by price: {e}")
+        return list(tickers)
+    if not prices:
+        return list(tickers)
+    return [ticker for ticker in tickers if ticker not in prices or min_price <= prices[ticker] <= max_price]
+
+def prefilter_smallcap(tickers, max_mcap=SMALLCAP_MAX_MARKET_CAP):
+    """Drop the tickers with a known market cap of ``max_mcap`` or more
+    
+    Uses batched quote requests for the market cap alone, so large caps are
+    dropped before any history or info is fetched. A ticker whose market
+    cap is unknown, e.g. from a failed batch, is kept rather than guessed
+    to be large.
+    """
+    try:
+        market_caps = fetch_market_caps(tickers, session=SESSION)
+    except Exception as e:
+        print(f"Could not prefilter by market cap: {e}")
+        return list(tickers)
+    return [ticker for ticker in tickers if market_caps.get(ticker, 0) < max_mcap]
+
+def _in_price_range(histories, min_price, max_price):
+    """Tickers whose last close in ``histories`` lies within the price range"""
+    last_close = pd.Series(
+        {ticker: hist['Close'].iloc[-1] for ticker, hist in histories.items() if not hist.empty},
+        dtype=float
+    )
+    return last_close.index[last_close.between(min_price, max_price)].tolist()
+
+def momentum_cutoffs(now=None):
+    """3-month and 1-month momentum start dates, computed once per run"""
+    now = np.datetime64(now or datetime.now())
+    return now - np.timedelta64(90, 'D'), now - np.timedelta64(30, 'D')
+
+def get_growth_metrics(ticker, cutoffs=None):
     """Get growth metrics for a stock using a simplified approach"""
+    info = fetch_infos([ticker]).get(ticker)
+    if info is None:
+        return None
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
-        
-        # Get basic info
-        name = info.get('shortName', ticker)
-        current_price = info.get('currentPrice', info.get('regularMarketPrice', 0))
-        market_cap = info.get('marketCap', 0)
-        sector = info.get('sector', 'Unknown')
-        industry = info.get('industry', 'Unknown')
-        
-        # If price is zero, try to get from history
-        if current_price == 0:
-            hist = stock.history(period="1d")
-            if not hist.empty:
-                current_price = hist['Close'].iloc[-1]
-        
-        # Get price history for momentum calculations
-        hist = stock.history(period="6mo")
-        
-        if hist.empty:
-            print(f"No price history available for {ticker}")
-            return None
-            
-        # Calculate momentum over different timeframes
-        end_price = hist['Close'].iloc[-1] if not hist.empty else 0
-        
-        # 3-month momentum
-        three_months_ago = (datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d')
-        three_month_data = hist[hist.index <= three_months_ago]
-        start_price_3m = three_month_data['Close'].iloc[0] if not three_month_data.empty else end_price
-        momentum_3m = ((end_price / start_price_3m) - 1) * 100 if start_price_3m > 0 else 0
-        
-        # 1-month momentum
-        one_month_ago = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
-        one_month_data = hist[hist.index <= one_month_ago]
-        start_price_1m = one_month_data['Close'].iloc[0] if not one_month_data.empty else end_price
-        momentum_1m = ((end_price / start_price_1m) - 1) * 100 if start_price_1m > 0 else 0
-        
-        # Try to get financial metrics if available
-        revenue_growth = info.get('revenueGrowth', None)
-        earnings_growth = info.get('earningsGrowth', None)
-        
-        if revenue_growth is not None:
-            revenue_growth = revenue_growth * 100  # Convert to percentage
-            
-        if earnings_growth is not None:
-            earnings_growth = earnings_growth * 100  # Convert to percentage
-        
-        # Calculate volume ratio
-        avg_volume = hist['Volume'].mean() if not hist.empty else 0
-        recent_volume = hist['Volume'].tail(5).mean() if not hist.empty and len(hist) >= 5 else 0
-        volume_ratio = recent_volume / avg_volume if avg_volume > 0 else 1
-        
-        # Calculate volatility (standard deviation of daily returns)
-        if not hist.empty and len(hist) > 5:
-            daily_returns = hist['Close'].pct_change().dropna()
-            volatility = daily_returns.std() * 100  # Convert to percentage
-            
-            # Also calculate ATR for position sizing
-            high = hist['High']
-            low = hist['Low']
-            close_prev = hist['Close'].shift(1)
-            
-            tr1 = high - low
-            tr2 = (high - close_prev).abs()
-            tr3 = (low - close_prev).abs()
-            
-            tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-            atr = tr.rolling(window=14).mean().iloc[-1]
-        else:
-            volatility = 5  # Default 5% if not enough data
-            atr = current_price * 0.05  # Default to 5% of price
-            
-        # Calculate growth score (0-100)
-        growth_score = 0
-        
-        # Momentum component (up to 50 points)
-        if momentum_3m > 0:
-            growth_score += min(momentum_3m, 30)  # Up to 30 points for 3-month momentum
-        if momentum_1m > 0:
-            growth_score += min(momentum_1m, 20)  # Up to 20 points for 1-month momentum
-            
-        # Volume component (up to 15 points)
-        if volume_ratio > 1:
-            growth_score += min((volume_ratio - 1) * 15, 15)  # Up to 15 points for increasing volume
-            
-        # Price component (up to 10 points)
-        if 5 <= current_price <= 20:
-            growth_score += 10  # Ideal price range gets full points
-        elif current_price < 5:
-            growth_score += current_price * 2  # 2 points per dollar under $5
-            
-        # Volatility component (up to 20 points)
-        optimal_volatility = 25  # Optimal volatility for growth stocks (25%)
-        volatility_score = 20 - abs(volatility - optimal_volatility) * 0.8
-        growth_score += max(0, volatility_score)
-        
-        # Fundamental component (up to 25 points)
-        if revenue_growth is not None and revenue_growth > 0:
-            growth_score += min(revenue_growth * 0.5, 15)  # Up to 15 points for revenue growth
-            
-        if earnings_growth is not None and earnings_growth > 0:
-            growth_score += min(earnings_growth * 0.5, 10)  # Up to 10 points for earnings growth
-        
-        # Return metrics
-        return {
-            'ticker': ticker,
-            'name': name,
-            'price': current_price,
-            'market_cap': market_cap,
-            'sector': sector,
-            'industry': industry,
-            'momentum_3m': momentum_3m,
-            'momentum_1m': momentum_1m,
-            'volume_ratio': volume_ratio,
-            'volatility': volatility,
-            'growth_score': growth_score,
-            'revenue_growth': revenue_growth,
-            'earnings_growth': earnings_growth,
-            'atr': atr
-        }
+        hist = fetch_histories([ticker])[ticker]
+    except Exception as e:
+        print(f"Error fetching data for {ticker}: {e}")
+        return None
+    return compute_metrics(ticker, info, hist, cutoffs)
+
+# Columns of the metrics frame, in the order they are reported
+METRIC_COLUMNS = ['ticker', 'name', 'price', 'market_cap', 'sector', 'industry', 'momentum_3m',
+                  'momentum_1m', 'volume_ratio', 'volatility', 'growth_score', 'revenue_growth',
+                  'earnings_growth', 'atr']
+
+def _aligned(histories, column):
+    """Stack one column of several histories into a wide frame aligned on each stock's latest row
+    
+    Row -1 holds every stock's most recent value, row -2 the one before it,
+    and so on; shorter histories are padded with NaN at the top.
+    """
+    return pd.DataFrame({
+        ticker: pd.Series(hist[column].to_numpy(), index=np.arange(-len(hist), 0))
+        for ticker, hist in histories.items()
+    })
+
+def _momentum(histories, closes, end_price, cutoff):
+    """Percent change from each stock's last close on or before ``cutoff`` to ``end_price``"""
+    # Number of rows up to the cutoff, by binary search on each sorted date index
+    lengths = np.array([len(hist) for hist in histories.values()])
+    upto = np.array([hist.index.values.searchsorted(cutoff, side='right') for hist in histories.values()])
+    # closes is aligned on the latest row, so that close sits (lengths - upto) rows above the bottom
+    rows = len(closes) - 1 - (lengths - upto)
+    values = closes.to_numpy()[np.maximum(rows, 0), np.arange(len(lengths))]
+    start_price = pd.Series(np.where(upto > 0, values, np.nan), index=closes.columns).fillna(end_price)
+    momentum = ((end_price / start_price) - 1) * 100
+    return momentum.where(start_price > 0, 0.0)
+
+def compute_batch_metrics(infos, histories, cutoffs=None):
+    """Compute growth metrics for a batch of stocks at once
+    
+    ``infos`` and ``histories`` map tickers to their info dicts and 6-month
+    price histories, and ``cutoffs`` holds the momentum start dates from
+    :func:`momentum_cutoffs` (computed now if omitted). Returns a DataFrame
+    indexed by ticker with one row per stock that has both.
+    """
+    histories = {ticker: hist for ticker, hist in histories.items() if ticker in infos and not hist.empty}
+    for ticker in infos.keys() - histories.keys():
+        print(f"No price history available for {ticker}")
+    if not histories:
+        return pd.DataFrame(columns=METRIC_COLUMNS)
+    
+    tickers = list(histories)
+    info = pd.DataFrame.from_dict({ticker: infos[ticker] for ticker in tickers}, orient='index')
+    info = info.reindex(columns=['shortName', 'currentPrice', 'regularMarketPrice', 'marketCap',
+                                 'sector', 'industry', 'revenueGrowth', 'earningsGrowth'])
+    lengths = pd.Series({ticker: len(hist) for ticker, hist in histories.items()})
+    
+    # Wide frames, one column per stock, aligned on the latest row
+    closes = _aligned(histories, 'Close').astype(float)
+    highs = _aligned(histories, 'High').astype(float)
+    lows = _aligned(histories, 'Low').astype(float)
+    volumes = _aligned(histories, 'Volume').astype(float)
+    
+    # Get basic info; a missing or zero price falls back to the last close
+    end_price = closes.iloc[-1]
+    current_price = info['currentPrice'].fillna(info['regularMarketPrice']).fillna(0).astype(float)
+    current_price = current_price.where(current_price != 0, end_price)
+    
+    # Calculate momentum over different timeframes
+    cut_3m, cut_1m = cutoffs or momentum_cutoffs()
+    momentum_3m = _momentum(histories, closes, end_price, cut_3m)
+    momentum_1m = _momentum(histories, closes, end_price, cut_1m)
+    
+    # Financial metrics where available, as percentages
+    revenue_growth = pd.to_numeric(info['revenueGrowth'], errors='coerce') * 100
+    earnings_growth = pd.to_numeric(info['earningsGrowth'], errors='coerce') * 100
+    
+    # Calculate volume ratio
+    avg_volume = volumes.mean()
+    recent_volume = volumes.iloc[-5:].mean().where(lengths >= 5, 0.0)
+    volume_ratio = (recent_volume / avg_volume).where(avg_volume > 0, 1.0)
+    
+    # Calculate volatility (standard deviation of daily returns) and ATR
+    # (14-day mean true range) for position sizing; short histories get defaults
+    volatility = closes.pct_change(fill_method=None).std() * 100  # Convert to percentage
+    close_prev = closes.shift(1)
+    tr = np.fmax(np.fmax(highs - lows, (highs - close_prev).abs()), (lows - close_prev).abs())
+    atr = tr.iloc[-14:].mean(skipna=False).where(lengths >= 14)
+    enough = lengths > 5
+    volatility = volatility.where(enough, 5.0)  # Default 5% if not enough data
+    atr = atr.where(enough, current_price * 0.05)  # Default to 5% of price
+    
+    metrics = pd.DataFrame({
+        'ticker': tickers,
+        'name': info['shortName'].fillna(pd.Series(tickers, index=tickers)),
+        'price': current_price,
+        'market_cap': info['marketCap'].fillna(0),
+        'sector': info['sector'].fillna('Unknown'),
+        'industry': info['industry'].fillna('Unknown'),
+        'momentum_3m': momentum_3m,
+        'momentum_1m': momentum_1m,
+        'volume_ratio': volume_ratio,
+        'volatility': volatility,
+        'revenue_growth': revenue_growth,
+        'earnings_growth': earnings_growth,
+        'atr': atr
+    }, index=tickers)
+    metrics['growth_score'] = score_growth_batch(
+        *(metrics[column].to_numpy(dtype=float) for column in
+          ['momentum_3m', 'momentum_1m', 'volume_ratio', 'price', 'volatility', 'revenue_growth', 'earnings_growth'])
+    )
+    return metrics[METRIC_COLUMNS]
+
+def compute_metrics(ticker, info, hist, cutoffs=None):
+    """Compute growth metrics for a stock from its info dict and 6-month price history"""
+    try:
+        metrics = compute_batch_metrics({ticker: info}, {ticker: hist}, cutoffs)
+        return metrics.iloc[0].to_dict() if not metrics.empty else None
     except Exception as e:
         print(f"Error fetching data for {ticker}: {e}")
         return None
 
+def process_batch(batch, min_price, max_price, cutoffs=None):
+    """Fetch and score one batch of stocks
+    
+    One batched price history download, then info requests (quoteSummary,
+    made concurrently) only for stocks whose last close is in the price range,
+    with the metrics computed for the whole batch at once. Runs in a
+    worker process when there are several batches.
+    """
+    histories = fetch_histories(batch)
+    candidates = _in_price_range(histories, min_price, max_price)
+    infos = fetch_infos(candidates)
+    return compute_batch_metrics(infos, histories, cutoffs)
+
+def _init_worker():
+    """Give a worker process its own HTTP session
+    
+    A forked worker would otherwise share the parent's pooled keep-alive
+    sockets, already opened by the prefilters, with the other workers.
+    """
+    global SESSION
+    SESSION = make_session()
+
+@contextmanager
+def _batch_pool(num_batches):
+    """Process pool for scoring several batches at once, or None for a single batch
+    
+    Workers are forked where the platform allows, so they start without
+    re-importing this module and see the same module state on every OS.
+    """
+    if num_batches <= 1:
+        yield None
+        return
+    context = mp.get_context("fork" if "fork" in mp.get_all_start_methods() else None)
+    with context.Pool(processes=min(BATCH_PROCESSES, num_batches), initializer=_init_worker) as pool:
+        yield pool
+
 def find_growth_stocks(max_price=20, min_price=1, min_growth_score=50, universe="ALL", max_stocks=10):
     """Find growth stocks matching criteria"""
     print(f"Searching for growth stocks under ${max_price} with high potential...")
@@ -156,59 +286,73 @@ def find_growth_stocks(max_price=20, min_price=1, min_growth_score=50, universe=
     try:
         # Get tickers from specified universe
         if universe == "SMALLCAP":
-            # Could use a dedicated small-cap list here
-            # For now, we'll use ALL and filter by market cap later
+            # Start from ALL and keep the small caps by market cap alone
             tickers = get_universe_tickers("ALL")
+            print(f"Retrieved {len(tickers)} tickers from ALL")
+            tickers = prefilter_smallcap(tickers)
         else:
             tickers = get_universe_tickers(universe)
             
         print(f"Retrieved {len(tickers)} tickers from {universe}")
         
-        # Process stocks in batches
-        results = []
+        # Drop stocks outside the price range before fetching anything else
+        tickers = prefilter_by_price(tickers, min_price, max_price)
+        print(f"{len(tickers)} tickers priced between ${min_price} and ${max_price}")
+        
+        # Process stocks in batches of 100, spread over worker processes when
+        # there is more than one batch
         batch_size = 100
-        for i in range(0, len(tickers), batch_size):
-            batch = tickers[i:i+batch_size]
-            print(f"Processing batch {i//batch_size + 1}/{(len(tickers)-1)//batch_size + 1}...")
-            
-            batch_count = 0
-            for ticker in batch:
-                metrics = get_growth_metrics(ticker)
-                if metrics and metrics['price'] >= min_price and metrics['price'] <= max_price:
-                    results.append(metrics)
-                    batch_count += 1
-            
-            # Show progress
-            print(f"Found {batch_count} matching stocks in this batch ({len(results)} total)")
+        batches = [tickers[i:i+batch_size] for i in range(0, len(tickers), batch_size)]
+        score_batch = partial(process_batch, min_price=min_price, max_price=max_price,
+                              cutoffs=momentum_cutoffs())
         
-        # Convert to DataFrame
-        if not results:
-            return "No growth stocks found matching your criteria."
-            
-        stocks_df = pd.DataFrame(results)
+        # Filter each batch as it arrives and keep only its best max_stocks
+        # rows; nothing else can reach the final list, so memory stays bounded
+        results = []
+        total = in_price = matching = 0
+        with _batch_pool(len(batches)) as pool:
+            batch_metrics = pool.imap_unordered(score_batch, batches) if pool else map(score_batch, batches)
+            for n, metrics in enumerate(batch_metrics, 1):
+                total += len(metrics)
+                
+                # Show progress
+                print(f"Processed batch {n}/{len(batches)}: scored {len(metrics)} stocks ({total} total)")
+                if metrics.empty:
+                    continue
+                
+                # Downcast the metrics to float32 so filtering and sorting touch less memory.
+                # Price and market cap stay float64: float32 rounds large caps and
+                # prices compared against the thresholds.
+                numeric = metrics.select_dtypes('number').columns.difference(['price', 'market_cap'])
+                metrics[numeric] = metrics[numeric].apply(pd.to_numeric, downcast='float')
+                
+                # Filter on price and growth score with one combined mask
+                mask = metrics['price'].between(min_price, max_price)
+                in_price += mask.sum()
+                if min_growth_score is not None:
+                    mask &= metrics['growth_score'] >= min_growth_score
+                matching += mask.sum()
+                
+                best = metrics.loc[mask].nlargest(max_stocks, 'growth_score')
+                if not best.empty:
+                    results.append(best)
         
-        # Filter based on growth score
+        if not in_price:
+            return "No growth stocks found matching your criteria."
+        print(f"Found {in_price} stocks priced between ${min_price} and ${max_price}")
         if min_growth_score is not None:
-            filtered_df = stocks_df[stocks_df['growth_score'] >= min_growth_score]
-            print(f"Filtered to {len(filtered_df)} stocks with growth score >= {min_growth_score}")
-            stocks_df = filtered_df
+            print(f"Filtered to {matching} stocks with growth score >= {min_growth_score}")
             
-        if stocks_df.empty:
+        if not results:
             return "No stocks matching your growth criteria after filtering."
             
-        # Sort by growth score (descending)
-        stocks_df = stocks_df.sort_values('growth_score', ascending=False)
-        
-        # Take top N stocks
-        top_stocks = stocks_df.head(max_stocks)
+        # Take the top N stocks by growth score (descending)
+        top_stocks = pd.concat(results).nlargest(max_stocks, 'growth_score')
         
         # Show top results
         print("\nTop Growth Stocks:")
-        for i, (ticker, row) in enumerate(top_stocks.iterrows(), 1):
-            price = row['price']
-            score = row['growth_score']
-            momentum = row['momentum_3m']
-            print(f"{i}. {ticker}: ${price:.2f} - Growth Score: {score:.1f}/100 - 3M Momentum: {momentum:.1f}%")
+        for i, row in enumerate(top_stocks.itertuples(), 1):
+            print(f"{i}. {row.ticker}: ${row.price:.2f} - Growth Score: {row.growth_score:.1f}/100 - 3M Momentum: {row.momentum_3m:.1f}%")
         
         # Generate memo
         memo = generate_growth_memo(top_stocks)
@@ -223,7 +367,7 @@ def generate_growth_memo(stocks_df, buying_power=50000):
     """Generate an investment memo for growth stocks"""
     now = datetime.now().strftime("%B %d, %Y")
     
-    memo = f"""
+    parts = [f"""
 # GROWTH STOCK RECOMMENDATIONS
 ## Date: {now}
 ## Account Value: ${buying_power:,}
@@ -236,7 +380,7 @@ stocks under $20 with strong growth metrics and momentum.
 
 ## TOP GROWTH RECOMMENDATIONS:
 
-"""
+"""]
     
     # Calculate position sizes
     # For growth stocks, we'll allocate equal amounts (e.g. 10% per position for 10 stocks)
@@ -244,37 +388,37 @@ stocks under $20 with strong growth metrics and momentum.
     position_pct = 1.0 / num_positions
     
     # Add each stock recommendation
-    for i, (_, row) in enumerate(stocks_df.iterrows(), 1):
-        ticker = row['ticker']
-        price = row['price']
+    for i, row in enumerate(stocks_df.itertuples(), 1):
+        ticker = row.ticker
+        price = row.price
         
         # Calculate position
         position_dollars = buying_power * position_pct
         position_shares = int(position_dollars / price) if price > 0 else 0
         
         # Format metrics
-        revenue_growth = f"{row['revenue_growth']:.1f}%" if pd.notna(row['revenue_growth']) else "N/A"
-        earnings_growth = f"{row['earnings_growth']:.1f}%" if pd.notna(row['earnings_growth']) else "N/A"
-        momentum_3m = f"{row['momentum_3m']:.1f}%" if pd.notna(row['momentum_3m']) else "N/A"
-        momentum_1m = f"{row['momentum_1m']:.1f}%" if pd.notna(row['momentum_1m']) else "N/A"
-        market_cap = f"${row['market_cap']/1000000000:.2f}B" if row['market_cap'] >= 1000000000 else f"${row['market_cap']/1000000:.2f}M"
+        revenue_growth = f"{row.revenue_growth:.1f}%" if pd.notna(row.revenue_growth) else "N/A"
+        earnings_growth = f"{row.earnings_growth:.1f}%" if pd.notna(row.earnings_growth) else "N/A"
+        momentum_3m = f"{row.momentum_3m:.1f}%" if pd.notna(row.momentum_3m) else "N/A"
+        momentum_1m = f"{row.momentum_1m:.1f}%" if pd.notna(row.momentum_1m) else "N/A"
+        market_cap = f"${row.market_cap/1000000000:.2f}B" if row.market_cap >= 1000000000 else f"${row.market_cap/1000000:.2f}M"
         
-        memo += f"""
-### {i}. {ticker} - {row['name']} - Growth Score: {int(row['growth_score'])}/100
+        parts.append(f"""
+### {i}. {ticker} - {row.name} - Growth Score: {int(row.growth_score)}/100
 - Current Price: ${price:.2f}
 - Market Cap: {market_cap}
-- Sector: {row['sector']}
-- Industry: {row['industry']}
+- Sector: {row.sector}
+- Industry: {row.industry}
 - Revenue Growth: {revenue_growth}
 - Earnings Growth: {earnings_growth}
 - 3-Month Momentum: {momentum_3m}
 - 1-Month Momentum: {momentum_1m}
 - Suggested Position: {position_shares} shares (${position_shares * price:,.2f})
 - Portfolio Allocation: {position_pct*100:.1f}% of capital
-"""
+""")
     
     # Add investment rationale
-    memo += f"""
+    parts.append(f"""
 ## INVESTMENT RATIONALE
 
 These growth-focused recommendations target companies with strong revenue growth, positive price momentum, and favorable
@@ -292,8 +436,8 @@ Consider the following risk management strategies for these growth positions:
 I've focused on finding stocks similar to your examples (NBIS, RXRX) with strong growth characteristics and prices
 under $20 per share, emphasizing companies with promising fundamental and technical indicators.
 
-"""
-    return memo
+""")
+    return ''.join(parts)
 
 if __name__ == "__main__":
     # Parse command-line arguments
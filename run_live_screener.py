@@ -7,6 +7,7 @@ using real-time market data
 import os
 import sys
 import pandas as pd
+import numpy as np
 import argparse
 from datetime import datetime
 
@@ -16,7 +17,7 @@ sys.path.insert(0, project_root)
 
 # Import required modules
 from src.scoring.buffett import get_f_score
-from src.risk.position import position_size
+from src.risk.position import position_sizes
 from src.utils.universe import get_universe_tickers
 
 def format_large_number(num):
@@ -48,52 +49,63 @@ def get_buffett_recommendations(buying_power=270000, risk_pct=0.01, min_f_score=
         
         print(f"Retrieved data for {len(stocks_df)} stocks")
         
-        # Apply filters
+        # Downcast to the smallest dtypes that hold the data (F-scores are 0-9)
+        # so filtering and sorting touch less memory
+        stocks_df = stocks_df.assign(
+            score=pd.to_numeric(stocks_df['score'], downcast='integer'),
+            close=pd.to_numeric(stocks_df['close'], downcast='float'),
+            atr=pd.to_numeric(stocks_df['atr'], downcast='float')
+        )
+        
+        # Apply filters as one combined mask, reporting the running count
+        score = stocks_df['score'].to_numpy()
+        close = stocks_df['close'].to_numpy()
+        mask = np.ones(len(stocks_df), dtype=bool)
         if min_f_score is not None:
-            filtered_df = stocks_df[stocks_df['score'] >= min_f_score]
-            print(f"Filtered to {len(filtered_df)} stocks with F-Score >= {min_f_score}")
-            stocks_df = filtered_df
+            mask &= score >= min_f_score
+            print(f"Filtered to {mask.sum()} stocks with F-Score >= {min_f_score}")
         
         if min_price is not None:
-            filtered_df = stocks_df[stocks_df['close'] >= min_price]
-            print(f"Filtered to {len(filtered_df)} stocks with price >= ${min_price}")
-            stocks_df = filtered_df
+            mask &= close >= min_price
+            print(f"Filtered to {mask.sum()} stocks with price >= ${min_price}")
             
         if max_price is not None:
-            filtered_df = stocks_df[stocks_df['close'] <= max_price]
-            print(f"Filtered to {len(filtered_df)} stocks with price <= ${max_price}")
-            stocks_df = filtered_df
+            mask &= close <= max_price
+            print(f"Filtered to {mask.sum()} stocks with price <= ${max_price}")
+        
+        stocks_df = stocks_df.loc[mask]
         
         if stocks_df.empty:
             print("No stocks match your criteria after filtering.")
             return "No stocks found matching your criteria. Try adjusting your filters."
         
-        # Calculate position sizes
-        positions = {}
-        for ticker in stocks_df.index:
-            price = stocks_df.loc[ticker, 'close']
-            atr = stocks_df.loc[ticker, 'atr']
-            size = position_size(price=price, atr=atr, account_size=buying_power, risk_pct=risk_pct)
-            positions[ticker] = {
+        # Calculate position sizes for all stocks at once
+        prices = stocks_df['close'].to_numpy(dtype=float)
+        sizes = position_sizes(prices, stocks_df['atr'].to_numpy(dtype=float),
+                               account_size=buying_power, risk_pct=risk_pct)
+        positions = {
+            ticker: {
                 'shares': int(size / price) if price > 0 else 0,
                 'dollars': round(size, 2),
                 'percentage': round((size / buying_power) * 100, 2) if buying_power > 0 else 0
             }
+            for ticker, price, size in zip(stocks_df.index, prices.tolist(), sizes.tolist())
+        }
         
         # Sort by F-score descending and get top stocks
-        top_stocks = stocks_df.sort_values('score', ascending=False).head(5)
+        top_stocks = stocks_df.nlargest(5, 'score')
         
         print(f"Top stocks by F-Score: {', '.join(top_stocks.index.tolist())}")
         
         # Adjust allocations to not exceed buying power
         max_allocation = 0.20  # 20% per position maximum
         
-        for ticker in top_stocks.index:
-            position_dollars = buying_power * max_allocation
-            position_shares = int(position_dollars / stocks_df.loc[ticker, 'close'])
+        position_dollars = buying_power * max_allocation
+        for ticker, price in top_stocks['close'].items():
+            position_shares = int(position_dollars / price)
             positions[ticker] = {
                 'shares': position_shares,
-                'dollars': round(position_shares * stocks_df.loc[ticker, 'close'], 2),
+                'dollars': round(position_shares * price, 2),
                 'percentage': round((max_allocation * 100), 2)
             }
         
@@ -111,7 +123,7 @@ def generate_buffett_memo(stocks_df, positions, buying_power):
     """Generate a Buffett-style investment memo"""
     now = datetime.now().strftime("%B %d, %Y")
     
-    memo = f"""
+    parts = [f"""
 # BUFFETT INVESTMENT MEMO
 ## Date: {now}
 ## Account Value: ${buying_power:,}
@@ -124,42 +136,43 @@ strict criteria for quality, value, and financial strength.
 
 ## TOP RECOMMENDATIONS:
 
-"""
+"""]
     
     # Add top stock recommendations
-    for i, (ticker, row) in enumerate(stocks_df.iterrows(), 1):
+    for i, row in enumerate(stocks_df.itertuples(), 1):
+        ticker = row.Index
         position_info = positions.get(ticker, {})
         shares = position_info.get('shares', 0)
         dollars = position_info.get('dollars', 0)
         percentage = position_info.get('percentage', 0)
         
-        company_name = row.get('name', ticker)
-        market_cap = row.get('market_cap', 0)
-        pe_ratio = row.get('pe_ratio', 0)
-        dividend_yield = row.get('dividend_yield', 0)
-        beta = row.get('beta', 0)
+        company_name = getattr(row, 'name', ticker)
+        market_cap = getattr(row, 'market_cap', 0)
+        pe_ratio = getattr(row, 'pe_ratio', 0)
+        dividend_yield = getattr(row, 'dividend_yield', 0)
+        beta = getattr(row, 'beta', 0)
         
         pe_display = f"{pe_ratio:.1f}" if pe_ratio and not pd.isna(pe_ratio) else "N/A"
         dividend_display = f"{dividend_yield*100:.2f}%" if dividend_yield and not pd.isna(dividend_yield) else "N/A"
         beta_display = f"{beta:.2f}" if beta and not pd.isna(beta) else "N/A"
         
-        memo += f"""
-### {i}. {ticker} - {company_name} - F-Score: {int(row['score'])}/9
-- Current Price: ${row['close']:.2f}
+        parts.append(f"""
+### {i}. {ticker} - {company_name} - F-Score: {int(row.score)}/9
+- Current Price: ${row.close:.2f}
 - Market Cap: {format_large_number(market_cap)}
 - P/E Ratio: {pe_display}
 - Dividend Yield: {dividend_display}
 - Beta: {beta_display}
-- Volatility (ATR): ${row['atr']:.2f}
+- Volatility (ATR): ${row.atr:.2f}
 - Suggested Position: {shares} shares (${dollars:,.2f})
 - Portfolio Allocation: {percentage}% of capital
-"""
+""")
     
     # Add conclusion
     total_invested = sum(positions.get(ticker, {}).get('dollars', 0) for ticker in stocks_df.index)
     remaining_capital = buying_power - total_invested
     
-    memo += f"""
+    parts.append(f"""
 ## ALLOCATION SUMMARY
 - Total Capital: ${buying_power:,.2f}
 - Allocated to Top Picks: ${total_invested:,.2f} ({total_invested/buying_power*100:.1f}%)
@@ -181,8 +194,8 @@ with strong fundamentals trading at reasonable valuations.
 
 Sincerely,
 Buffett Screener Algorithm
-"""
-    return memo
+""")
+    return ''.join(parts)
 
 if __name__ == "__main__":
     # Parse command-line arguments
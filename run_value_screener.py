@@ -11,7 +11,15 @@ import argparse
 from datetime import datetime, timedelta
 import numpy as np
 import yfinance as yf
-import traceback
+import logging
+import threading
+import time
+import pyarrow as pa
+import pyarrow.parquet as pq
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from tqdm import tqdm
 
 # Add the project root to the Python path
 project_root = os.path.dirname(os.path.abspath(__file__))
@@ -20,355 +28,411 @@ sys.path.insert(0, project_root)
 # Import required modules
 from src.utils.universe import get_universe_tickers
 from src.risk.position import position_size
+from src.utils.yf_session import SESSION
+from src.utils.yf_cache import cached_info, cached_statements
 
-def get_value_metrics(ticker):
-    """Get value investing metrics for a stock based on Buffett principles"""
+logger = logging.getLogger(__name__)
+
+# Number of tickers fetched concurrently; each fetch is several blocking requests
+FETCH_WORKERS = 16
+
+# Seconds spent waiting on network requests vs scoring during a run, so it is
+# clear where the time goes. io_s sums over the fetch threads, so it can
+# exceed the wall-clock time. failed counts stocks skipped on an error.
+_STATS = {'io_s': 0.0, 'compute_s': 0.0, 'failed': 0}
+_stats_lock = threading.Lock()
+
+@contextmanager
+def _timed(key):
+    """Add the time spent in the block to ``_STATS[key]``"""
+    start = time.perf_counter()
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
-        
-        # Get basic info
-        name = info.get('shortName', ticker)
-        current_price = info.get('currentPrice', info.get('regularMarketPrice', 0))
-        market_cap = info.get('marketCap', 0)
-        sector = info.get('sector', 'Unknown')
-        industry = info.get('industry', 'Unknown')
-        
-        # If price is zero, try to get from history
-        if current_price == 0:
-            hist = stock.history(period="1d")
-            if not hist.empty:
-                current_price = hist['Close'].iloc[-1]
-        
-        # Get financial data
-        try:
-            balance_sheet = stock.balance_sheet
-            income_stmt = stock.income_stmt
-            cash_flow = stock.cashflow
-        except:
-            # If quarterly statements fail, try annual
-            balance_sheet = stock.get_balance_sheet() if hasattr(stock, 'get_balance_sheet') else None
-            income_stmt = stock.get_income_stmt() if hasattr(stock, 'get_income_stmt') else None
-            cash_flow = stock.get_cashflow() if hasattr(stock, 'get_cashflow') else None
-            
-        # Calculate key Buffett metrics
-        
-        # 1. Profitability metrics
-        roe = info.get('returnOnEquity', 0)  # Return on Equity
-        roa = info.get('returnOnAssets', 0)  # Return on Assets
-        gross_margin = info.get('grossMargins', 0)  # Gross Margins
-        operating_margin = info.get('operatingMargins', 0)  # Operating Margins
-        profit_margin = info.get('profitMargins', 0)  # Profit Margins
-        
-        # 2. Value metrics
-        pe_ratio = info.get('trailingPE', float('inf'))  # Price-to-Earnings
-        pb_ratio = info.get('priceToBook', float('inf'))  # Price-to-Book
-        free_cash_flow_yield = 0  # Will calculate if data available
-        
-        # 3. Financial Strength
-        debt_to_equity = info.get('debtToEquity', float('inf'))  # Debt-to-Equity
-        current_ratio = 0  # Current Assets / Current Liabilities
-        
-        # 4. Competitive Advantage (Moat) indicators
-        revenue_growth_5y = info.get('revenueGrowth', 0)  # Consistent growth is a moat indicator
-        
-        # Calculate current ratio from balance sheet if available
-        if balance_sheet is not None and not balance_sheet.empty:
-            if 'Total Current Assets' in balance_sheet.index and 'Total Current Liabilities' in balance_sheet.index:
-                current_assets = balance_sheet.loc['Total Current Assets'].iloc[0]
-                current_liabilities = balance_sheet.loc['Total Current Liabilities'].iloc[0]
-                if current_liabilities != 0:
-                    current_ratio = current_assets / current_liabilities
-        
-        # Calculate FCF yield if we have the data
-        if cash_flow is not None and not cash_flow.empty and market_cap > 0:
-            if 'Free Cash Flow' in cash_flow.index:
-                free_cash_flow = cash_flow.loc['Free Cash Flow'].iloc[0]
-                free_cash_flow_yield = (free_cash_flow / market_cap) * 100
-                
-            # If FCF not available directly, try to calculate it
-            elif 'Operating Cash Flow' in cash_flow.index and 'Capital Expenditures' in cash_flow.index:
-                operating_cash_flow = cash_flow.loc['Operating Cash Flow'].iloc[0]
-                capex = abs(cash_flow.loc['Capital Expenditures'].iloc[0])
-                free_cash_flow = operating_cash_flow - capex
-                free_cash_flow_yield = (free_cash_flow / market_cap) * 100
-        
-        # Calculate Buffett Score (0-100)
-        buffett_score = 0
-        
-        # 1. Financial Strength (0-25 points)
-        financial_strength_score = 0
-        
-        # Debt to Equity: Lower is better (0-10 points)
-        if debt_to_equity <= 0.3:
-            financial_strength_score += 10
-        elif debt_to_equity <= 0.5:
-            financial_strength_score += 8
-        elif debt_to_equity <= 0.8:
-            financial_strength_score += 6
-        elif debt_to_equity <= 1.0:
-            financial_strength_score += 4
-        elif debt_to_equity <= 1.5:
-            financial_strength_score += 2
-        
-        # Current Ratio: Higher is better (0-5 points)
-        if current_ratio >= 2.0:
-            financial_strength_score += 5
-        elif current_ratio >= 1.5:
-            financial_strength_score += 4
-        elif current_ratio >= 1.2:
-            financial_strength_score += 3
-        elif current_ratio >= 1.0:
-            financial_strength_score += 2
-            
-        # Interest Coverage (using proxies if not directly available)
-        interest_coverage_proxy = operating_margin
-        if interest_coverage_proxy >= 0.20:  # 20% operating margin
-            financial_strength_score += 5
-        elif interest_coverage_proxy >= 0.15:
-            financial_strength_score += 4
-        elif interest_coverage_proxy >= 0.10:
-            financial_strength_score += 3
-        elif interest_coverage_proxy >= 0.05:
-            financial_strength_score += 2
-            
-        # Free Cash Flow positivity (0-5 points)
-        if free_cash_flow_yield > 7:
-            financial_strength_score += 5
-        elif free_cash_flow_yield > 5:
-            financial_strength_score += 4
-        elif free_cash_flow_yield > 3:
-            financial_strength_score += 3
-        elif free_cash_flow_yield > 0:
-            financial_strength_score += 2
-            
-        buffett_score += financial_strength_score
-            
-        # 2. Profitability (0-25 points)
-        profitability_score = 0
-        
-        # Return on Equity (0-10 points)
-        if roe >= 0.20:  # 20%+ ROE
-            profitability_score += 10
-        elif roe >= 0.15:
-            profitability_score += 8
-        elif roe >= 0.12:
-            profitability_score += 6
-        elif roe >= 0.10:
-            profitability_score += 4
-        elif roe >= 0.08:
-            profitability_score += 2
-            
-        # Profit Margins (0-10 points)  
-        if profit_margin >= 0.20:  # 20%+ profit margin
-            profitability_score += 10
-        elif profit_margin >= 0.15:
-            profitability_score += 8
-        elif profit_margin >= 0.10:
-            profitability_score += 6
-        elif profit_margin >= 0.05:
-            profitability_score += 4
-        elif profit_margin > 0:
-            profitability_score += 2
-            
-        # Gross Margin (0-5 points) - High margins indicate moat
-        if gross_margin >= 0.50:  # 50%+ gross margin
-            profitability_score += 5
-        elif gross_margin >= 0.40:
-            profitability_score += 4
-        elif gross_margin >= 0.30:
-            profitability_score += 3
-        elif gross_margin >= 0.20:
-            profitability_score += 2
-        elif gross_margin > 0:
-            profitability_score += 1
-            
-        buffett_score += profitability_score
-        
-        # 3. Moat/Competitive Advantage (0-25 points)
-        moat_score = 0
-        
-        # Consistent revenue growth (0-5 points)
-        if revenue_growth_5y >= 0.10:  # 10%+ growth
-            moat_score += 5
-        elif revenue_growth_5y >= 0.07:
-            moat_score += 4
-        elif revenue_growth_5y >= 0.05:
-            moat_score += 3
-        elif revenue_growth_5y > 0:
-            moat_score += 2
-            
-        # Consistent profitability (using operating margin as proxy) (0-5 points)
-        if operating_margin >= 0.25:
-            moat_score += 5
-        elif operating_margin >= 0.20:
-            moat_score += 4
-        elif operating_margin >= 0.15:
-            moat_score += 3
-        elif operating_margin >= 0.10:
-            moat_score += 2
-        elif operating_margin > 0:
-            moat_score += 1
-            
-        # Brand strength (using market cap as proxy) (0-5 points)
-        if market_cap >= 100000000000:  # $100B+
-            moat_score += 5
-        elif market_cap >= 50000000000:  # $50B+
-            moat_score += 4
-        elif market_cap >= 10000000000:  # $10B+
-            moat_score += 3
-        elif market_cap >= 1000000000:   # $1B+
-            moat_score += 2
-        else:
-            moat_score += 1
-                
-        # Industry leadership (using arbitrary sector assignment) (0-10 points)
-        # Favoring industries Buffett traditionally likes
-        buffett_preferred_sectors = [
-            'Financial Services', 'Consumer Defensive', 'Financial',
-            'Consumer Cyclical', 'Communication Services', 'Industrials',
-            'Insurance', 'Banking', 'Beverages', 'Retail'
-        ]
-        
-        buffett_preferred_industries = [
-            'Insurance', 'Banks', 'Beverages', 'Railroads', 'Credit Services',
-            'Software', 'Consumer Packaged Goods', 'Financial Data & Stock Exchanges',
-            'Retail', 'Oil & Gas', 'Transportation', 'Healthcare'
-        ]
-        
-        # Check if in Buffett's preferred sectors/industries
-        if sector in buffett_preferred_sectors:
-            moat_score += 5
-        if industry in buffett_preferred_industries:
-            moat_score += 5
-            
-        buffett_score += moat_score
-        
-        # 4. Valuation (0-25 points)
-        valuation_score = 0
-        
-        # P/E Ratio (0-10 points)
-        if pe_ratio > 0:  # Must be profitable
-            if pe_ratio <= 10:
-                valuation_score += 10
-            elif pe_ratio <= 15:
-                valuation_score += 8
-            elif pe_ratio <= 20:
-                valuation_score += 6
-            elif pe_ratio <= 25:
-                valuation_score += 4
-            elif pe_ratio <= 30:
-                valuation_score += 2
-                
-        # P/B Ratio (0-5 points)
-        if pb_ratio <= 1.0:
-            valuation_score += 5
-        elif pb_ratio <= 2.0:
-            valuation_score += 4
-        elif pb_ratio <= 3.0:
-            valuation_score += 3
-        elif pb_ratio <= 4.0:
-            valuation_score += 2
-        elif pb_ratio <= 5.0:
-            valuation_score += 1
-            
-        # Free Cash Flow Yield (0-10 points)
-        if free_cash_flow_yield >= 10:  # 10%+ FCF yield
-            valuation_score += 10
-        elif free_cash_flow_yield >= 7:
-            valuation_score += 8
-        elif free_cash_flow_yield >= 5:
-            valuation_score += 6
-        elif free_cash_flow_yield >= 3:
-            valuation_score += 4
-        elif free_cash_flow_yield > 0:
-            valuation_score += 2
-            
-        buffett_score += valuation_score
-        
-        # Return metrics
-        return {
-            'ticker': ticker,
-            'name': name,
-            'price': current_price,
-            'market_cap': market_cap,
-            'sector': sector,
-            'industry': industry,
-            'pe_ratio': pe_ratio,
-            'pb_ratio': pb_ratio,
-            'debt_to_equity': debt_to_equity,
-            'current_ratio': current_ratio,
-            'roe': roe * 100 if roe else 0,  # Convert to percentage
-            'roa': roa * 100 if roa else 0,  # Convert to percentage
-            'gross_margin': gross_margin * 100 if gross_margin else 0,  # Convert to percentage
-            'operating_margin': operating_margin * 100 if operating_margin else 0,  # Convert to percentage
-            'profit_margin': profit_margin * 100 if profit_margin else 0,  # Convert to percentage
-            'free_cash_flow_yield': free_cash_flow_yield,
-            'revenue_growth': revenue_growth_5y * 100 if revenue_growth_5y else 0,  # Convert to percentage
-            'buffett_score': buffett_score,
-            'financial_strength_score': financial_strength_score,
-            'profitability_score': profitability_score,
-            'moat_score': moat_score,
-            'valuation_score': valuation_score
-        }
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _stats_lock:
+            _STATS[key] += elapsed
+
+def io_time():
+    """Time the block as network I/O"""
+    return _timed('io_s')
+
+def compute_time():
+    """Time the block as scoring"""
+    return _timed('compute_s')
+
+def reset_stats():
+    """Zero the I/O and scoring timers and the failure count"""
+    with _stats_lock:
+        for key in _STATS:
+            _STATS[key] = 0
+
+def fetch_last_closes(tickers):
+    """Latest close of each stock from one batched download, or {} on failure"""
+    try:
+        with io_time():
+            closes = yf.download(list(tickers), period="5d", progress=False, threads=True, auto_adjust=False)['Close']
     except Exception as e:
-        print(f"Error fetching data for {ticker}: {e}")
+        print(f"Could not fetch recent prices: {e}")
+        return {}
+    if isinstance(closes, pd.Series):
+        closes = closes.to_frame(tickers[0])
+    if closes.empty:
+        return {}
+    return closes.ffill().iloc[-1].dropna().to_dict()
+
+# Columns returned by fetch_raw_metrics, in order; all but the text ones are floats
+RAW_METRIC_COLUMNS = ['ticker', 'name', 'price', 'market_cap', 'sector', 'industry', 'pe_ratio', 'pb_ratio',
+                      'debt_to_equity', 'current_ratio', 'roe', 'roa', 'gross_margin', 'operating_margin',
+                      'profit_margin', 'free_cash_flow_yield', 'revenue_growth']
+_TEXT_COLUMNS = {'ticker', 'name', 'sector', 'industry'}
+
+# Columns added by score_dataframe; all integer points
+SCORE_COLUMNS = ['buffett_score', 'financial_strength_score', 'profitability_score', 'moat_score', 'valuation_score']
+
+# Scored stocks are streamed here in batches as they are fetched, so memory
+# stays bounded however large the universe, then read back filtered by score
+RAW_RESULTS_FILE = os.path.join('cache', 'screener_raw.parquet')
+RESULTS_SCHEMA = pa.schema([(column, pa.string() if column in _TEXT_COLUMNS else pa.float64())
+                            for column in RAW_METRIC_COLUMNS]
+                           + [(column, pa.int64()) for column in SCORE_COLUMNS])
+
+# Stocks scored and written to RAW_RESULTS_FILE at a time
+WRITE_BATCH_SIZE = 256
+
+def _to_float(value):
+    """Convert a raw metric to float, with None or unparseable values as NaN"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+def _fetch_info(ticker):
+    """Fetch a stock's info dict, or None if the request fails"""
+    try:
+        with io_time():
+            return cached_info(ticker, session=SESSION)
+    except Exception as e:  # yfinance raises many error types; one bad ticker mustn't stop the screen
+        logger.debug('fetch failed %s: %s', ticker, e)
+        return None
+
+def _fetch_statements(ticker):
+    """Fetch a stock's financial statements, or None if the request fails"""
+    try:
+        # Cached on disk; statements change at most quarterly
+        with io_time():
+            return cached_statements(ticker, session=SESSION)
+    except Exception as e:  # yfinance raises many error types; one bad ticker mustn't stop the screen
+        logger.debug('fetch failed %s: %s', ticker, e)
+        return None
+
+def _info_metrics(ticker, info, price_lookup=None):
+    """Compute the raw metrics that come from the info dict alone
+
+    The statement-derived metrics are left at 0 for :func:`_statement_metrics`.
+    """
+    # Get basic info
+    name = info.get('shortName') or ticker
+    current_price = info.get('currentPrice', info.get('regularMarketPrice', 0))
+    market_cap = info.get('marketCap') or 0
+    sector = info.get('sector') or 'Unknown'
+    industry = info.get('industry') or 'Unknown'
+
+    # If price is zero, use the latest close instead
+    if current_price == 0:
+        if price_lookup is None:
+            price_lookup = fetch_last_closes([ticker])
+        current_price = price_lookup.get(ticker, 0)
+
+    return {
+        'ticker': ticker,
+        'name': name,
+        'price': current_price,
+        'market_cap': market_cap,
+        'sector': sector,
+        'industry': industry,
+        'pe_ratio': info.get('trailingPE', float('inf')),  # Price-to-Earnings
+        'pb_ratio': info.get('priceToBook', float('inf')),  # Price-to-Book
+        'debt_to_equity': info.get('debtToEquity', float('inf')),  # Debt-to-Equity
+        'current_ratio': 0,  # Current Assets / Current Liabilities
+        'roe': info.get('returnOnEquity', 0),  # Return on Equity
+        'roa': info.get('returnOnAssets', 0),  # Return on Assets
+        'gross_margin': info.get('grossMargins', 0),
+        'operating_margin': info.get('operatingMargins', 0),
+        'profit_margin': info.get('profitMargins', 0),
+        'free_cash_flow_yield': 0,  # Will calculate if data available
+        'revenue_growth': info.get('revenueGrowth', 0)  # Consistent growth is a moat indicator
+    }
+
+def _latest_values(statement):
+    """Map each line item of a statement to its most recent value; {} when missing"""
+    if statement is None or statement.empty:
+        return {}
+    return dict(zip(statement.index, statement.iloc[:, 0].to_numpy()))
+
+def _statement_metrics(statements, market_cap):
+    """Compute the current ratio and FCF yield from a stock's financial statements"""
+    # One pass over each statement's latest column instead of a .loc lookup per line item
+    balance_sheet = _latest_values(statements['balance_sheet'])
+    cash_flow = _latest_values(statements['cashflow'])
+
+    free_cash_flow_yield = 0
+    current_ratio = 0
+
+    # Calculate current ratio from balance sheet if available
+    current_assets = balance_sheet.get('Total Current Assets')
+    current_liabilities = balance_sheet.get('Total Current Liabilities')
+    if current_assets is not None and current_liabilities is not None and current_liabilities != 0:
+        current_ratio = current_assets / current_liabilities
+
+    # Calculate FCF yield if we have the data
+    if cash_flow and market_cap > 0:
+        if 'Free Cash Flow' in cash_flow:
+            free_cash_flow_yield = (cash_flow['Free Cash Flow'] / market_cap) * 100
+            
+        # If FCF not available directly, try to calculate it
+        elif 'Operating Cash Flow' in cash_flow and 'Capital Expenditures' in cash_flow:
+            free_cash_flow = cash_flow['Operating Cash Flow'] - abs(cash_flow['Capital Expenditures'])
+            free_cash_flow_yield = (free_cash_flow / market_cap) * 100
+
+    return {'current_ratio': current_ratio, 'free_cash_flow_yield': free_cash_flow_yield}
+
+def _in_price_range(price, min_price=None, max_price=None):
+    """Whether a price is within the range; a missing price is kept"""
+    price = _to_float(price)
+    return not ((min_price is not None and price < min_price) or (max_price is not None and price > max_price))
+
+def _score_ceiling(raw):
+    """Highest Buffett score a stock can reach once its statements are known
+
+    The statement-derived metrics are set to values earning their top points.
+    """
+    best = dict(raw, current_ratio=np.inf, free_cash_flow_yield=np.inf)
+    with compute_time():
+        return score_dataframe(pd.DataFrame([best]))['buffett_score'].iloc[0]
+
+def fetch_raw_metrics(ticker, price_lookup=None, min_price=None, max_price=None, min_score=None):
+    """Fetch the raw fundamentals a stock is scored on, or None if it is skipped
+
+    ``price_lookup`` maps tickers to their latest close, as returned by
+    :func:`fetch_last_closes`, for stocks whose info has no price; without
+    it, only those stocks have their close downloaded. Ratios are returned
+    as fractions; :func:`score_dataframe` does the scoring.
+
+    The info is fetched first, and the financial statements only for stocks
+    priced between ``min_price`` and ``max_price`` whose best possible score
+    reaches ``min_score``. Only network failures are caught; errors in the
+    calculations propagate.
+    """
+    info = _fetch_info(ticker)
+    if info is None:
         return None
+    raw = _info_metrics(ticker, info, price_lookup)
+    if not _in_price_range(raw['price'], min_price, max_price):
+        return None
+    if min_score is not None and _score_ceiling(raw) < min_score:
+        return None
+
+    statements = _fetch_statements(ticker)
+    if statements is None:
+        return None
+    raw.update(_statement_metrics(statements, raw['market_cap']))
+    return raw
+
+# Smallest value above zero, so "> 0" can be a threshold in an "at least" ladder
+_ABOVE_ZERO = np.nextafter(0, 1)
+
+# Scoring ladders: (thresholds, points). "At least" ladders award points[i]
+# for values >= thresholds[i-1]; "at most" ladders award points[i] for
+# values <= thresholds[i]. Missing values get the ladder's lowest points.
+DEBT_TO_EQUITY_POINTS = (np.array([0.3, 0.5, 0.8, 1.0, 1.5]), np.array([10, 8, 6, 4, 2, 0]))  # at most
+CURRENT_RATIO_POINTS = (np.array([1.0, 1.2, 1.5, 2.0]), np.array([0, 2, 3, 4, 5]))
+INTEREST_COVERAGE_POINTS = (np.array([0.05, 0.10, 0.15, 0.20]), np.array([0, 2, 3, 4, 5]))
+FCF_STRENGTH_POINTS = (np.nextafter([0.0, 3.0, 5.0, 7.0], np.inf), np.array([0, 2, 3, 4, 5]))  # strictly above
+ROE_POINTS = (np.array([0.08, 0.10, 0.12, 0.15, 0.20]), np.array([0, 2, 4, 6, 8, 10]))
+PROFIT_MARGIN_POINTS = (np.array([_ABOVE_ZERO, 0.05, 0.10, 0.15, 0.20]), np.array([0, 2, 4, 6, 8, 10]))
+GROSS_MARGIN_POINTS = (np.array([_ABOVE_ZERO, 0.20, 0.30, 0.40, 0.50]), np.array([0, 1, 2, 3, 4, 5]))
+REVENUE_GROWTH_POINTS = (np.array([_ABOVE_ZERO, 0.05, 0.07, 0.10]), np.array([0, 2, 3, 4, 5]))
+OPERATING_MARGIN_POINTS = (np.array([_ABOVE_ZERO, 0.10, 0.15, 0.20, 0.25]), np.array([0, 1, 2, 3, 4, 5]))
+MARKET_CAP_POINTS = (np.array([1e9, 1e10, 5e10, 1e11]), np.array([1, 2, 3, 4, 5]))
+PE_POINTS = (np.array([10, 15, 20, 25, 30]), np.array([10, 8, 6, 4, 2, 0]))  # at most
+PB_POINTS = (np.array([1.0, 2.0, 3.0, 4.0, 5.0]), np.array([5, 4, 3, 2, 1, 0]))  # at most
+FCF_VALUE_POINTS = (np.array([_ABOVE_ZERO, 3, 5, 7, 10]), np.array([0, 2, 4, 6, 8, 10]))
+
+# Favoring industries Buffett traditionally likes; frozensets for hashed lookups
+BUFFETT_PREFERRED_SECTORS = frozenset({
+    'Financial Services', 'Consumer Defensive', 'Financial',
+    'Consumer Cyclical', 'Communication Services', 'Industrials',
+    'Insurance', 'Banking', 'Beverages', 'Retail'
+})
+BUFFETT_PREFERRED_INDUSTRIES = frozenset({
+    'Insurance', 'Banks', 'Beverages', 'Railroads', 'Credit Services',
+    'Software', 'Consumer Packaged Goods', 'Financial Data & Stock Exchanges',
+    'Retail', 'Oil & Gas', 'Transportation', 'Healthcare'
+})
+
+def _points(values, ladder, at_most=False):
+    """Look up the points for each value in a scoring ladder with one searchsorted"""
+    thresholds, points = ladder
+    values = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float)
+    if at_most:
+        # NaN sorts past every threshold, onto the lowest points
+        return points[np.searchsorted(thresholds, values, side='left')]
+    return np.where(np.isnan(values), points[0], points[np.searchsorted(thresholds, values, side='right')])
+
+def _percent(values):
+    """Convert fractions to percentages, with missing values as 0"""
+    return pd.to_numeric(values, errors='coerce').fillna(0) * 100
+
+def score_dataframe(df):
+    """Score a DataFrame of raw metrics from :func:`fetch_raw_metrics` on Buffett principles
+
+    Returns a new DataFrame with the Buffett score (0-100), its four
+    component scores, and the ratios converted to percentages.
+    """
+    df = df.reset_index(drop=True)
+    operating_margin = df['operating_margin']
+    free_cash_flow_yield = df['free_cash_flow_yield']
+
+    # 1. Financial Strength (0-25 points): debt to equity (lower is better),
+    # current ratio, interest coverage (operating margin as a proxy) and FCF
+    financial_strength_score = (
+        _points(df['debt_to_equity'], DEBT_TO_EQUITY_POINTS, at_most=True)
+        + _points(df['current_ratio'], CURRENT_RATIO_POINTS)
+        + _points(operating_margin, INTEREST_COVERAGE_POINTS)
+        + _points(free_cash_flow_yield, FCF_STRENGTH_POINTS)
+    )
+
+    # 2. Profitability (0-25 points); high gross margins indicate a moat
+    profitability_score = (
+        _points(df['roe'], ROE_POINTS)
+        + _points(df['profit_margin'], PROFIT_MARGIN_POINTS)
+        + _points(df['gross_margin'], GROSS_MARGIN_POINTS)
+    )
+
+    # 3. Moat/Competitive Advantage (0-25 points): consistent growth and
+    # profitability, brand strength (market cap as a proxy) and industry
+    moat_score = (
+        _points(df['revenue_growth'], REVENUE_GROWTH_POINTS)
+        + _points(operating_margin, OPERATING_MARGIN_POINTS)
+        + _points(df['market_cap'], MARKET_CAP_POINTS)
+        + np.where(df['sector'].isin(BUFFETT_PREFERRED_SECTORS), 5, 0)
+        + np.where(df['industry'].isin(BUFFETT_PREFERRED_INDUSTRIES), 5, 0)
+    )
+
+    # 4. Valuation (0-25 points); P/E only counts when profitable
+    pe_ratio = pd.to_numeric(df['pe_ratio'], errors='coerce')
+    valuation_score = (
+        np.where(pe_ratio > 0, _points(pe_ratio, PE_POINTS, at_most=True), 0)
+        + _points(df['pb_ratio'], PB_POINTS, at_most=True)
+        + _points(free_cash_flow_yield, FCF_VALUE_POINTS)
+    )
+
+    return df.assign(
+        roe=_percent(df['roe']),
+        roa=_percent(df['roa']),
+        gross_margin=_percent(df['gross_margin']),
+        operating_margin=_percent(operating_margin),
+        profit_margin=_percent(df['profit_margin']),
+        revenue_growth=_percent(df['revenue_growth']),
+        buffett_score=financial_strength_score + profitability_score + moat_score + valuation_score,
+        financial_strength_score=financial_strength_score,
+        profitability_score=profitability_score,
+        moat_score=moat_score,
+        valuation_score=valuation_score
+    )
+
+def _screen_one(ticker, **kwargs):
+    """:func:`fetch_raw_metrics` for one stock of a screen, skipping it on any error
+
+    The error is logged and counted, so one malformed stock doesn't abort
+    the whole screen.
+    """
+    try:
+        return fetch_raw_metrics(ticker, **kwargs)
+    except Exception:
+        logger.exception('Skipping %s after an error computing its metrics', ticker)
+        with _stats_lock:
+            _STATS['failed'] += 1
+        return None
+
+def get_value_metrics(ticker, price_lookup=None, min_price=None, max_price=None, min_score=None):
+    """Get value investing metrics for a stock based on Buffett principles
+
+    Returns None for stocks outside the price range or unable to reach
+    ``min_score``, as well as for stocks whose data could not be fetched.
+    """
+    raw = fetch_raw_metrics(ticker, price_lookup, min_price, max_price, min_score)
+    if raw is None:
+        return None
+    return score_dataframe(pd.DataFrame([raw])).iloc[0].to_dict()
+
+def _write_scored(writer, rows):
+    """Score a batch of raw metric dicts and append it to the results file"""
+    batch = pd.DataFrame({
+        column: [row[column] if column in _TEXT_COLUMNS else _to_float(row[column]) for row in rows]
+        for column in RAW_METRIC_COLUMNS
+    })
+    with compute_time():
+        scored = score_dataframe(batch)
+    writer.write_table(pa.Table.from_pandas(scored[RESULTS_SCHEMA.names], schema=RESULTS_SCHEMA,
+                                            preserve_index=False))
 
 def find_value_stocks(max_price=None, min_price=None, min_buffett_score=70, universe="SP500", max_stocks=10):
     """Find value stocks matching Buffett's criteria"""
     print(f"Searching for value stocks with strong Buffett characteristics...")
     print(f"This may take several minutes to fetch and process data from financial APIs...")
-    
+
+    reset_stats()
+    start = time.perf_counter()
     try:
         # Get tickers from specified universe
         tickers = get_universe_tickers(universe)
         print(f"Retrieved {len(tickers)} tickers from {universe}")
         
-        # Process stocks in batches
-        results = []
-        batch_size = 50
-        for i in range(0, len(tickers), batch_size):
-            batch = tickers[i:i+batch_size]
-            print(f"Processing batch {i//batch_size + 1}/{(len(tickers)-1)//batch_size + 1}...")
-            
-            batch_count = 0
-            for ticker in batch:
-                metrics = get_value_metrics(ticker)
+        # Fetch stocks concurrently (the work is waiting on Yahoo Finance).
+        # Stocks outside the price range or unable to reach the minimum score
+        # are dropped in the workers, before their statements are fetched.
+        # The rare stock whose info has no price gets its close fetched alone
+        raw_metrics = partial(_screen_one, min_price=min_price,
+                              max_price=max_price, min_score=min_buffett_score)
+        found = 0
+        os.makedirs(os.path.dirname(RAW_RESULTS_FILE), exist_ok=True)
+        with pq.ParquetWriter(RAW_RESULTS_FILE, RESULTS_SCHEMA, compression='zstd') as writer, \
+                ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+            rows = []
+            for metrics in tqdm(executor.map(raw_metrics, tickers), total=len(tickers), desc="Fetching"):
                 if metrics:
-                    price_check = True
-                    if min_price is not None and metrics['price'] < min_price:
-                        price_check = False
-                    if max_price is not None and metrics['price'] > max_price:
-                        price_check = False
-                        
-                    if price_check:
-                        results.append(metrics)
-                        batch_count += 1
-            
-            # Show progress
-            print(f"Found {batch_count} matching stocks in this batch ({len(results)} total)")
+                    rows.append(metrics)
+                if len(rows) == WRITE_BATCH_SIZE:
+                    _write_scored(writer, rows)
+                    found += len(rows)
+                    rows = []
+            if rows:
+                _write_scored(writer, rows)
+                found += len(rows)
         
-        # Convert to DataFrame
-        if not results:
+        print(f"Found {found} stocks in the price range able to reach the minimum score")
+        if _STATS['failed']:
+            print(f"Skipped {_STATS['failed']} stocks after errors computing their metrics")
+        
+        if not found:
             return "No value stocks found matching your criteria."
-            
-        stocks_df = pd.DataFrame(results)
         
-        # Filter based on Buffett score
+        # Read back only the stocks meeting the minimum Buffett score; text
+        # columns use Arrow-backed strings, faster than object dtype to format
+        filters = [('buffett_score', '>=', min_buffett_score)] if min_buffett_score is not None else None
+        stocks_df = pq.read_table(RAW_RESULTS_FILE, filters=filters).to_pandas()
+        stocks_df = stocks_df.astype({column: "string[pyarrow]" for column in _TEXT_COLUMNS})
+        
         if min_buffett_score is not None:
-            filtered_df = stocks_df[stocks_df['buffett_score'] >= min_buffett_score]
-            print(f"Filtered to {len(filtered_df)} stocks with Buffett score >= {min_buffett_score}")
-            stocks_df = filtered_df
+            print(f"Filtered to {len(stocks_df)} stocks with Buffett score >= {min_buffett_score}")
             
         if stocks_df.empty:
             return "No stocks matching your value criteria after filtering."
             
-        # Sort by Buffett score (descending)
-        stocks_df = stocks_df.sort_values('buffett_score', ascending=False)
-        
-        # Take top N stocks
-        top_stocks = stocks_df.head(max_stocks)
+        # Take the top N stocks by Buffett score (descending)
+        top_stocks = stocks_df.nlargest(max_stocks, 'buffett_score')
         
         # Show top results
         print("\nTop Value Stocks:")
@@ -383,15 +447,22 @@ def find_value_stocks(max_price=None, min_price=None, min_buffett_score=70, univ
         return memo
         
     except Exception as e:
-        print(f"Error running value screener: {e}")
-        traceback.print_exc()
+        logger.exception("Error running value screener")
         return f"Error: {e}"
+    finally:
+        print(f"Time: {time.perf_counter() - start:.1f}s total, {_STATS['io_s']:.1f}s in requests "
+              f"(summed over threads), {_STATS['compute_s']:.3f}s scoring")
+
+def _formatted(values, template, valid=None):
+    """Format each value with ``template``, or "N/A" where it is missing or not ``valid``"""
+    valid = values.notna() if valid is None else valid & values.notna()
+    return values[valid].map(template.format).reindex(values.index, fill_value="N/A")
 
 def generate_value_memo(stocks_df, buying_power=50000):
     """Generate an investment memo for value stocks"""
     now = datetime.now().strftime("%B %d, %Y")
-    
-    memo = f"""
+
+    parts = [f"""
 # BUFFETT VALUE STOCK RECOMMENDATIONS
 ## Date: {now}
 ## Account Value: ${buying_power:,}
@@ -404,53 +475,59 @@ competitive advantages, and reasonable valuations.
 
 ## TOP VALUE RECOMMENDATIONS:
 
-"""
-    
+"""]
+
+    stocks_df = stocks_df.reset_index(drop=True)
+    price = stocks_df['price']
+
     # For value stocks, position size should be larger for higher conviction (higher scores)
-    total_score = sum(row.buffett_score for row in stocks_df.itertuples())
-    
+    total_score = stocks_df['buffett_score'].sum()
+    if total_score > 0:
+        position_weight = stocks_df['buffett_score'] / total_score
+    else:
+        position_weight = pd.Series(1.0 / len(stocks_df), index=stocks_df.index)
+    position_shares = (buying_power * position_weight / price).where(price > 0, 0).astype(int)
+
+    # Format every metric column at once
+    finite = lambda column: stocks_df[column] != float('inf')
+    pe_ratio = _formatted(stocks_df['pe_ratio'], "{:.1f}", finite('pe_ratio'))
+    pb_ratio = _formatted(stocks_df['pb_ratio'], "{:.1f}", finite('pb_ratio'))
+    roe = _formatted(stocks_df['roe'], "{:.1f}%")
+    fcf_yield = _formatted(stocks_df['free_cash_flow_yield'], "{:.1f}%")
+    market_cap = stocks_df['market_cap']
+    market_cap = pd.Series(np.where(market_cap >= 1000000000,
+                                    "$" + (market_cap / 1000000000).map("{:.2f}".format) + "B",
+                                    "$" + (market_cap / 1000000).map("{:.2f}".format) + "M"),
+                           index=stocks_df.index)
+    rank = pd.Series(range(1, len(stocks_df) + 1), index=stocks_df.index).astype(str)
+
     # Add each stock recommendation
-    for i, row in enumerate(stocks_df.itertuples(), 1):
-        ticker = row.ticker
-        price = row.price
-        
-        # Calculate position based on Buffett score weighting
-        position_weight = row.buffett_score / total_score if total_score > 0 else 1.0 / len(stocks_df)
-        position_dollars = buying_power * position_weight
-        position_shares = int(position_dollars / price) if price > 0 else 0
-        
-        # Format metrics
-        pe_ratio = f"{row.pe_ratio:.1f}" if row.pe_ratio != float('inf') and pd.notna(row.pe_ratio) else "N/A"
-        pb_ratio = f"{row.pb_ratio:.1f}" if row.pb_ratio != float('inf') and pd.notna(row.pb_ratio) else "N/A"
-        roe = f"{row.roe:.1f}%" if pd.notna(row.roe) else "N/A"
-        fcf_yield = f"{row.free_cash_flow_yield:.1f}%" if pd.notna(row.free_cash_flow_yield) else "N/A"
-        market_cap = f"${row.market_cap/1000000000:.2f}B" if row.market_cap >= 1000000000 else f"${row.market_cap/1000000:.2f}M"
-        
-        memo += f"""
-### {i}. {ticker} - {row.name} - Buffett Score: {int(row.buffett_score)}/100
-- Current Price: ${price:.2f}
-- Market Cap: {market_cap}
-- P/E Ratio: {pe_ratio}
-- P/B Ratio: {pb_ratio}
-- Return on Equity: {roe}
-- Free Cash Flow Yield: {fcf_yield}
-- Debt to Equity: {row.debt_to_equity:.2f}
-- Current Ratio: {row.current_ratio:.2f}
-- Sector: {row.sector}
-- Industry: {row.industry}
-
-**Score Breakdown:**
-- Financial Strength: {row.financial_strength_score}/25
-- Profitability: {row.profitability_score}/25
-- Moat/Competitive Advantage: {row.moat_score}/25
-- Valuation: {row.valuation_score}/25
-
-**Suggested Position:** {position_shares} shares (${position_shares * price:,.2f})
-**Portfolio Allocation:** {position_weight*100:.1f}% of capital
-"""
-    
+    recommendations = (
+        "\n### " + rank + ". " + stocks_df['ticker'] + " - " + stocks_df['name'].astype(str)
+        + " - Buffett Score: " + stocks_df['buffett_score'].astype(int).astype(str) + "/100\n"
+        + "- Current Price: $" + price.map("{:.2f}".format) + "\n"
+        + "- Market Cap: " + market_cap + "\n"
+        + "- P/E Ratio: " + pe_ratio + "\n"
+        + "- P/B Ratio: " + pb_ratio + "\n"
+        + "- Return on Equity: " + roe + "\n"
+        + "- Free Cash Flow Yield: " + fcf_yield + "\n"
+        + "- Debt to Equity: " + stocks_df['debt_to_equity'].map("{:.2f}".format) + "\n"
+        + "- Current Ratio: " + stocks_df['current_ratio'].map("{:.2f}".format) + "\n"
+        + "- Sector: " + stocks_df['sector'].astype(str) + "\n"
+        + "- Industry: " + stocks_df['industry'].astype(str) + "\n"
+        + "\n**Score Breakdown:**\n"
+        + "- Financial Strength: " + stocks_df['financial_strength_score'].astype(str) + "/25\n"
+        + "- Profitability: " + stocks_df['profitability_score'].astype(str) + "/25\n"
+        + "- Moat/Competitive Advantage: " + stocks_df['moat_score'].astype(str) + "/25\n"
+        + "- Valuation: " + stocks_df['valuation_score'].astype(str) + "/25\n"
+        + "\n**Suggested Position:** " + position_shares.astype(str)
+        + " shares ($" + (position_shares * price).map("{:,.2f}".format) + ")\n"
+        + "**Portfolio Allocation:** " + (position_weight * 100).map("{:.1f}".format) + "% of capital\n"
+    )
+    parts.append(recommendations.str.cat())
+
     # Add investment rationale
-    memo += f"""
+    parts.append(f"""
 ## INVESTMENT RATIONALE
 
 These value-focused recommendations adhere to Warren Buffett's investment philosophy of buying wonderful companies
@@ -480,8 +557,8 @@ While these stocks exhibit strong Buffett characteristics, maintain prudent risk
 
 Remember that even the best value investments require patience to fully realize their potential.
 
-"""
-    return memo
+""")
+    return ''.join(parts)
 
 if __name__ == "__main__":
     # Parse command-line arguments
@@ -498,9 +575,9 @@ if __name__ == "__main__":
                         help="Maximum number of stocks to return")
     parser.add_argument("--output", type=str, default="value_stocks.md",
                         help="Output file for the investment memo")
-    
+
     args = parser.parse_args()
-    
+
     print(f"Running Buffett Value Stock Screener with the following settings:")
     print(f"Price Range: {'No minimum' if args.min_price is None else '$' + str(args.min_price)} - {'No maximum' if args.max_price is None else '$' + str(args.max_price)}")
     print(f"Minimum Buffett Score: {args.min_buffett}/100")
@@ -508,7 +585,7 @@ if __name__ == "__main__":
     print(f"Maximum Stocks: {args.max_stocks}")
     print(f"Output File: {args.output}")
     print()
-    
+
     # Run the screener
     memo = find_value_stocks(
         max_price=args.max_price,
@@ -517,9 +594,9 @@ if __name__ == "__main__":
         universe=args.universe,
         max_stocks=args.max_stocks
     )
-    
+
     # Save the memo to a file
     with open(args.output, "w") as f:
         f.write(memo)
-    
+
     print(f"\nValue stock recommendations saved to {args.output}") 
\ No newline at end of file
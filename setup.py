@@ -6,10 +6,11 @@ setup(
     packages=find_packages(),
     install_requires=[
         "matplotlib==3.5.3",
-        "pandas==1.5.3",
-        "numpy==1.24.3",
+        "pandas>=2.2,<3",
+        "numpy>=1.26,<2",
+        "pyarrow>=15.0",
         "streamlit==1.29.0",
         "yfinance==0.2.35",
     ],
-    python_requires=">=3.9,<3.10",
+    python_requires=">=3.9",
 ) 
\ No newline at end of file
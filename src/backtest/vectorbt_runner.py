@@ -5,13 +5,23 @@ import os
 import time
 import numpy as np
 import pandas as pd
-import vectorbt as vbt
-from typing import Dict
-import yfinance as yf
+from typing import Dict, Optional, Tuple
 from datetime import datetime
 
+from src.data.yf_util import get_ticker
+from src.technical.core import rolling_mean
+from src.utils.jit import njit, NUMBA_AVAILABLE
+
 REPORTS_DIR = "reports"
-os.makedirs(REPORTS_DIR, exist_ok=True)
+
+def _vbt():
+    """Import vectorbt on first use; it is slow to import and only needed to simulate."""
+    import vectorbt as vbt
+    return vbt
+
+def _plot_enabled() -> bool:
+    """Whether backtests write figures by default (set BACKTEST_PLOT=1 to enable)."""
+    return os.environ.get('BACKTEST_PLOT', '').lower() in ('1', 'true', 'yes')
 
 def download_with_retry(symbol: str, start: str, end: str, max_retries: int = 3, delay: int = 2) -> pd.DataFrame:
     """
@@ -42,8 +52,8 @@ def download_with_retry(symbol: str, start: str, end: str, max_retries: int = 3,
     """
     for attempt in range(max_retries):
         try:
-            # Use Ticker class instead of download function
-            ticker = yf.Ticker(symbol)
+            # Use Ticker class instead of download function; retries reuse it
+            ticker = get_ticker(symbol)
             df = ticker.history(start=start, end=end, interval="1d")
             
             if df.empty:
@@ -72,6 +82,87 @@ def download_with_retry(symbol: str, start: str, end: str, max_retries: int = 3,
             else:
                 raise RuntimeError(f"Failed to download data for {symbol} after {max_retries} attempts: {str(e)}")
 
+@njit(cache=True)
+def _rolling_mean_nb(values: np.ndarray, window: int) -> np.ndarray:
+    """Rolling mean over full windows (NaN otherwise), from a running sum."""
+    out = np.full(len(values), np.nan)
+    total = 0.0
+    nans = 0
+    for i in range(len(values)):
+        # Add the value entering the window
+        if np.isnan(values[i]):
+            nans += 1
+        else:
+            total += values[i]
+        # Subtract the one leaving it
+        if i >= window:
+            if np.isnan(values[i - window]):
+                nans -= 1
+            else:
+                total -= values[i - window]
+        if i >= window - 1 and nans == 0:
+            out[i] = total / window
+    return out
+
+
+# fastmath is left off: it assumes no NaNs, and NaN marks warm-up periods
+@njit(cache=True)
+def _build_signals_nb(close: np.ndarray, high: np.ndarray, low: np.ndarray, score: np.ndarray,
+                      thr: float) -> Tuple[np.ndarray, ...]:
+    """
+    Compute the SMA-200, ATR-14, entry price, ATR stop and entry/exit signals in one pass.
+
+    Returns ``(sma_200, atr, entry_price, atr_stop, entry, exit_sma, exit_atr)``.
+    """
+    n = len(close)
+    sma_200 = _rolling_mean_nb(close, 200)
+
+    # True range; the first row has no previous close, so it is high - low
+    tr = np.empty(n)
+    for i in range(n):
+        tr[i] = high[i] - low[i]
+        if i > 0:
+            tr[i] = max(tr[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+    atr = _rolling_mean_nb(tr, 14)
+
+    entry_price = np.empty(n)
+    atr_stop = np.empty(n)
+    entry = np.empty(n, dtype=np.bool_)
+    exit_sma = np.empty(n, dtype=np.bool_)
+    exit_atr = np.empty(n, dtype=np.bool_)
+    carry = np.nan  # forward-filled price of the latest entry signal
+    for i in range(n):
+        entry[i] = score[i] >= thr and close[i] > sma_200[i]
+        exit_sma[i] = close[i] < sma_200[i]
+        if entry[i]:
+            carry = close[i]
+        entry_price[i] = carry
+        # ATR stop: exit if close < entry - n*ATR (n=2)
+        atr_stop[i] = carry - 2 * atr[i]
+        exit_atr[i] = close[i] < atr_stop[i]
+    return sma_200, atr, entry_price, atr_stop, entry, exit_sma, exit_atr
+
+
+def _build_signals_np(close: np.ndarray, high: np.ndarray, low: np.ndarray, score: np.ndarray,
+                      thr: float) -> Tuple[np.ndarray, ...]:
+    """Array version of :func:`_build_signals_nb`, used when numba is not installed."""
+    sma_200 = rolling_mean(close, 200)
+    prev_close = np.concatenate(([np.nan], close[:-1]))
+    tr = np.fmax.reduce([high - low, np.abs(high - prev_close), np.abs(low - prev_close)])
+    atr = rolling_mean(tr, 14)
+
+    with np.errstate(invalid='ignore'):
+        entry = (score >= thr) & (close > sma_200)
+        exit_sma = close < sma_200
+    # Forward-fill the close of the latest entry signal
+    last_entry = np.maximum.accumulate(np.where(entry, np.arange(len(close)), -1))
+    entry_price = np.where(last_entry >= 0, close[np.maximum(last_entry, 0)], np.nan)
+    atr_stop = entry_price - 2 * atr
+    with np.errstate(invalid='ignore'):
+        exit_atr = close < atr_stop
+    return sma_200, atr, entry_price, atr_stop, entry, exit_sma, exit_atr
+
+
 def build_factor_df(df: pd.DataFrame, score_col: str = 'score', thr: int = 7) -> pd.DataFrame:
     """
     Add entry/exit signals to the DataFrame based on score and SMA-200.
@@ -79,16 +170,22 @@ def build_factor_df(df: pd.DataFrame, score_col: str = 'score', thr: int = 7) ->
     Exit: close < SMA200 or ATR stop
     """
     df = df.copy()
-    df['sma_200'] = vbt.MA.run(df['close'], window=200).ma
-    df['atr'] = vbt.ATR.run(df['high'], df['low'], df['close'], window=14).atr
-    df['entry'] = (df[score_col] >= thr) & (df['close'] > df['sma_200'])
-    df['exit_sma'] = df['close'] < df['sma_200']
-    # ATR stop: exit if close < entry - n*ATR (n=2)
-    df['entry_price'] = np.where(df['entry'], df['close'], np.nan)
-    df['entry_price'] = pd.Series(df['entry_price']).ffill()
-    df['atr_stop'] = df['entry_price'] - 2 * df['atr']
-    df['exit_atr'] = df['close'] < df['atr_stop']
-    df['exit'] = df['exit_sma'] | df['exit_atr']
+    build_signals = _build_signals_nb if NUMBA_AVAILABLE else _build_signals_np
+    sma_200, atr, entry_price, atr_stop, entry, exit_sma, exit_atr = build_signals(
+        df['close'].to_numpy(dtype=np.float64),
+        df['high'].to_numpy(dtype=np.float64),
+        df['low'].to_numpy(dtype=np.float64),
+        df[score_col].to_numpy(dtype=np.float64),
+        float(thr)
+    )
+    df['sma_200'] = sma_200
+    df['atr'] = atr
+    df['entry'] = entry
+    df['exit_sma'] = exit_sma
+    df['entry_price'] = entry_price
+    df['atr_stop'] = atr_stop
+    df['exit_atr'] = exit_atr
+    df['exit'] = exit_sma | exit_atr
     return df
 
 def backtest(
@@ -99,18 +196,22 @@ def backtest(
     score_col: str = 'score',
     thr: int = 7,
     symbol: str = 'AAPL',
-    plot: bool = True
+    plot: Optional[bool] = None
 ) -> Dict:
     """
     Run vectorbt backtest for the given DataFrame and parameters.
     Returns dict with total return, max drawdown, sharpe, and figure path.
+
+    The figure is only written when ``plot`` is true (by default, when the
+    BACKTEST_PLOT environment variable is set), as interactive HTML rather
+    than a Kaleido-rendered PNG.
     """
     df = df.loc[start:end].copy()
     factor_df = build_factor_df(df, score_col=score_col, thr=thr)
     entries = factor_df['entry']
     exits = factor_df['exit']
     price = factor_df['close']
-    pf = vbt.Portfolio.from_signals(
+    pf = _vbt().Portfolio.from_signals(
         price,
         entries,
         exits,
@@ -127,11 +228,95 @@ def backtest(
     total_return = stats['Total Return [%]']
     max_dd = stats['Max Drawdown [%]']
     sharpe = stats['Sharpe Ratio']
-    fig_path = os.path.join(REPORTS_DIR, f"{symbol}_{start}_{end}_bt.png")
-    if plot:
-        pf.plot().write_image(fig_path)
+    fig_path = os.path.join(REPORTS_DIR, f"{symbol}_{start}_{end}_bt.html")
+    if plot if plot is not None else _plot_enabled():
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        pf.plot().write_html(fig_path)
     return dict(total_return=total_return, max_dd=max_dd, sharpe=sharpe, fig_path=fig_path)
 
+def build_factor_frames(
+    dfs: Dict[str, pd.DataFrame],
+    score_col: str = 'score',
+    thr: int = 7
+) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Build wide close, entry and exit frames (one column per symbol) for backtest_multi.
+
+    Parameters
+    ----------
+    dfs : dict
+        Mapping of symbol to its OHLCV + score DataFrame, as for build_factor_df
+    score_col : str, default 'score'
+        Column holding the factor score
+    thr : int, default 7
+        Minimum score for an entry
+
+    Returns
+    -------
+    tuple of pd.DataFrame
+        Close prices, entry signals and exit signals, aligned on the union of dates
+    """
+    factors = {symbol: build_factor_df(df, score_col=score_col, thr=thr) for symbol, df in dfs.items()}
+    close = pd.DataFrame({symbol: factor['close'] for symbol, factor in factors.items()})
+    entries = pd.DataFrame({symbol: factor['entry'] for symbol, factor in factors.items()})
+    exits = pd.DataFrame({symbol: factor['exit'] for symbol, factor in factors.items()})
+    return close, entries.fillna(False).astype(bool), exits.fillna(False).astype(bool)
+
+def backtest_multi(
+    close_df: pd.DataFrame,
+    entries_df: pd.DataFrame,
+    exits_df: pd.DataFrame,
+    cash: float = 100_000,
+    plot_top: int = 0
+) -> pd.DataFrame:
+    """
+    Run one vectorbt simulation across many symbols at once.
+
+    Each column of the wide frames is a symbol with its own starting cash,
+    so the result matches calling backtest() per symbol without the
+    per-call Portfolio setup.
+
+    Parameters
+    ----------
+    close_df, entries_df, exits_df : pd.DataFrame
+        Close prices and boolean entry/exit signals, one column per symbol
+    cash : float, default 100_000
+        Starting cash for each symbol
+    plot_top : int, default 0
+        Write HTML figures to REPORTS_DIR for this many symbols with the
+        highest Sharpe ratio
+
+    Returns
+    -------
+    pd.DataFrame
+        total_return, max_dd and sharpe for each symbol
+    """
+    pf = _vbt().Portfolio.from_signals(
+        close_df,
+        entries_df,
+        exits_df,
+        init_cash=cash,
+        fees=0.001,
+        slippage=0.001,
+        direction='longonly',
+        freq='1D',
+        accumulate=True
+    )
+    stats = pf.stats(agg_func=None)
+    if isinstance(stats, pd.Series):  # A single column comes back as a Series
+        stats = stats.to_frame(close_df.columns[0]).T
+    results = pd.DataFrame({
+        'total_return': stats['Total Return [%]'],
+        'max_dd': stats['Max Drawdown [%]'],
+        'sharpe': stats['Sharpe Ratio']
+    })
+    top = results['sharpe'].nlargest(plot_top).index
+    if len(top):
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+    for symbol in top:
+        pf[symbol].plot().write_html(os.path.join(REPORTS_DIR, f"{symbol}_bt.html"))
+    return results
+
 # Smoke test: AAPL 2015-2020
 def _smoke_test():
     try:
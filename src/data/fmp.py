@@ -3,10 +3,36 @@ Financial Modeling Prep (FMP) API client for fetching fundamental data.
 Includes caching and retry logic for efficient and reliable data retrieval.
 """
 import os
-import time
+import logging
 import requests
 import requests_cache
-from typing import Dict, Any
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterable
+
+logger = logging.getLogger(__name__)
+
+# Number of FMP requests made concurrently by fetch_fundamentals_many
+FETCH_WORKERS = 16
+
+# Number of retries for rate-limited (429) and unavailable (502/503) responses
+MAX_RETRIES = 3
+
+# One cached session for the module: the SQLite cache is opened once, the
+# global requests module is left unpatched, and connections are kept alive
+# across tickers
+_SESSION = requests_cache.CachedSession(
+    'fmp_cache.sqlite',
+    backend='sqlite',
+    expire_after=86400  # 24 hours in seconds
+)
+_SESSION.mount('https://', HTTPAdapter(max_retries=Retry(
+    total=MAX_RETRIES,
+    backoff_factor=0.5,
+    status_forcelist=[429, 502, 503],
+    allowed_methods=['GET']
+)))
 
 
 def fetch_fundamentals(ticker: str, years: int = 10) -> Dict[str, Any]:
@@ -23,13 +49,6 @@ def fetch_fundamentals(ticker: str, years: int = 10) -> Dict[str, Any]:
     Raises:
         RuntimeError: If API calls fail after retries or if ticker is invalid
     """
-    # Initialize cache
-    requests_cache.install_cache(
-        'fmp_cache.sqlite',
-        backend='sqlite',
-        expire_after=86400  # 24 hours in seconds
-    )
-    
     # Get API key from environment
     api_key = os.environ.get('FMP_KEY')
     if not api_key:
@@ -42,41 +61,55 @@ def fetch_fundamentals(ticker: str, years: int = 10) -> Dict[str, Any]:
         'limit': years  # Get data for the specified number of years
     }
     
-    # Retry logic
-    max_retries = 3
-    retry_count = 0
+    # Rate limits and transient errors are retried with backoff by the session
+    try:
+        response = _SESSION.get(url, params=params, timeout=10)
+        response.raise_for_status()
+        data = response.json()
+    except requests.exceptions.RetryError as e:
+        raise RuntimeError(f"Rate limit exceeded after {MAX_RETRIES} retries") from e
+    except requests.exceptions.RequestException as e:
+        raise RuntimeError(f"Failed to fetch data for {ticker}: {str(e)}") from e
+    
+    # Validate response
+    if not data:
+        raise RuntimeError(f"No data found for ticker: {ticker}")
+        
+    return data
+
+
+def fetch_fundamentals_many(tickers: Iterable[str], years: int = 10,
+                            max_workers: int = FETCH_WORKERS) -> Dict[str, Any]:
+    """
+    Fetch fundamental ratios for several tickers concurrently.
+    
+    Requests share the module's cached session, so cached tickers are
+    served from disk and the rest reuse open connections.
+    
+    Args:
+        tickers: Stock ticker symbols
+        years: Number of years of data to retrieve (default: 10)
+        max_workers: Number of requests in flight at once (default: 16)
+    
+    Returns:
+        Dictionary mapping each ticker to its fundamental data. Tickers
+        whose request failed are logged and left out.
+    
+    Raises:
+        RuntimeError: If the FMP_KEY environment variable is not set
+    """
+    if not os.environ.get('FMP_KEY'):
+        raise RuntimeError("FMP_KEY environment variable not set")
+    tickers = list(tickers)
+    if not tickers:
+        return {}
     
-    while retry_count < max_retries:
+    def fetch(ticker):
         try:
-            response = requests.get(url, params=params)
-            
-            # Check for rate limiting
-            if response.status_code == 429:
-                retry_count += 1
-                if retry_count < max_retries:
-                    time.sleep(2)  # Sleep for 2 seconds before retrying
-                    continue
-                else:
-                    raise RuntimeError(f"Rate limit exceeded after {max_retries} retries")
-            
-            # Check for other errors
-            response.raise_for_status()
-            
-            # Parse response
-            data = response.json()
-            
-            # Validate response
-            if not data:
-                raise RuntimeError(f"No data found for ticker: {ticker}")
-                
-            return data
-            
-        except requests.exceptions.RequestException as e:
-            retry_count += 1
-            if retry_count < max_retries:
-                time.sleep(2)
-            else:
-                raise RuntimeError(f"Failed to fetch data for {ticker}: {str(e)}")
+            return ticker, fetch_fundamentals(ticker, years)
+        except RuntimeError as e:
+            logger.warning(f"Skipping {ticker}: {e}")
+            return ticker, None
     
-    # This should never be reached due to the logic above
-    raise RuntimeError("Unexpected error in fetch_fundamentals") 
\ No newline at end of file
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(tickers))) as executor:
+        return {ticker: data for ticker, data in executor.map(fetch, tickers) if data is not None}
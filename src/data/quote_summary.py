@@ -0,0 +1,241 @@
+"""
+Yahoo Finance quoteSummary client.
+
+Fetches the handful of fields the screeners use straight from Yahoo's
+quoteSummary endpoint, one JSON request per ticker, instead of going
+through ``yf.Ticker.info`` and its several scraping passes.
+"""
+import logging
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Optional
+
+import requests
+
+__all__ = ["fetch_quote_summary", "fetch_market_caps", "fetch_last_prices", "fetch_quotes",
+           "QUOTE_SUMMARY_MODULES"]
+
+logger = logging.getLogger(__name__)
+
+QUOTE_SUMMARY_URL = "https://query2.finance.yahoo.com/v10/finance/quoteSummary/{ticker}"
+QUOTE_URL = "https://query2.finance.yahoo.com/v7/finance/quote"
+CRUMB_URL = "https://query2.finance.yahoo.com/v1/test/getcrumb"
+COOKIE_URL = "https://fc.yahoo.com"
+
+# price carries shortName and regularMarketPrice, which the other modules lack
+QUOTE_SUMMARY_MODULES = "price,assetProfile,summaryDetail,defaultKeyStatistics,financialData"
+
+# Symbols per batch quote request
+QUOTE_BATCH_SIZE = 200
+
+# Tries per batch quote request before its symbols are given up on
+QUOTE_BATCH_ATTEMPTS = 2
+
+# Crumb of each session, valid for as long as the session keeps its cookie
+_CRUMBS = weakref.WeakKeyDictionary()
+_crumbs_lock = threading.Lock()
+
+
+def fetch_quote_summary(tickers: Iterable[str], session: Optional[requests.Session] = None,
+                        max_workers: int = 16) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch quoteSummary data for several tickers.
+
+    The modules of each response are flattened into a single dict keyed
+    like ``yf.Ticker.info`` (``shortName``, ``marketCap``, ``sector``,
+    ``revenueGrowth``, ...) with raw numeric values.
+
+    Parameters
+    ----------
+    tickers : iterable of str
+        Stock ticker symbols
+    session : requests.Session, optional
+        HTTP session shared by all requests so connections are reused
+    max_workers : int
+        Number of requests made concurrently
+
+    Returns
+    -------
+    dict
+        Mapping of ticker to its flattened fields. Tickers whose request
+        failed are left out, so callers can fall back to ``yf.Ticker.info``.
+    """
+    tickers = list(tickers)
+    if not tickers:
+        return {}
+    session = session or requests.Session()
+    crumb = _crumb(session)
+
+    def fetch(ticker):
+        return ticker, _fetch_one(ticker, session, crumb)
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(tickers))) as executor:
+        return {ticker: info for ticker, info in executor.map(fetch, tickers) if info}
+
+
+def fetch_market_caps(tickers: Iterable[str], session: Optional[requests.Session] = None) -> Dict[str, float]:
+    """
+    Fetch market capitalizations for many tickers with batch quote requests.
+    
+    Only the ``marketCap`` field is requested, ``QUOTE_BATCH_SIZE`` symbols
+    per request, so this is far cheaper than a quoteSummary per ticker.
+    
+    Parameters
+    ----------
+    tickers : iterable of str
+        Stock ticker symbols
+    session : requests.Session, optional
+        HTTP session shared by all requests so connections are reused
+        
+    Returns
+    -------
+    dict
+        Mapping of ticker to market cap. Tickers without one, or in a
+        failed request, are left out.
+    """
+    return _fetch_quote_field(tickers, 'marketCap', session)
+
+
+def fetch_last_prices(tickers: Iterable[str], session: Optional[requests.Session] = None) -> Dict[str, float]:
+    """
+    Fetch the latest market price of many tickers with batch quote requests.
+    
+    Like :func:`fetch_market_caps`, with ``regularMarketPrice`` as the field.
+    
+    Parameters
+    ----------
+    tickers : iterable of str
+        Stock ticker symbols
+    session : requests.Session, optional
+        HTTP session shared by all requests so connections are reused
+        
+    Returns
+    -------
+    dict
+        Mapping of ticker to price. Tickers without one, or in a failed
+        request, are left out.
+    """
+    return _fetch_quote_field(tickers, 'regularMarketPrice', session)
+
+
+def fetch_quotes(tickers: Iterable[str], fields: Iterable[str],
+                 session: Optional[requests.Session] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch quote fields for many tickers with batch quote requests.
+    
+    Only the given fields are requested, ``QUOTE_BATCH_SIZE`` symbols per
+    request, with the crumb Yahoo requires.
+    
+    Parameters
+    ----------
+    tickers : iterable of str
+        Stock ticker symbols
+    fields : iterable of str
+        Quote fields to request, e.g. ``marketCap`` or ``shortName``
+    session : requests.Session, optional
+        HTTP session shared by all requests so connections are reused
+        
+    Returns
+    -------
+    dict
+        Mapping of ticker to its quote record. Tickers in a failed request
+        are left out, so callers can fall back to ``yf.Ticker.info``.
+    """
+    tickers = list(tickers)
+    if not tickers:
+        return {}
+    session = session or requests.Session()
+    crumb = _crumb(session)
+    fields = ','.join(fields)
+
+    quotes = {}
+    for i in range(0, len(tickers), QUOTE_BATCH_SIZE):
+        chunk = tickers[i:i + QUOTE_BATCH_SIZE]
+        for attempt in range(QUOTE_BATCH_ATTEMPTS):
+            params = {'symbols': ','.join(chunk), 'fields': fields}
+            if crumb:
+                params['crumb'] = crumb
+            try:
+                response = session.get(QUOTE_URL, params=params, timeout=10)
+                response.raise_for_status()
+                results = response.json()['quoteResponse']['result']
+                break
+            except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+                error = e
+                # The cached crumb may have expired, so retry with a new one
+                crumb = _crumb(session, refresh=True)
+        else:
+            logger.warning(f"Batch quote request for {len(chunk)} symbols failed "
+                           f"after {QUOTE_BATCH_ATTEMPTS} tries: {error}")
+            continue
+        for quote in results:
+            quotes[quote['symbol']] = quote
+    return quotes
+
+
+def _fetch_quote_field(tickers: Iterable[str], field: str, session: Optional[requests.Session]) -> Dict[str, float]:
+    """Fetch one numeric quote field for many tickers, leaving out those without it."""
+    quotes = fetch_quotes(tickers, [field], session)
+    return {ticker: quote[field] for ticker, quote in quotes.items() if quote.get(field)}
+
+
+def _fetch_one(ticker: str, session: requests.Session, crumb: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Fetch and flatten the quoteSummary modules for one ticker, or None on failure."""
+    params = {'modules': QUOTE_SUMMARY_MODULES}
+    if crumb:
+        params['crumb'] = crumb
+    try:
+        response = session.get(QUOTE_SUMMARY_URL.format(ticker=ticker), params=params, timeout=10)
+        response.raise_for_status()
+        result = response.json()['quoteSummary']['result']
+    except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+        logger.debug(f"quoteSummary request for {ticker} failed: {e}")
+        return None
+    if not result:
+        return None
+
+    info = {}
+    for module in result[0].values():
+        if not isinstance(module, dict):
+            continue
+        for key, value in module.items():
+            # Numbers come as {"raw": ..., "fmt": ...}; missing ones as {}
+            if isinstance(value, dict):
+                value = value.get('raw')
+            # A module missing a field mustn't hide another module's value for it
+            if value is not None:
+                info.setdefault(key, value)
+    return info
+
+
+def _crumb(session: requests.Session, refresh: bool = False) -> Optional[str]:
+    """Get the crumb Yahoo requires alongside its consent cookie, or None.
+    
+    The crumb is fetched once per session and reused, unless ``refresh``
+    is set. A failed fetch isn't cached, so the next call tries again.
+    """
+    with _crumbs_lock:
+        crumb = None if refresh else _CRUMBS.get(session)
+    if crumb:
+        return crumb
+    crumb = _fetch_crumb(session)
+    if crumb:
+        with _crumbs_lock:
+            _CRUMBS[session] = crumb
+    return crumb
+
+
+def _fetch_crumb(session: requests.Session) -> Optional[str]:
+    """Request a new consent cookie and crumb for the session, or None."""
+    try:
+        session.get(COOKIE_URL, timeout=10)
+    except requests.RequestException:
+        pass  # The cookie is set even when this page returns an error status
+    try:
+        response = session.get(CRUMB_URL, timeout=10)
+        response.raise_for_status()
+        return response.text.strip() or None
+    except requests.RequestException as e:
+        logger.debug(f"Could not get a Yahoo crumb: {e}")
+        return None
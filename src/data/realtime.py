@@ -5,11 +5,33 @@ Provides 1-minute bars for stock tickers with auto-reconnect capability.
 import os
 import json
 import time
+import queue
+import random
+import asyncio
+import operator
 import logging
-import websocket
+import threading
+import aiohttp
+import pandas as pd
 import yfinance as yf
+from dateutil.tz import tzlocal
 from datetime import datetime, timedelta
-from typing import Dict, List, Generator, Any, Optional
+from functools import partial
+from typing import List, Generator, AsyncGenerator, Any, NamedTuple, Optional, Set, Union
+
+from src.utils.yf_cache import history_slice
+from src.utils.yf_session import SESSION
+
+try:
+    import orjson
+    json_loads = orjson.loads
+
+    def json_dumps(obj: Any) -> str:
+        """Serialize to a JSON string with orjson."""
+        return orjson.dumps(obj).decode()
+except ImportError:  # pragma: no cover - orjson is optional
+    json_loads = json.loads
+    json_dumps = json.dumps
 
 # Configure logging
 logging.basicConfig(
@@ -18,32 +40,101 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+ALPACA_STREAM_URL = "wss://stream.data.alpaca.markets/v2/iex"
+
+# Reconnect backoff in seconds: a random delay up to BACKOFF_BASE * 2**attempt,
+# capped at BACKOFF_CAP, so clients dropped together don't reconnect together
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+
+# Seconds between Yahoo Finance fallback polls
+YAHOO_POLL_INTERVAL = 60
+
+# Batches buffered between the stream thread and a synchronous consumer; when
+# full the oldest is dropped so a slow consumer sees the most recent prices
+BATCH_QUEUE_SIZE = 1000
+
+# Stop events of the running streams, all set by shutdown()
+_stop_events: Set[threading.Event] = set()
+_stop_lock = threading.Lock()
 
-def connect_alpaca_websocket(tickers: List[str], retries: int = 3) -> Generator[Dict[str, Any], None, None]:
+# Timestamp (ns), symbol, close and volume of an Alpaca bar, in one call
+_bar_fields = operator.itemgetter('t', 'S', 'c', 'v')
+
+
+class Bar(NamedTuple):
+    """A 1-minute bar; a tuple is far smaller and cheaper to build than a dict."""
+    ts: Union[datetime, int]  # Local datetime, or nanoseconds since the epoch
+    symbol: str
+    price: float  # Closing price
+    volume: int
+
+
+async def connect_alpaca_websocket_batches_async(tickers: List[str], retries: int = 3,
+                                                 as_datetime: bool = True) -> AsyncGenerator[List[Bar], None]:
     """
-    Connect to Alpaca websocket API and stream 1-minute bars.
+    Connect to Alpaca websocket API and stream 1-minute bars in batches.
     Auto-reconnects on disconnection.
     
+    Messages are read on the event loop as they arrive, without a separate
+    websocket thread or polling. Each message's bars are yielded together,
+    with their timestamps converted in one vectorized call per batch.
+    
     Args:
         tickers: List of ticker symbols to stream
         retries: Number of connection retry attempts before raising error
+        as_datetime: Give each bar a datetime ts (the default), or leave
+            Alpaca's integer nanoseconds there
     
     Yields:
-        Dictionary with timestamp, symbol, price, and volume data
+        List of Bar records with timestamp, symbol, price, and volume data
     
     Raises:
         RuntimeError: If connection fails after specified retries
     """
+    stop = threading.Event()
+    with _stop_lock:
+        _stop_events.add(stop)
+    try:
+        async for batch in _stream_batches(tickers, retries, as_datetime, stop):
+            yield batch
+    finally:
+        stop.set()  # Wakes a Yahoo fallback thread waiting for its next poll
+        with _stop_lock:
+            _stop_events.discard(stop)
+
+
+def shutdown() -> None:
+    """
+    Stop every running stream.
+    
+    Streams waiting to reconnect or for their next Yahoo Finance poll end at
+    once; connected ones end with the next message they receive.
+    """
+    with _stop_lock:
+        for stop in _stop_events:
+            stop.set()
+
+
+async def _stream_batches(tickers: List[str], retries: int, as_datetime: bool,
+                          stop: threading.Event) -> AsyncGenerator[List[Bar], None]:
+    """Body of :func:`connect_alpaca_websocket_batches_async`, ending early once stop is set."""
     # Get API credentials from environment
     api_key = os.environ.get('ALPACA_API_KEY')
     api_secret = os.environ.get('ALPACA_API_SECRET')
     
     if not api_key or not api_secret:
         logger.warning("Alpaca API credentials not found. Falling back to Yahoo Finance.")
-        yield from _fallback_to_yahoo(tickers)
+        async for batch in _fallback_batches(tickers, as_datetime, stop):
+            yield batch
         return
     
-    # Prepare subscription message
+    # Prepare authentication and subscription messages
+    auth_msg = {
+        "action": "auth",
+        "key": api_key,
+        "secret": api_secret
+    }
     subscription_msg = {
         "action": "subscribe",
         "bars": tickers
@@ -53,85 +144,185 @@ def connect_alpaca_websocket(tickers: List[str], retries: int = 3) -> Generator[
     attempt = 0
     last_reconnect_time = None
     
-    while attempt <= retries:
-        try:
-            # Create websocket connection
-            ws = websocket.WebSocketApp(
-                "wss://stream.data.alpaca.markets/v2/iex",
-                on_open=lambda ws: _on_open(ws, subscription_msg, api_key, api_secret),
-                on_message=lambda ws, msg: _process_message(ws, msg),
-                on_error=lambda ws, error: logger.error(f"WebSocket error: {error}"),
-                on_close=lambda ws, close_status_code, close_msg: logger.info("WebSocket connection closed")
-            )
-            
-            # Store message queue for yielding
-            ws.message_queue = []
-            
-            # Start websocket in a separate thread
-            ws_thread = websocket.WebSocketApp.run_forever
-            
-            # Start the connection
-            logger.info(f"Connecting to Alpaca WebSocket (attempt {attempt+1}/{retries+1})...")
-            ws_thread(ws)
-            
-            # Process messages while connected
-            while ws.sock and ws.sock.connected:
-                if ws.message_queue:
-                    yield ws.message_queue.pop(0)
-                else:
-                    time.sleep(0.1)
-            
-            # If we reach here, the connection was closed
-            logger.warning("WebSocket connection lost. Attempting to reconnect...")
-            
-            # Implement exponential backoff for reconnection
-            current_time = time.time()
-            if last_reconnect_time and (current_time - last_reconnect_time) < 60:
-                backoff = min(2 ** attempt, 30)  # Max 30 seconds backoff
-                logger.info(f"Backing off for {backoff} seconds before reconnecting...")
-                time.sleep(backoff)
-            
-            last_reconnect_time = time.time()
-            attempt += 1
-            
-        except Exception as e:
-            logger.error(f"Error in WebSocket connection: {e}")
-            attempt += 1
-            
-            if attempt > retries:
-                logger.error(f"Failed to connect after {retries} attempts. Falling back to Yahoo Finance.")
-                yield from _fallback_to_yahoo(tickers)
-                return
-            
-            time.sleep(2)
+    async with aiohttp.ClientSession() as session:
+        while attempt <= retries:
+            try:
+                logger.info(f"Connecting to Alpaca WebSocket (attempt {attempt+1}/{retries+1})...")
+                async with session.ws_connect(ALPACA_STREAM_URL, heartbeat=30) as ws:
+                    logger.info("WebSocket connection established")
+                    await ws.send_json(auth_msg, dumps=json_dumps)
+                    logger.info("Authentication message sent")
+                    await ws.send_json(subscription_msg, dumps=json_dumps)
+                    logger.info(f"Subscribed to {len(tickers)} tickers")
+                    
+                    # Yield bars as each message arrives, until the connection closes
+                    async for msg in ws:
+                        if stop.is_set():
+                            return
+                        if msg.type == aiohttp.WSMsgType.ERROR:
+                            logger.error(f"WebSocket error: {ws.exception()}")
+                            break
+                        if msg.type != aiohttp.WSMsgType.TEXT:
+                            continue
+                        batch = _process_message(msg.data)
+                        if batch:
+                            # A working connection clears the backoff from earlier failures
+                            attempt = 0
+                            yield _with_datetimes(batch) if as_datetime else batch
+                
+                # If we reach here, the connection was closed
+                logger.warning("WebSocket connection lost. Attempting to reconnect...")
+                
+                # Implement exponential backoff with full jitter for reconnection
+                current_time = time.time()
+                if last_reconnect_time and (current_time - last_reconnect_time) < 60:
+                    backoff = _backoff(attempt)
+                    logger.info(f"Backing off for {backoff:.1f} seconds before reconnecting...")
+                    if await _wait(stop, backoff):
+                        return
+                
+                last_reconnect_time = time.time()
+                attempt += 1
+                
+            except Exception as e:
+                logger.error(f"Error in WebSocket connection: {e}")
+                attempt += 1
+                
+                if attempt > retries:
+                    logger.error(f"Failed to connect after {retries} attempts. Falling back to Yahoo Finance.")
+                    async for batch in _fallback_batches(tickers, as_datetime, stop):
+                        yield batch
+                    return
+                
+                if await _wait(stop, 2):
+                    return
     
     # If we've exhausted retries, raise an error
     raise RuntimeError(f"Failed to maintain Alpaca WebSocket connection after {retries} attempts")
 
 
-def _on_open(ws, subscription_msg, api_key, api_secret):
-    """Handle WebSocket open event and authenticate."""
-    logger.info("WebSocket connection established")
+async def connect_alpaca_websocket_async(tickers: List[str], retries: int = 3,
+                                         as_datetime: bool = True) -> AsyncGenerator[Bar, None]:
+    """
+    Connect to Alpaca websocket API and stream 1-minute bars one at a time.
     
-    # Send authentication message
-    auth_msg = {
-        "action": "auth",
-        "key": api_key,
-        "secret": api_secret
-    }
+    Flattens :func:`connect_alpaca_websocket_batches_async`.
+    
+    Args:
+        tickers: List of ticker symbols to stream
+        retries: Number of connection retry attempts before raising error
+        as_datetime: Give each bar a datetime ts (the default), or leave
+            Alpaca's integer nanoseconds there
+    
+    Yields:
+        Bar record with timestamp, symbol, price, and volume data
+    
+    Raises:
+        RuntimeError: If connection fails after specified retries
+    """
+    async for batch in connect_alpaca_websocket_batches_async(tickers, retries, as_datetime):
+        for bar in batch:
+            yield bar
+
+
+def connect_alpaca_websocket(tickers: List[str], retries: int = 3,
+                             as_datetime: bool = True) -> Generator[Bar, None, None]:
+    """
+    Synchronous wrapper around :func:`connect_alpaca_websocket_batches_async`.
     
-    ws.send(json.dumps(auth_msg))
-    logger.info("Authentication message sent")
+    Runs the async stream on a private event loop in a daemon thread, which
+    keeps reading the websocket into a queue while the caller works through
+    earlier bars, so a slow caller never stalls the connection. The queue
+    holds BATCH_QUEUE_SIZE batches; past that the oldest are dropped.
+    
+    Args:
+        tickers: List of ticker symbols to stream
+        retries: Number of connection retry attempts before raising error
+        as_datetime: Give each bar a datetime ts (the default), or leave
+            Alpaca's integer nanoseconds there
+    
+    Yields:
+        Bar record with timestamp, symbol, price, and volume data
+    
+    Raises:
+        RuntimeError: If connection fails after specified retries
+    """
+    batches: queue.Queue = queue.Queue(maxsize=BATCH_QUEUE_SIZE)
+    loop = asyncio.new_event_loop()
+    pump = loop.create_task(_pump(connect_alpaca_websocket_batches_async(tickers, retries, as_datetime), batches))
+    thread = threading.Thread(target=partial(_run_pump, loop=loop, pump=pump), name="alpaca-stream", daemon=True)
+    thread.start()
+    try:
+        while True:
+            batch = batches.get()
+            if batch is None:
+                return
+            if isinstance(batch, Exception):
+                raise batch
+            yield from batch
+    finally:
+        loop.call_soon_threadsafe(pump.cancel)
+        thread.join()
+        loop.close()
+
+
+def _run_pump(*, loop: asyncio.AbstractEventLoop, pump: asyncio.Task) -> None:
+    """Run the pump task on its event loop until it finishes or the caller cancels it."""
+    try:
+        loop.run_until_complete(pump)
+    except asyncio.CancelledError:
+        pass  # The caller closed the stream
+
+
+async def _pump(stream: AsyncGenerator[List[Bar], None], batches: queue.Queue) -> None:
+    """Put each batch of the stream on the queue, then any exception it raised, then None."""
+    try:
+        async for batch in stream:
+            _put_dropping_oldest(batches, batch)
+    except Exception as e:
+        _put_dropping_oldest(batches, e)
+    finally:
+        _put_dropping_oldest(batches, None)
+
+
+def _put_dropping_oldest(batches: queue.Queue, item: Any) -> None:
+    """
+    Put an item on a bounded queue, dropping the oldest item if it is full.
     
-    # Subscribe to the requested tickers
-    ws.send(json.dumps(subscription_msg))
-    logger.info(f"Subscribed to {len(subscription_msg['bars'])} tickers")
+    Never blocks, so the event loop stays free to take the caller's cancel.
+    """
+    while True:
+        try:
+            batches.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                batches.get_nowait()
+                logger.debug("Consumer falling behind; dropped the oldest batch")
+            except queue.Empty:
+                pass  # The consumer took one meanwhile
+
+
+async def _wait(stop: threading.Event, seconds: float) -> bool:
+    """Sleep on the event loop for up to seconds, returning True as soon as stop is set."""
+    deadline = time.monotonic() + seconds
+    while not stop.is_set():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        await asyncio.sleep(min(remaining, 0.1))
+    return True
 
 
-def _process_message(ws, message):
-    """Process incoming WebSocket messages."""
+def _backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff delay in seconds for a reconnect attempt."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+def _process_message(message: str) -> List[Bar]:
+    """Parse an incoming WebSocket message into bars in our standard format."""
     try:
-        data = json.loads(message)
+        data = json_loads(message)
         
         # Handle different message types
         if isinstance(data, list) and len(data) > 0:
@@ -139,17 +330,8 @@ def _process_message(ws, message):
             
             # Handle bar updates
             if msg_type == 'b':
-                for bar in data:
-                    # Format the data in our standard format
-                    formatted_data = {
-                        'ts': datetime.fromtimestamp(bar['t'] / 1000000000),  # Convert nanoseconds to datetime
-                        'symbol': bar['S'],
-                        'price': bar['c'],  # Use closing price
-                        'volume': bar['v']
-                    }
-                    
-                    # Add to message queue for yielding
-                    ws.message_queue.append(formatted_data)
+                # Timestamps stay in nanoseconds; _with_datetimes converts them per batch
+                return list(map(Bar._make, map(_bar_fields, data)))
             
             # Handle authentication responses
             elif msg_type == 'success' or msg_type == 'error':
@@ -157,54 +339,79 @@ def _process_message(ws, message):
                 
     except Exception as e:
         logger.error(f"Error processing message: {e}")
+    
+    return []
+
+
+def _with_datetimes(batch: List[Bar]) -> List[Bar]:
+    """The batch with its nanosecond timestamps as local-time datetimes, converted at once."""
+    stamps = pd.to_datetime([bar.ts for bar in batch], unit='ns', utc=True)
+    local = stamps.tz_convert(tzlocal()).tz_localize(None).to_pydatetime()
+    return [Bar(ts, *bar[1:]) for ts, bar in zip(local, batch)]
+
 
+async def _fallback_batches(tickers: List[str], as_datetime: bool,
+                            stop: threading.Event) -> AsyncGenerator[List[Bar], None]:
+    """Yahoo Finance fallback bars as one-bar batches, timestamped like the Alpaca ones."""
+    async for bar in _fallback_to_yahoo_async(tickers, stop):
+        if not as_datetime:
+            bar = bar._replace(ts=int(bar.ts.timestamp() * 1000000000))
+        yield [bar]
+
+
+async def _fallback_to_yahoo_async(tickers: List[str], stop: threading.Event) -> AsyncGenerator[Bar, None]:
+    """Run :func:`_fallback_to_yahoo` in a worker thread so it doesn't block the event loop."""
+    bars = _fallback_to_yahoo(tickers, stop)
+    while True:
+        bar = await asyncio.to_thread(next, bars, None)
+        if bar is None:
+            return
+        yield bar
 
-def _fallback_to_yahoo(tickers: List[str]) -> Generator[Dict[str, Any], None, None]:
+
+def _fallback_to_yahoo(tickers: List[str], stop: Optional[threading.Event] = None) -> Generator[Bar, None, None]:
     """
     Fallback to Yahoo Finance for data when Alpaca is unavailable.
     Simulates streaming by fetching recent data and yielding at 1-minute intervals.
     
     Args:
         tickers: List of ticker symbols
+        stop: Event that ends the fallback, including while it waits between polls
     
     Yields:
-        Dictionary with timestamp, symbol, price, and volume data
+        Bar record with timestamp, symbol, price, and volume data
     """
     logger.info(f"Using Yahoo Finance fallback for tickers: {tickers}")
+    stop = stop or threading.Event()
     
     while True:
         try:
             # Get current time
             now = datetime.now()
             
-            # For each ticker, get the latest data
+            # Get the last day of 1-minute bars for every ticker in one request
+            data = yf.download(tickers, period="1d", interval="1m", group_by='ticker',
+                               threads=True, progress=False, session=SESSION)
+            
             for ticker in tickers:
-                try:
-                    # Get data for the last day
-                    data = yf.Ticker(ticker).history(period="1d", interval="1m")
+                bars = history_slice(data, ticker)
+                
+                if not bars.empty:
+                    # Get the latest bar
+                    latest = bars.iloc[-1]
                     
-                    if not data.empty:
-                        # Get the latest bar
-                        latest = data.iloc[-1]
-                        
-                        yield {
-                            'ts': now,
-                            'symbol': ticker,
-                            'price': latest['Close'],
-                            'volume': latest['Volume']
-                        }
-                    else:
-                        logger.warning(f"No data available for {ticker}")
-                        
-                except Exception as e:
-                    logger.error(f"Error fetching Yahoo data for {ticker}: {e}")
+                    yield Bar(now, ticker, latest['Close'], latest['Volume'])
+                else:
+                    logger.warning(f"No data available for {ticker}")
             
-            # Sleep for approximately 1 minute to simulate 1-minute bars
-            time.sleep(60)
+            # Wait for approximately 1 minute to simulate 1-minute bars
+            if stop.wait(YAHOO_POLL_INTERVAL):
+                return
             
         except Exception as e:
             logger.error(f"Error in Yahoo Finance fallback: {e}")
-            time.sleep(60)  # Retry after a minute
+            if stop.wait(YAHOO_POLL_INTERVAL):  # Retry after a minute
+                return
 
 
 if __name__ == "__main__":
@@ -229,7 +436,7 @@ if __name__ == "__main__":
             stream = _fallback_to_yahoo(tickers)
             
         for data in stream:
-            print(f"{data['ts']} | {data['symbol']} | ${data['price']:.2f} | Vol: {data['volume']}")
+            print(f"{data.ts} | {data.symbol} | ${data.price:.2f} | Vol: {data.volume}")
             
     except KeyboardInterrupt:
         print("\nStream terminated by user")
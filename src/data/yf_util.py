@@ -0,0 +1,59 @@
+"""
+Shared yfinance helpers.
+
+``yf.Ticker`` objects are reused per symbol so that info, statement and
+history lookups for the same stock don't each construct a new one. Each
+Ticker keeps what it fetched, so only the most recently used are kept.
+"""
+import threading
+import time
+from typing import Dict, Tuple
+
+import yfinance as yf
+
+__all__ = ["get_ticker", "TICKER_TTL", "MAX_TICKERS"]
+
+# Seconds a Ticker object is reused; it caches what it fetched, so it is
+# rebuilt once older than this (or than the caller's max_age)
+TICKER_TTL = 3600
+
+# Ticker objects kept at most; well above the screeners' fetch threads, far
+# below the ALL universe, so memory doesn't grow with the universe size
+MAX_TICKERS = 256
+
+# Ticker objects keyed by (symbol, session), stored with their creation time,
+# least recently used first
+_tickers: Dict[Tuple[str, object], Tuple[float, yf.Ticker]] = {}
+_lock = threading.Lock()
+
+
+def get_ticker(symbol: str, session=None, max_age: float = TICKER_TTL) -> yf.Ticker:
+    """
+    Return a shared ``yf.Ticker`` for a symbol.
+
+    Parameters
+    ----------
+    symbol : str
+        Stock ticker symbol
+    session : requests.Session, optional
+        HTTP session for the Ticker's requests
+    max_age : float
+        Rebuild the Ticker if it was created more than this many seconds
+        ago, so data it cached internally is no staler than the caller wants
+
+    Returns
+    -------
+    yf.Ticker
+        The shared Ticker object
+    """
+    key = (symbol.upper(), session)
+    now = time.monotonic()
+    with _lock:
+        # Re-inserting moves the entry to the most recently used end
+        cached = _tickers.pop(key, None)
+        if cached is None or now - cached[0] >= min(max_age, TICKER_TTL):
+            cached = (now, yf.Ticker(symbol, session=session))
+        _tickers[key] = cached
+        while len(_tickers) > MAX_TICKERS:
+            del _tickers[next(iter(_tickers))]
+    return cached[1]
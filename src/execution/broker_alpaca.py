@@ -4,7 +4,9 @@ Alpaca broker integration module for trade execution.
 import os
 import logging
 import json
-from typing import Dict, List, Optional, Union, Any
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union, Any
 import time
 import requests
 
@@ -21,10 +23,28 @@ APCA_API_BASE_URL_LIVE = "https://api.alpaca.markets"
 
 __all__ = ["submit_bracket", "cancel_symbol", "get_positions"]
 
+# Orders canceled concurrently by cancel_symbol
+CANCEL_WORKERS = 8
+
+# REST clients keyed by (key, secret, base URL). Each holds a requests
+# session, so reusing it keeps the connection to Alpaca open between calls
+_clients: Dict[Tuple[str, str, str], REST] = {}
+_clients_lock = threading.Lock()
+
+# Seconds get_positions serves positions from the last list_positions() call
+POSITIONS_TTL = 5.0
+
+# (fetch time, client, positions keyed by symbol) from the last list_positions() call
+_positions_cache: Optional[Tuple[float, REST, Dict[str, Dict[str, Any]]]] = None
+_positions_lock = threading.Lock()
+
 
 def _get_alpaca_client() -> REST:
     """
-    Create and return an Alpaca REST client.
+    Return the Alpaca REST client for the configured credentials.
+    
+    The client is created on first use and then shared, so its HTTP
+    connections are reused across calls.
     
     Returns
     -------
@@ -46,8 +66,12 @@ def _get_alpaca_client() -> REST:
     # Determine if using paper or live trading
     base_url = os.environ.get("APCA_API_BASE_URL", APCA_API_BASE_URL_PAPER)
     
-    # Create and return the client
-    return REST(api_key, api_secret, base_url)
+    # Create the client once per credentials and endpoint
+    key = (api_key, api_secret, base_url)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = REST(api_key, api_secret, base_url)
+        return _clients[key]
 
 
 def submit_bracket(
@@ -128,6 +152,7 @@ def submit_bracket(
         )
         
         logger.info(f"Submitted bracket order for {symbol}: {order.id}")
+        _invalidate_positions()
         
         # Return the order as a dictionary
         return order._raw
@@ -164,24 +189,23 @@ def cancel_symbol(symbol: str) -> List[Dict[str, Any]]:
         # Get Alpaca client
         alpaca = _get_alpaca_client()
         
-        # Get all open orders
-        open_orders = alpaca.list_orders(status="open")
-        
-        # Filter orders for the specified symbol
-        symbol_orders = [order for order in open_orders if order.symbol == symbol]
+        # Get the symbol's open orders, filtered by Alpaca rather than here
+        symbol_orders = alpaca.list_orders(status="open", symbols=[symbol])
         
         # If no orders found for the symbol, return empty list
         if not symbol_orders:
             logger.info(f"No open orders found for {symbol}")
             return []
         
-        # Cancel each order
-        canceled_orders = []
-        for order in symbol_orders:
+        # Cancel the orders concurrently
+        def cancel(order):
             alpaca.cancel_order(order.id)
             logger.info(f"Canceled order {order.id} for {symbol}")
-            canceled_orders.append(order._raw)
+            return order._raw
         
+        with ThreadPoolExecutor(max_workers=min(CANCEL_WORKERS, len(symbol_orders))) as executor:
+            canceled_orders = list(executor.map(cancel, symbol_orders))
+        _invalidate_positions()
         return canceled_orders
     
     except APIError as e:
@@ -193,10 +217,47 @@ def cancel_symbol(symbol: str) -> List[Dict[str, Any]]:
         raise RuntimeError(f"Failed to cancel orders for {symbol}: {e}")
 
 
+def _cached_positions(ttl: float = POSITIONS_TTL) -> Dict[str, Dict[str, Any]]:
+    """
+    Return all positions keyed by symbol, from one list_positions() call per ``ttl`` seconds.
+    
+    Parameters
+    ----------
+    ttl : float
+        Maximum age in seconds of the positions returned
+    
+    Returns
+    -------
+    dict
+        Mapping of symbol to its position details
+    """
+    global _positions_cache
+    alpaca = _get_alpaca_client()
+    now = time.monotonic()
+    with _positions_lock:
+        cached = _positions_cache
+        if cached is None or cached[1] is not alpaca or now - cached[0] >= ttl:
+            positions = {position.symbol: position._raw for position in alpaca.list_positions()}
+            cached = (now, alpaca, positions)
+            _positions_cache = cached
+        return cached[2]
+
+
+def _invalidate_positions() -> None:
+    """Drop cached positions after an order changes them."""
+    global _positions_cache
+    with _positions_lock:
+        _positions_cache = None
+
+
 def get_positions(symbol: Optional[str] = None) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
     """
     Get current positions from Alpaca.
     
+    All positions are fetched with a single request and reused for
+    ``POSITIONS_TTL`` seconds, so looking up several symbols in turn costs
+    one request rather than one per symbol.
+    
     Parameters
     ----------
     symbol : str, optional
@@ -206,8 +267,9 @@ def get_positions(symbol: Optional[str] = None) -> Union[Dict[str, Any], List[Di
     Returns
     -------
     dict or list
-        Dictionary with position details if symbol is provided,
-        or list of dictionaries with all positions if symbol is None
+        Dictionary with position details if symbol is provided (empty if
+        there is no position), or list of dictionaries with all positions
+        if symbol is None
     
     Raises
     ------
@@ -215,27 +277,19 @@ def get_positions(symbol: Optional[str] = None) -> Union[Dict[str, Any], List[Di
         If there is an error retrieving the positions
     """
     try:
-        # Get Alpaca client
-        alpaca = _get_alpaca_client()
+        positions = _cached_positions()
         
         if symbol:
             # Get position for specific symbol
-            try:
-                position = alpaca.get_position(symbol)
-                logger.info(f"Retrieved position for {symbol}")
-                return position._raw
-            except APIError as e:
-                # Check if the error message contains "position does not exist"
-                error_message = str(e).lower()
-                if "position does not exist" in error_message:
-                    logger.info(f"No position found for {symbol}")
-                    return {}
-                raise
-        else:
-            # Get all positions
-            positions = alpaca.list_positions()
-            logger.info(f"Retrieved {len(positions)} positions")
-            return [pos._raw for pos in positions]
+            if symbol not in positions:
+                logger.info(f"No position found for {symbol}")
+                return {}
+            logger.info(f"Retrieved position for {symbol}")
+            return dict(positions[symbol])
+        
+        # Get all positions
+        logger.info(f"Retrieved {len(positions)} positions")
+        return [dict(position) for position in positions.values()]
     
     except APIError as e:
         logger.error(f"Alpaca API error: {e}")
@@ -1,27 +1,33 @@
 """
 Nightly job to screen stocks, generate explanations, and submit orders.
 """
+import io
 import os
 import sys
+import gzip
 import json
 import logging
 import argparse
-from typing import Dict, List, Optional
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, TextIO
+from datetime import date, datetime
 import yaml
 import requests
+import numpy as np
 import pandas as pd
 from pathlib import Path
-import yfinance as yf
 
 # Add src to Python path
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
 from src.scoring.buffett import get_f_score
-from src.technical.core import get_sma
-from src.risk.position import position_size
+from src.technical.core import get_smas
+from src.risk.position import position_sizes
 from src.execution.broker_alpaca import submit_bracket
-from src.llm.embeddings import explain_with_fingpt
+from src.llm.embeddings import explain_with_fingpt_batch
+from src.utils.config_loader import YAML_LOADER
+from src.utils.yf_cache import cached_infos
+from src.utils.yf_session import SESSION
 
 # Configure logging
 logging.basicConfig(
@@ -30,70 +36,138 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Bracket orders submitted concurrently, kept low to respect Alpaca's API rate limit
+ORDER_WORKERS = 8
+
+# Where each day's SMAs are kept, so reruns on the same day skip refetching them
+SMA_CACHE_DIR = Path("cache")
+
+# Stocks included in the Slack summary
+SLACK_MAX_STOCKS = 10
+
+# Seconds to wait on Slack before giving up, so a hung webhook can't stall the job
+SLACK_TIMEOUT = 5
+
 def load_config(config_path: str = 'configs/long_term.yml') -> Dict:
     """Load and validate YAML configuration."""
     try:
         with open(config_path, 'r') as f:
-            config = yaml.safe_load(f)
+            config = yaml.load(f, Loader=YAML_LOADER)
         logger.info(f"Loaded config from {config_path}")
         return config
     except Exception as e:
         logger.error(f"Failed to load config: {e}")
         raise
 
+def cached_smas(symbols: List[str], windows: Sequence[int]) -> pd.DataFrame:
+    """Get SMA data like get_smas, reusing the SMAs already saved today and fetching only the rest."""
+    cache_path = SMA_CACHE_DIR / f"sma{'_'.join(map(str, windows))}_{date.today()}.parquet"
+    cached = pd.read_parquet(cache_path) if cache_path.exists() else None
+    missing = symbols if cached is None else [s for s in symbols if s not in cached.index]
+    if missing or cached is None:
+        fetched = get_smas(missing, windows)
+        if not fetched.empty:
+            if cached is not None:
+                fetched = pd.concat([cached, fetched])
+                fetched = fetched[~fetched.index.duplicated(keep='last')]
+            SMA_CACHE_DIR.mkdir(exist_ok=True)
+            fetched.to_parquet(cache_path, compression='zstd', compression_level=3)
+            cached = fetched
+        elif cached is None:
+            cached = fetched
+    return cached[cached.index.isin(symbols)]
+
 def get_top_stocks(config: Dict, dry_run: bool = False) -> pd.DataFrame:
     """Get top stocks based on F-score and other filters."""
     # Get F-scores
     universe = config.get("universe", "SP500")
     f_scores = get_f_score(universe=universe)
     
-    # Apply F-score filter
-    filtered = f_scores[f_scores['score'] >= config['filters']['f_score']]
-    
-    # Apply SMA filters
-    if 'sma_200' in config['filters'] and config['filters']['sma_200']:
-        sma_data = get_sma(filtered.index.tolist(), window=200)
-        filtered = filtered[filtered.index.isin(sma_data[sma_data['close'] > sma_data['sma_200']].index)]
-    
-    if 'sma_50' in config['filters'] and config['filters']['sma_50']:
-        sma_data = get_sma(filtered.index.tolist(), window=50)
-        filtered = filtered[filtered.index.isin(sma_data[sma_data['close'] > sma_data['sma_50']].index)]
+    # Every filter narrows one boolean mask over the F-scores, which is
+    # applied once; F-score filter first
+    mask = f_scores['score'] >= config['filters']['f_score']
     
     # Apply price filter if configured
     if 'max_price' in config['filters']:
-        filtered = filtered[filtered['close'] <= config['filters']['max_price']]
+        mask &= f_scores['close'] <= config['filters']['max_price']
     
-    # Apply market cap filters if configured
-    if 'min_market_cap' in config['filters'] or 'max_market_cap' in config['filters']:
-        for symbol in list(filtered.index):
-            try:
-                ticker_info = yf.Ticker(symbol).info
-                market_cap = ticker_info.get('marketCap', 0)
-                
-                if 'min_market_cap' in config['filters'] and market_cap < config['filters']['min_market_cap']:
-                    filtered = filtered.drop(symbol)
-                if 'max_market_cap' in config['filters'] and market_cap > config['filters']['max_market_cap']:
-                    filtered = filtered.drop(symbol)
-            except Exception as e:
-                logger.warning(f"Failed to get market cap for {symbol}: {e}")
-                filtered = filtered.drop(symbol)
+    # Apply SMA filters, fetching every configured SMA in one download and
+    # only for stocks still in the running
+    windows = [window for window in (200, 50) if config['filters'].get(f'sma_{window}')]
+    if windows:
+        sma_data = cached_smas(f_scores.index[mask].tolist(), windows)
+        above_sma = pd.Series(True, index=sma_data.index)
+        for window in windows:
+            above_sma &= sma_data['close'] > sma_data[f'sma_{window}']
+        mask &= above_sma.reindex(f_scores.index, fill_value=False)
     
-    # Sort by score and take top 10
-    top_stocks = filtered.sort_values('score', ascending=False).head(10)
+    filtered = f_scores[mask]
+    
+    # Apply market cap filters if configured, reading every market cap from the
+    # shared info cache; stocks whose market cap couldn't be fetched are dropped
+    if ('min_market_cap' in config['filters'] or 'max_market_cap' in config['filters']) and not filtered.empty:
+        infos = cached_infos(filtered.index, session=SESSION)
+        market_caps = pd.Series({symbol: infos.get(symbol, {}).get('marketCap') for symbol in filtered.index},
+                                index=filtered.index, dtype=float)
+        
+        keep = market_caps.notna()
+        if 'min_market_cap' in config['filters']:
+            keep &= market_caps >= config['filters']['min_market_cap']
+        if 'max_market_cap' in config['filters']:
+            keep &= market_caps <= config['filters']['max_market_cap']
+        filtered = filtered[keep]
+    
+    # Take the top 10 by score, without sorting the rest
+    top_stocks = filtered.nlargest(10, 'score')
     
     logger.info(f"Found {len(top_stocks)} stocks matching criteria")
     return top_stocks
 
+def write_memo(stocks: pd.DataFrame, explanations: Dict[str, str], fh: TextIO) -> None:
+    """Write the memo with stock picks and explanations to an open file, one stock at a time."""
+    fh.write(f"Buffett Screener Results - {datetime.now().strftime('%Y-%m-%d')}\n\n")
+    for symbol, score in stocks['score'].items():
+        fh.write(f"{symbol} (F-score: {score})\n"
+                 f"Explanation: {explanations.get(symbol, 'No explanation available')}\n\n")
+
 def generate_memo(stocks: pd.DataFrame, explanations: Dict[str, str]) -> str:
     """Generate memo with stock picks and explanations."""
-    memo = f"Buffett Screener Results - {datetime.now().strftime('%Y-%m-%d')}\n\n"
+    buffer = io.StringIO()
+    write_memo(stocks, explanations, buffer)
+    return buffer.getvalue()
+
+def explain_stocks(symbols: List[str]) -> Dict[str, str]:
+    """Generate FinGPT explanations for several stocks in batched model calls, falling back to a placeholder."""
+    if not symbols:
+        return {}
+    try:
+        return explain_with_fingpt_batch(symbols)
+    except Exception as e:
+        logger.warning(f"Failed to explain {symbols}: {e}")
+        return {symbol: 'No explanation available' for symbol in symbols}
+
+def submit_orders(orders: List[tuple]) -> List[str]:
+    """
+    Submit bracket orders concurrently.
     
-    for symbol in stocks.index:
-        score = stocks.loc[symbol, 'score']
-        memo += f"{symbol} (F-score: {score})\n"
-        memo += f"Explanation: {explanations.get(symbol, 'No explanation available')}\n\n"
+    Each order is a ``(symbol, qty, entry_price, take_profit, stop_loss)``
+    tuple. A failed order is logged without affecting the others.
     
-    return memo
+    Returns the symbols whose orders failed.
+    """
+    if not orders:
+        return []
+    failed = []
+    with ThreadPoolExecutor(max_workers=min(ORDER_WORKERS, len(orders))) as executor:
+        futures = {executor.submit(submit_bracket, *order): order[0] for order in orders}
+        for future, symbol in futures.items():
+            try:
+                future.result()
+                logger.info(f"Submitted order for {symbol}")
+            except Exception as e:
+                logger.error(f"Failed to submit order for {symbol}: {e}")
+                failed.append(symbol)
+    return failed
 
 def post_to_slack(summary: Dict, webhook_url: Optional[str] = None) -> None:
     """Post summary to Slack if webhook URL is provided."""
@@ -102,10 +176,12 @@ def post_to_slack(summary: Dict, webhook_url: Optional[str] = None) -> None:
         return
     
     try:
+        # gzip the JSON body; financial data compresses to a fraction of its size
         response = requests.post(
             webhook_url,
-            json=summary,
-            headers={'Content-Type': 'application/json'}
+            data=gzip.compress(json.dumps(summary).encode()),
+            headers={'Content-Type': 'application/json', 'Content-Encoding': 'gzip'},
+            timeout=SLACK_TIMEOUT
         )
         response.raise_for_status()
         logger.info("Posted summary to Slack")
@@ -135,44 +211,40 @@ def main():
         # 2. Get top stocks
         top_stocks = get_top_stocks(config, args.dry_run)
         
-        # 3. Calculate position sizes
-        positions = {}
-        for symbol in top_stocks.index:
-            price = top_stocks.loc[symbol, 'close']
-            atr = top_stocks.loc[symbol, 'atr']
-            size = position_size(price=price, atr=atr, account_size=100000)
-            positions[symbol] = size
+        # 3. Calculate position sizes for all stocks at once
+        prices = top_stocks['close'].to_numpy(dtype=float)
+        atrs = top_stocks['atr'].to_numpy(dtype=float)
+        dollar_sizes = position_sizes(prices, atrs, account_size=100000)
+        # Orders are placed in whole shares, not dollars
+        sizes = np.floor(np.divide(dollar_sizes, prices, out=np.zeros_like(dollar_sizes),
+                                   where=prices > 0)).astype(int)
+        positions = dict(zip(top_stocks.index, sizes.tolist()))
         
         # 4. Generate explanations
-        explanations = {}
-        for symbol in top_stocks.index:
-            explanation = explain_with_fingpt(symbol)
-            explanations[symbol] = explanation
+        explanations = explain_stocks(top_stocks.index.tolist())
         
         # 5. Write memo
-        memo = generate_memo(top_stocks, explanations)
         memo_path = 'reports/buffett_memo.txt'
         os.makedirs('reports', exist_ok=True)
-        with open(memo_path, 'w') as f:
-            f.write(memo)
+        with open(memo_path, 'w', buffering=1 << 16) as f:
+            write_memo(top_stocks, explanations, f)
         logger.info(f"Wrote memo to {memo_path}")
         
         # 6. Submit orders if not dry run
         if not args.dry_run and args.live:
-            for symbol, size in positions.items():
-                price = top_stocks.loc[symbol, 'close']
-                atr = top_stocks.loc[symbol, 'atr']
-                # Calculate stop loss and take profit based on ATR
-                stop_loss = price - (2 * atr)  # 2 ATR for stop loss
-                take_profit = price + (4 * atr)  # 4 ATR for take profit (2:1 risk-reward)
-                submit_bracket(symbol, size, price, take_profit, stop_loss)
-                logger.info(f"Submitted order for {symbol}")
+            # Calculate stop loss and take profit based on ATR
+            stop_losses = prices - (2 * atrs)  # 2 ATR for stop loss
+            take_profits = prices + (4 * atrs)  # 4 ATR for take profit (2:1 risk-reward)
+            # Zero-share positions would only be rejected by the broker
+            sized = sizes > 0
+            submit_orders(list(zip(top_stocks.index[sized], sizes[sized].tolist(), prices[sized].tolist(),
+                                   take_profits[sized].tolist(), stop_losses[sized].tolist())))
         
         # 7. Post summary to Slack
         summary = {
             'timestamp': datetime.now().isoformat(),
             'strategy': config['strategy'],
-            'stocks': top_stocks.to_dict(),
+            'stocks': top_stocks.head(SLACK_MAX_STOCKS).to_dict(),
             'positions': positions,
             'dry_run': args.dry_run,
             'live': args.live
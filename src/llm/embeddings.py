@@ -3,11 +3,27 @@ FinGPT-2 embeddings and explanations module.
 """
 import os
 import logging
-from typing import Dict, Optional
+import contextlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 import numpy as np
 import pandas as pd
 from transformers import AutoTokenizer, AutoModelForCausalLM
-import yfinance as yf
+
+from src.utils.yf_cache import cached_info, cached_statements
+
+try:
+    import torch
+    inference_mode = torch.inference_mode
+except ImportError:  # pragma: no cover - torch is only needed to run the model
+    torch = None
+    inference_mode = contextlib.nullcontext
+
+try:
+    from optimum.onnxruntime import ORTModelForCausalLM
+except ImportError:  # pragma: no cover - ONNX Runtime inference is optional
+    ORTModelForCausalLM = None
 
 logger = logging.getLogger(__name__)
 
@@ -15,18 +31,108 @@ logger = logging.getLogger(__name__)
 MODEL_ID = "FinGPT/fingpt-sentiment-en"
 tokenizer = None
 model = None
+# Where the model was placed by load_model; inputs are moved there too
+device = None
+# Explanations may be generated from several threads; the model is loaded once
+_model_lock = threading.Lock()
+
+# Prompts generated together in one model.generate call
+EXPLAIN_BATCH_SIZE = 8
+
+# Stocks whose fundamentals are fetched concurrently for a batch of explanations
+FUNDAMENTALS_WORKERS = 16
+
+# Fundamentals given to the model, in prompt order
+PROMPT_FIELDS = (
+    'pe_ratio', 'pb_ratio', 'ps_ratio', 'ev_to_ebitda',
+    'profit_margin', 'operating_margin', 'roe', 'roa',
+    'revenue_growth', 'eps_growth', 'fcf_growth',
+    'current_ratio', 'quick_ratio', 'debt_to_equity',
+    'dividend_yield', 'payout_ratio',
+)
+
+# Prompt tokens kept, and tokens generated after them, per explanation
+PROMPT_MAX_TOKENS = 256
+EXPLAIN_MAX_NEW_TOKENS = 150
+
+# ONNX exports written by export_onnx; load_model runs them through ONNX
+# Runtime instead of the PyTorch model when they exist
+ONNX_MODEL_DIR = "fingpt-onnx"
+ONNX_INT8_MODEL_DIR = "fingpt-onnx-int8"
+ONNX_INT8_FILE = "model_quantized.onnx"
 
 def load_model():
     """Lazy load the FinGPT model."""
-    global tokenizer, model
-    if tokenizer is None or model is None:
-        try:
-            tokenizer = AutoTokenizer.from_pretrained(MODEL_ID)
-            model = AutoModelForCausalLM.from_pretrained(MODEL_ID)
-            logger.info("Loaded FinGPT model")
-        except Exception as e:
-            logger.error(f"Failed to load FinGPT model: {e}")
-            raise
+    global tokenizer, model, device
+    if tokenizer is not None and model is not None:
+        return
+    with _model_lock:
+        if tokenizer is None or model is None:
+            try:
+                tokenizer = AutoTokenizer.from_pretrained(MODEL_ID)
+                # Half precision halves the weights to read per token: fp16 on GPU, bf16 on CPU
+                use_cuda = torch is not None and torch.cuda.is_available()
+                dtype = None if torch is None else torch.float16 if use_cuda else torch.bfloat16
+                device = "cuda" if use_cuda else "cpu"
+                model = _load_onnx_model(use_cuda)
+                if model is None:
+                    model = AutoModelForCausalLM.from_pretrained(
+                        MODEL_ID, torch_dtype=dtype, low_cpu_mem_usage=True
+                    ).to(device).eval()
+                # Prompts are batched: pad them on the left so generation continues each one
+                if tokenizer.pad_token is None:
+                    tokenizer.pad_token = tokenizer.eos_token
+                tokenizer.padding_side = "left"
+                logger.info("Loaded FinGPT model")
+            except Exception as e:
+                logger.error(f"Failed to load FinGPT model: {e}")
+                raise
+
+def _load_onnx_model(use_cuda: bool):
+    """
+    Load the ONNX export of the model for ONNX Runtime, if there is one.
+    
+    On GPU the fp export runs on the CUDA provider. On CPU the INT8
+    quantized export is preferred, then the fp one.
+    
+    Returns None when ONNX Runtime isn't installed or nothing was exported.
+    """
+    if ORTModelForCausalLM is None:
+        return None
+    if not use_cuda and os.path.isfile(os.path.join(ONNX_INT8_MODEL_DIR, ONNX_INT8_FILE)):
+        model_dir, file_name = ONNX_INT8_MODEL_DIR, ONNX_INT8_FILE
+    elif os.path.isfile(os.path.join(ONNX_MODEL_DIR, "model.onnx")):
+        model_dir, file_name = ONNX_MODEL_DIR, "model.onnx"
+    else:
+        return None
+    provider = "CUDAExecutionProvider" if use_cuda else "CPUExecutionProvider"
+    logger.info(f"Running FinGPT with ONNX Runtime from {model_dir} on {provider}")
+    return ORTModelForCausalLM.from_pretrained(model_dir, file_name=file_name, provider=provider)
+
+def export_onnx(quantize: bool = True) -> None:
+    """
+    Export the model to ONNX once, for load_model to run with ONNX Runtime.
+    
+    The export keeps the key/value cache so generation doesn't recompute
+    the prompt for every new token.
+    
+    Parameters
+    ----------
+    quantize : bool, default True
+        Also write an INT8 dynamically quantized copy for CPU-only machines
+    """
+    if ORTModelForCausalLM is None:
+        raise RuntimeError("optimum[onnxruntime] is required to export the model to ONNX")
+    from optimum.onnxruntime import ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    
+    ORTModelForCausalLM.from_pretrained(MODEL_ID, export=True, use_cache=True).save_pretrained(ONNX_MODEL_DIR)
+    logger.info(f"Exported FinGPT to {ONNX_MODEL_DIR}")
+    if quantize:
+        quantizer = ORTQuantizer.from_pretrained(ONNX_MODEL_DIR, file_name="model.onnx")
+        quantizer.quantize(save_dir=ONNX_INT8_MODEL_DIR,
+                           quantization_config=AutoQuantizationConfig.avx2(is_static=False, per_channel=False))
+        logger.info(f"Wrote INT8 quantized FinGPT to {ONNX_INT8_MODEL_DIR}")
 
 def fetch_fundamentals(symbol: str) -> Dict:
     """
@@ -43,13 +149,16 @@ def fetch_fundamentals(symbol: str) -> Dict:
         Dictionary containing fundamental metrics
     """
     try:
-        ticker = yf.Ticker(symbol)
-        info = ticker.info
+        # Info and statements come from the on-disk Yahoo Finance cache while
+        # fresh, so reruns on the same day don't download them again
+        info = cached_info(symbol)
         
         # Get financial statements for growth metrics
-        income_stmt = ticker.income_stmt
-        balance_sheet = ticker.balance_sheet
-        cash_flow = ticker.cashflow
+        statements = cached_statements(symbol)
+        income_stmt, balance_sheet, cash_flow = (
+            statements[name] if statements[name] is not None else pd.DataFrame()
+            for name in ('income_stmt', 'balance_sheet', 'cashflow')
+        )
         
         # Calculate growth metrics if statements are available
         revenue_growth = None
@@ -156,6 +265,21 @@ def fetch_fundamentals(symbol: str) -> Dict:
             'beta': 'N/A'
         }
 
+def _build_prompt(symbol: str, fundamentals: Dict) -> str:
+    """
+    Build the FinGPT prompt for a stock from its fundamentals.
+    
+    The prompt is one line of ``key=value`` pairs, as few tokens as the model
+    has to read before generating. Missing metrics carry no signal and are
+    left out, and floats are cut to 4 significant digits.
+    """
+    pairs = ' '.join(
+        f"{key}={value:.4g}" if isinstance(value, float) else f"{key}={value}"
+        for key, value in ((key, fundamentals.get(key)) for key in PROMPT_FIELDS)
+        if value is not None and value != 'N/A' and not (isinstance(value, float) and np.isnan(value))
+    )
+    return f"Analyze {symbol} stock (growth, roe, roa and dividend_yield in %): {pairs}. Investment potential of {symbol}:"
+
 def explain_with_fingpt(symbol: str) -> str:
     """
     Generate explanation for a stock using FinGPT-2.
@@ -170,58 +294,72 @@ def explain_with_fingpt(symbol: str) -> str:
     str
         Generated explanation
     """
+    return explain_with_fingpt_batch([symbol])[symbol]
+
+def explain_with_fingpt_batch(symbols: List[str], batch_size: int = EXPLAIN_BATCH_SIZE) -> Dict[str, str]:
+    """
+    Generate explanations for several stocks using FinGPT-2.
+    
+    Fundamentals are fetched concurrently, and the prompts are sorted by
+    token length and generated ``batch_size`` at a time, one padded
+    ``model.generate`` call per batch, so little of each batch is padding.
+    
+    Parameters
+    ----------
+    symbols : List[str]
+        Stock symbols to explain
+    batch_size : int, default EXPLAIN_BATCH_SIZE
+        Prompts generated together in one call
+        
+    Returns
+    -------
+    Dict[str, str]
+        Mapping of symbol to its explanation, in the order given. Stocks
+        whose batch failed get the failure message instead.
+    """
+    if not symbols:
+        return {}
     try:
         load_model()
         
         # Get real fundamental data
-        fundamentals = fetch_fundamentals(symbol)
-        
-        # Construct prompt with comprehensive fundamentals
-        prompt = f"""
-        Analyze {symbol} stock based on these fundamentals:
-        
-        Valuation:
-        - P/E Ratio: {fundamentals['pe_ratio']}
-        - P/B Ratio: {fundamentals['pb_ratio']}
-        - P/S Ratio: {fundamentals['ps_ratio']}
-        - EV/EBITDA: {fundamentals['ev_to_ebitda']}
-        
-        Profitability:
-        - Profit Margin: {fundamentals['profit_margin']}
-        - Operating Margin: {fundamentals['operating_margin']}
-        - Return on Equity: {fundamentals['roe']}
-        - Return on Assets: {fundamentals['roa']}
-        
-        Growth:
-        - Revenue Growth: {fundamentals['revenue_growth']}
-        - EPS Growth: {fundamentals['eps_growth']}
-        - Free Cash Flow Growth: {fundamentals['fcf_growth']}
-        
-        Financial Health:
-        - Current Ratio: {fundamentals['current_ratio']}
-        - Quick Ratio: {fundamentals['quick_ratio']}
-        - Debt/Equity: {fundamentals['debt_to_equity']}
-        
-        Dividend:
-        - Dividend Yield: {fundamentals['dividend_yield']}%
-        - Payout Ratio: {fundamentals['payout_ratio']}
-        
-        Provide a comprehensive analysis of {symbol}'s investment potential:
-        """
-        
-        # Generate explanation
-        inputs = tokenizer(prompt, return_tensors="pt")
-        outputs = model.generate(
-            inputs["input_ids"],
-            max_length=300,  # Increased for more detailed analysis
-            num_return_sequences=1,
-            temperature=0.7,
-            do_sample=True
-        )
-        
-        explanation = tokenizer.decode(outputs[0], skip_special_tokens=True)
-        return explanation.strip()
+        with ThreadPoolExecutor(max_workers=min(FUNDAMENTALS_WORKERS, len(symbols))) as executor:
+            prompts = [_build_prompt(symbol, fundamentals)
+                       for symbol, fundamentals in zip(symbols, executor.map(fetch_fundamentals, symbols))]
         
+        input_ids = tokenizer(prompts, truncation=True, max_length=PROMPT_MAX_TOKENS)["input_ids"]
     except Exception as e:
-        logger.error(f"Failed to generate explanation for {symbol}: {e}")
-        return f"Failed to generate explanation: {str(e)}" 
\ No newline at end of file
+        logger.error(f"Failed to generate explanations for {symbols}: {e}")
+        return {symbol: f"Failed to generate explanation: {str(e)}" for symbol in symbols}
+    
+    # Batch prompts of similar length together to keep padding short
+    order = sorted(range(len(symbols)), key=lambda i: len(input_ids[i]))
+    explanations = {}
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        try:
+            inputs = tokenizer.pad({"input_ids": [input_ids[i] for i in batch]}, return_tensors="pt")
+            if device is not None:
+                inputs = inputs.to(device)
+            with inference_mode():
+                outputs = model.generate(
+                    inputs["input_ids"],
+                    attention_mask=inputs["attention_mask"],
+                    pad_token_id=tokenizer.pad_token_id,
+                    max_new_tokens=EXPLAIN_MAX_NEW_TOKENS,
+                    num_return_sequences=1,
+                    temperature=0.7,
+                    do_sample=True
+                )
+            for i, explanation in zip(batch, tokenizer.batch_decode(outputs, skip_special_tokens=True)):
+                explanations[symbols[i]] = explanation.strip()
+        except Exception as e:
+            logger.error(f"Failed to generate explanations for {[symbols[i] for i in batch]}: {e}")
+            for i in batch:
+                explanations[symbols[i]] = f"Failed to generate explanation: {str(e)}"
+    
+    return {symbol: explanations[symbol] for symbol in symbols}
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    export_onnx()
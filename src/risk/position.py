@@ -6,8 +6,48 @@ import numpy as np
 import logging
 from typing import Dict, Union, List, Tuple, Optional
 
+from src.utils.jit import njit
+
 logger = logging.getLogger(__name__)
 
+
+@njit(cache=True)
+def _size_kernel(prices: np.ndarray, atrs: np.ndarray, account_size: float, max_risk_pct: float,
+                 max_position_pct: float, risk_multiple: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Stop losses and share counts for each stock: the ATR-stop risk budget, capped by position value."""
+    n = prices.shape[0]
+    stop_losses = np.empty(n)
+    shares = np.zeros(n, dtype=np.int64)
+    max_dollar_risk = account_size * max_risk_pct
+    max_position_value = account_size * max_position_pct
+    for i in range(n):
+        # Stop loss is risk_multiple ATRs below the price
+        stop_losses[i] = prices[i] - (atrs[i] * risk_multiple)
+        risk_per_share = prices[i] - stop_losses[i]
+        if risk_per_share > 0:
+            count = int(max_dollar_risk / risk_per_share)
+            # Cap position size based on max_position_pct
+            if count * prices[i] > max_position_value:
+                count = int(max_position_value / prices[i])
+            shares[i] = count
+    return stop_losses, shares
+
+
+@njit(cache=True)
+def _adjust_kernel(shares: np.ndarray, entries: np.ndarray, stops: np.ndarray,
+                   scaling_factor: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Share counts scaled down by scaling_factor, with the resulting dollar amounts and risks."""
+    n = shares.shape[0]
+    adjusted = np.empty(n, dtype=np.int64)
+    dollar_amounts = np.empty(n)
+    risk_amounts = np.empty(n)
+    for i in range(n):
+        adjusted[i] = int(shares[i] * scaling_factor)
+        dollar_amounts[i] = adjusted[i] * entries[i]
+        risk_amounts[i] = adjusted[i] * (entries[i] - stops[i])
+    return adjusted, dollar_amounts, risk_amounts
+
+
 class RiskManager:
     """
     Risk management class for position sizing and portfolio risk.
@@ -63,39 +103,54 @@ class RiskManager:
             - risk_amount: Dollar amount at risk
             - risk_pct: Percentage of account at risk
         """
-        # Calculate stop loss based on ATR
-        stop_loss = price - (atr * risk_multiple)
-        
-        # Calculate dollar risk per share
-        risk_per_share = price - stop_loss
-        
-        # Calculate max dollar risk for this trade
-        max_dollar_risk = self.account_size * self.max_risk_pct
-        
-        # Calculate number of shares based on risk
-        shares = int(max_dollar_risk / risk_per_share) if risk_per_share > 0 else 0
+        return self.calculate_position_sizes([ticker], [price], [atr], risk_multiple)[ticker]
+    
+    def calculate_position_sizes(self, tickers: List[str], prices: Union[np.ndarray, List[float]],
+                                 atrs: Union[np.ndarray, List[float]],
+                                 risk_multiple: float = 2.0) -> Dict[str, Dict[str, float]]:
+        """
+        Calculate position sizes for several stocks at once.
         
-        # Calculate total position value
-        position_value = shares * price
+        The sizing math runs in one compiled pass over arrays; only the
+        returned dicts are built per stock.
         
-        # Cap position size based on max_position_pct
-        max_position_value = self.account_size * self.max_position_pct
-        if position_value > max_position_value:
-            shares = int(max_position_value / price)
-            position_value = shares * price
+        Parameters
+        ----------
+        tickers : List[str]
+            Stock ticker symbols
+        prices : array-like
+            Current prices, aligned with ``tickers``
+        atrs : array-like
+            Average True Range values, aligned with ``tickers``
+        risk_multiple : float, default 2.0
+            Multiple of ATR to use for stop loss
+            
+        Returns
+        -------
+        Dict[str, Dict[str, float]]
+            Position details for each ticker, as from calculate_position_size
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        atrs = np.asarray(atrs, dtype=np.float64)
+        stop_losses, shares = _size_kernel(prices, atrs, float(self.account_size), self.max_risk_pct,
+                                           self.max_position_pct, risk_multiple)
         
-        # Calculate actual risk amount and percentage
-        risk_amount = shares * risk_per_share
-        risk_pct = risk_amount / self.account_size
+        # Calculate total position value and actual risk amount and percentage
+        position_values = shares * prices
+        risk_amounts = shares * (prices - stop_losses)
+        risk_pcts = risk_amounts / self.account_size
         
         return {
-            'ticker': ticker,
-            'shares': shares,
-            'entry_price': price,
-            'dollar_amount': position_value,
-            'stop_loss': stop_loss,
-            'risk_amount': risk_amount,
-            'risk_pct': risk_pct
+            ticker: {
+                'ticker': ticker,
+                'shares': int(shares[i]),
+                'entry_price': float(prices[i]),
+                'dollar_amount': float(position_values[i]),
+                'stop_loss': float(stop_losses[i]),
+                'risk_amount': float(risk_amounts[i]),
+                'risk_pct': float(risk_pcts[i])
+            }
+            for i, ticker in enumerate(tickers)
         }
     
     def calculate_take_profit(self, entry_price: float, stop_loss: float, 
@@ -196,21 +251,25 @@ class RiskManager:
         # Calculate scaling factor to reduce all positions proportionally
         scaling_factor = max_portfolio_risk_pct / portfolio_risk['total_risk_pct']
         
-        # Adjust each position
+        # Adjust every position in one pass over arrays of their fields
+        positions = list(self.positions.values())
+        shares = np.array([position['shares'] for position in positions], dtype=np.int64)
+        entries = np.array([position['entry_price'] for position in positions], dtype=np.float64)
+        stops = np.array([position['stop_loss'] for position in positions], dtype=np.float64)
+        adjusted_shares, dollar_amounts, risk_amounts = _adjust_kernel(shares, entries, stops, scaling_factor)
+        
         adjusted_positions = {}
-        for ticker, position in self.positions.items():
-            adjusted_shares = int(position['shares'] * scaling_factor)
-            
-            if adjusted_shares > 0:
+        for i, (ticker, position) in enumerate(self.positions.items()):
+            if adjusted_shares[i] > 0:
                 adjusted_position = position.copy()
-                adjusted_position['shares'] = adjusted_shares
-                adjusted_position['dollar_amount'] = adjusted_shares * position['entry_price']
-                adjusted_position['risk_amount'] = adjusted_shares * (position['entry_price'] - position['stop_loss'])
-                adjusted_position['risk_pct'] = adjusted_position['risk_amount'] / self.account_size
+                adjusted_position['shares'] = int(adjusted_shares[i])
+                adjusted_position['dollar_amount'] = float(dollar_amounts[i])
+                adjusted_position['risk_amount'] = float(risk_amounts[i])
+                adjusted_position['risk_pct'] = float(risk_amounts[i]) / self.account_size
                 
                 adjusted_positions[ticker] = adjusted_position
                 
-                logger.info(f"Adjusted position: {ticker}, shares: {adjusted_shares} "
+                logger.info(f"Adjusted position: {ticker}, shares: {adjusted_shares[i]} "
                            f"(scaled by {scaling_factor:.2f})")
         
         self.positions = adjusted_positions
@@ -292,4 +351,35 @@ def position_size(price: float, atr: float, account_size: float, risk_pct: float
         return 0
     
     # Return position size in dollars
-    return (risk_amount / risk_per_share) * price 
\ No newline at end of file
+    return (risk_amount / risk_per_share) * price 
+
+
+def position_sizes(prices: Union[np.ndarray, pd.Series], atrs: Union[np.ndarray, pd.Series],
+                   account_size: float, risk_pct: float = 0.01) -> np.ndarray:
+    """
+    Vectorized version of :func:`position_size` for many stocks at once.
+    
+    Parameters
+    ----------
+    prices : array-like
+        Current prices
+    atrs : array-like
+        Average True Range values, aligned with ``prices``
+    account_size : float
+        Account size in dollars
+    risk_pct : float
+        Risk percentage per trade (e.g., 0.01 for 1%)
+        
+    Returns
+    -------
+    np.ndarray
+        Position sizes in dollars; 0 wherever the ATR is not positive,
+        including missing ATRs, so no order is sized from bad data
+    """
+    prices = np.asarray(prices, dtype=float)
+    risk_per_share = 2 * np.asarray(atrs, dtype=float)
+    risk_amount = account_size * risk_pct
+    
+    units = np.divide(risk_amount, risk_per_share,
+                      out=np.zeros_like(risk_per_share), where=risk_per_share > 0)
+    return units * prices
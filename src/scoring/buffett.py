@@ -8,6 +8,7 @@ import datetime
 import json
 from typing import Dict, Tuple, Optional, Any, Union, List
 import logging
+import numpy as np
 import pandas as pd
 import yfinance as yf
 
@@ -170,7 +171,8 @@ def _get_price_data(tickers: List[str]) -> pd.DataFrame:
         tr2 = (high - close_prev).abs()
         tr3 = (low - close_prev).abs()
         
-        tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
+        # Element-wise, so each ticker's column keeps its own true range
+        tr = np.fmax(np.fmax(tr1, tr2), tr3)
         atr = tr.rolling(window=14).mean().iloc[-1]
         
         # Combine into result DataFrame
@@ -0,0 +1,87 @@
+"""
+Growth score kernel for the small-cap growth screener.
+
+Compiled with numba when it is installed; otherwise the same function
+runs as plain Python.
+"""
+import numpy as np
+
+from src.utils.jit import njit
+
+__all__ = ["score_growth", "score_growth_batch"]
+
+
+# fastmath is left off: it assumes no NaNs, and NaN marks missing fundamentals
+@njit(cache=True)
+def score_growth(momentum_3m: float, momentum_1m: float, volume_ratio: float,
+                 current_price: float, volatility: float,
+                 revenue_growth: float, earnings_growth: float) -> float:
+    """
+    Calculate a growth score (0-100) from a stock's computed metrics.
+
+    Parameters
+    ----------
+    momentum_3m, momentum_1m : float
+        3-month and 1-month price change in percent
+    volume_ratio : float
+        Recent (5-day) average volume over the 6-month average
+    current_price : float
+        Latest share price
+    volatility : float
+        Standard deviation of daily returns in percent
+    revenue_growth, earnings_growth : float
+        Year-over-year growth in percent, NaN when unavailable
+
+    Returns
+    -------
+    float
+        The growth score
+    """
+    growth_score = 0.0
+
+    # Momentum component (up to 50 points)
+    if momentum_3m > 0:
+        growth_score += min(momentum_3m, 30.0)  # Up to 30 points for 3-month momentum
+    if momentum_1m > 0:
+        growth_score += min(momentum_1m, 20.0)  # Up to 20 points for 1-month momentum
+
+    # Volume component (up to 15 points)
+    if volume_ratio > 1:
+        growth_score += min((volume_ratio - 1) * 15, 15.0)  # Up to 15 points for increasing volume
+
+    # Price component (up to 10 points)
+    if 5 <= current_price <= 20:
+        growth_score += 10  # Ideal price range gets full points
+    elif current_price < 5:
+        growth_score += current_price * 2  # 2 points per dollar under $5
+
+    # Volatility component (up to 20 points)
+    optimal_volatility = 25.0  # Optimal volatility for growth stocks (25%)
+    volatility_score = 20 - abs(volatility - optimal_volatility) * 0.8
+    growth_score += max(0.0, volatility_score)
+
+    # Fundamental component (up to 25 points); NaN compares False
+    if revenue_growth > 0:
+        growth_score += min(revenue_growth * 0.5, 15.0)  # Up to 15 points for revenue growth
+
+    if earnings_growth > 0:
+        growth_score += min(earnings_growth * 0.5, 10.0)  # Up to 10 points for earnings growth
+
+    return growth_score
+
+
+@njit(cache=True)
+def score_growth_batch(momentum_3m: np.ndarray, momentum_1m: np.ndarray, volume_ratio: np.ndarray,
+                       current_price: np.ndarray, volatility: np.ndarray,
+                       revenue_growth: np.ndarray, earnings_growth: np.ndarray) -> np.ndarray:
+    """
+    Calculate growth scores for many stocks at once.
+
+    Takes equal-length float arrays with the same meaning as the
+    arguments of :func:`score_growth` and returns an array of scores.
+    """
+    scores = np.empty(len(momentum_3m))
+    for i in range(len(scores)):
+        scores[i] = score_growth(momentum_3m[i], momentum_1m[i], volume_ratio[i], current_price[i],
+                                 volatility[i], revenue_growth[i], earnings_growth[i])
+    return scores
@@ -9,6 +9,8 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 
+from src.utils.config_loader import YAML_LOADER
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -30,7 +32,7 @@ class EnhancedScreener:
     def _load_config(self, config_path: str) -> Dict:
         """Load and validate the screener configuration."""
         with open(config_path, 'r') as f:
-            config = yaml.safe_load(f)
+            config = yaml.load(f, Loader=YAML_LOADER)
         return config
     
     def _calculate_accruals_ratio(self, net_income: float, operating_cash_flow: float, total_assets: float) -> float:
@@ -3,11 +3,11 @@ Core technical indicators module.
 """
 import pandas as pd
 import numpy as np
-from typing import Union, List, Optional
+from typing import Union, List, Optional, Sequence
 import logging
 import yfinance as yf
 
-__all__ = ["sma", "rsi", "atr"]
+__all__ = ["sma", "rolling_mean", "rsi", "atr"]
 
 logger = logging.getLogger(__name__)
 
@@ -51,6 +51,56 @@ def sma(series: pd.Series, window: int) -> pd.Series:
     return result.dropna()
 
 
+def rolling_mean(values: Union[np.ndarray, pd.Series], window: int) -> np.ndarray:
+    """
+    Calculate a trailing moving average directly on a NumPy array.
+    
+    Uses a single cumulative sum instead of a per-window loop, which makes it
+    cheaper than ``Series.rolling().mean()`` when only the raw values are needed.
+    Matches pandas semantics: the result is NaN until the window fills and for
+    any window that contains a NaN.
+    
+    Parameters
+    ----------
+    values : array-like
+        1-D price values
+    window : int
+        Window size for the moving average
+        
+    Returns
+    -------
+    np.ndarray
+        Moving average with the same length as ``values``
+        
+    Raises
+    ------
+    ValueError
+        If window is less than 1
+        
+    Examples
+    --------
+    >>> rolling_mean([10, 11, 12, 13], 2)
+    array([ nan, 10.5, 11.5, 12.5])
+    """
+    if window < 1:
+        raise ValueError("Window must be at least 1")
+    
+    values = np.asarray(values, dtype=float)
+    result = np.full(values.shape, np.nan)
+    if len(values) < window:
+        return result
+    
+    # Running totals of the values and of missing entries, offset by one
+    missing = np.isnan(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(missing, 0.0, values))))
+    gaps = np.concatenate(([0], np.cumsum(missing)))
+    
+    window_sums = sums[window:] - sums[:-window]
+    window_gaps = gaps[window:] - gaps[:-window]
+    result[window - 1:] = np.where(window_gaps == 0, window_sums / window, np.nan)
+    return result
+
+
 def rsi(series: pd.Series, window: int = 14) -> pd.Series:
     """
     Calculate Relative Strength Index.
@@ -148,8 +198,9 @@ def atr(high: pd.Series, low: pd.Series, close: pd.Series, window: int = 14) ->
     tr2 = (high - previous_close).abs()
     tr3 = (low - previous_close).abs()
     
-    # True Range is the maximum of the three
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
+    # True Range is the maximum of the three; fmax skips the missing first
+    # previous close instead of propagating NaN
+    tr = np.fmax(np.fmax(tr1, tr2), tr3)
     
     # Calculate Average True Range
     atr_values = tr.rolling(window=window).mean()
@@ -173,6 +224,31 @@ def get_sma(symbols: List[str], window: int = 200) -> pd.DataFrame:
     pd.DataFrame
         DataFrame with close prices and SMA values
     """
+    return get_smas(symbols, (window,))
+
+
+def get_smas(symbols: List[str], windows: Sequence[int] = (200, 50)) -> pd.DataFrame:
+    """
+    Get SMA data for several windows from a single price download.
+    
+    Only the latest value of each SMA is needed, so each is the mean of the
+    last ``window`` closes rather than a full rolling pass.
+    
+    Parameters
+    ----------
+    symbols : List[str]
+        List of stock symbols
+    windows : Sequence[int], default (200, 50)
+        SMA window sizes
+        
+    Returns
+    -------
+    pd.DataFrame
+        DataFrame with close prices and an ``sma_<window>`` column per
+        window, NaN where a symbol has fewer closes than the window
+    """
+    columns = ['close'] + [f'sma_{window}' for window in windows]
+    
     # For mock affordable stocks, return mock SMA data
     mock_affordable_stocks = ['F', 'SOFI', 'PLTR', 'HOOD', 'NIO', 'PLUG', 'RIVN', 'COIN', 'SNAP', 'PINS', 'SKLZ', 'GM']
     if set(symbols).intersection(set(mock_affordable_stocks)) and len(symbols) < 20:
@@ -180,37 +256,28 @@ def get_sma(symbols: List[str], window: int = 200) -> pd.DataFrame:
         mock_prices = {'F': 45, 'SOFI': 28, 'PLTR': 32, 'HOOD': 18, 'NIO': 25, 'PLUG': 42,
                       'RIVN': 37, 'COIN': 22, 'SNAP': 48, 'PINS': 39, 'SKLZ': 17, 'GM': 30}
         
-        result_data = {'close': [], 'sma_' + str(window): []}
-        index_data = []
+        index_data = [symbol for symbol in symbols if symbol in mock_prices]
+        prices = [mock_prices[symbol] for symbol in index_data]
+        # Make SMA slightly lower than price (above SMA)
+        result_data = {'close': prices, **{column: [price * 0.9 for price in prices] for column in columns[1:]}}
         
-        for symbol in symbols:
-            if symbol in mock_prices:
-                price = mock_prices[symbol]
-                # Make SMA slightly lower than price (above SMA)
-                sma = price * 0.9
-                
-                result_data['close'].append(price)
-                result_data['sma_' + str(window)].append(sma)
-                index_data.append(symbol)
-        
-        return pd.DataFrame(result_data, index=index_data)
+        return pd.DataFrame(result_data, index=index_data, columns=columns)
     
     try:
         # Download data for all symbols
-        data = yf.download(symbols, period='1y', progress=False)
-        
-        # Calculate SMA
-        sma = data['Close'].rolling(window=window).mean()
+        closes = yf.download(symbols, period='1y', progress=False)['Close']
+        if isinstance(closes, pd.Series):
+            closes = closes.to_frame(symbols[0])
         
         # Prepare result DataFrame
-        result = pd.DataFrame({
-            'close': data['Close'].iloc[-1],
-            f'sma_{window}': sma.iloc[-1]
-        })
+        result = pd.DataFrame({'close': closes.iloc[-1]})
+        for window in windows:
+            recent = closes.iloc[-window:]
+            result[f'sma_{window}'] = recent.mean().where(recent.count() == window)
         
         return result
         
     except Exception as e:
         logger.error(f"Failed to get SMA data: {e}")
         # Return empty DataFrame with correct columns
-        return pd.DataFrame(columns=['close', f'sma_{window}']) 
\ No newline at end of file
+        return pd.DataFrame(columns=columns)
@@ -1,9 +1,19 @@
 """
 YAML configuration loader with strict key checking.
 """
+import logging
 import yaml
 from typing import Dict
 
+logger = logging.getLogger(__name__)
+
+# libyaml's C parser is several times faster than the pure-Python one and just as safe
+try:
+    YAML_LOADER = yaml.CSafeLoader
+except AttributeError:  # pragma: no cover - PyYAML built without libyaml
+    YAML_LOADER = yaml.SafeLoader
+    logger.warning("libyaml not available; parsing YAML with the slower pure-Python loader")
+
 class ConfigLoaderError(Exception):
     pass
 
@@ -24,7 +34,7 @@ def load_config(path: str) -> Dict:
     """
     try:
         with open(path, 'r') as f:
-            config = yaml.safe_load(f)
+            config = yaml.load(f, Loader=YAML_LOADER)
         if not isinstance(config, dict):
             raise ConfigLoaderError(f"Config at {path} is not a dict.")
         return config
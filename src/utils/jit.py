@@ -0,0 +1,19 @@
+"""
+Optional numba JIT compilation.
+
+``njit`` is numba's decorator when numba is installed; otherwise it leaves
+the decorated function as plain Python, so kernels run either way.
+"""
+__all__ = ["njit", "NUMBA_AVAILABLE"]
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover - numba is optional
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """Fallback decorator that leaves the function uncompiled."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
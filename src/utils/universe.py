@@ -5,7 +5,8 @@ import pandas as pd
 import requests
 import time
 import logging
-from typing import List, Optional
+from functools import lru_cache
+from typing import List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -79,26 +80,43 @@ def get_universe_tickers(universe: str) -> List[str]:
     """
     Gets ticker symbols for the specified universe.
     
+    Results are memoized for the life of the process; failed (empty)
+    lookups are not, so they are retried on the next call. "ALL" is the
+    union of the memoized indices, so an index that failed to load is
+    fetched again next time instead of a partial union being kept.
+    
     Args:
         universe: String specifying which universe to use ("SP500", "NASDAQ", "RUSSELL2000", or "ALL")
         
     Returns:
         List[str]: Combined list of unique ticker symbols
     """
-    if universe.upper() == "SP500":
-        return get_sp500_tickers()
-    elif universe.upper() == "NASDAQ":
-        return get_nasdaq_tickers()
-    elif universe.upper() == "RUSSELL2000" or universe.upper() == "RUSSELL":
-        return get_russell2000_tickers()
-    elif universe.upper() == "ALL":
-        sp500 = set(get_sp500_tickers())
-        nasdaq = set(get_nasdaq_tickers())
-        russell = set(get_russell2000_tickers())
-        return list(sp500 | nasdaq | russell)  # Union of all sets
+    if universe == "ALL":
+        return list(set().union(*(_universe_or_empty(index) for index in ("SP500", "NASDAQ", "RUSSELL2000"))))
+    return _universe_or_empty(universe)
+
+def _universe_or_empty(universe: str) -> List[str]:
+    """A universe's memoized tickers, or an empty list if none could be fetched."""
+    try:
+        return list(_cached_universe_tickers(universe))
+    except LookupError:
+        return []
+
+@lru_cache(maxsize=128)
+def _cached_universe_tickers(universe: str) -> Tuple[str, ...]:
+    """Fetch a universe's tickers, raising LookupError (never cached) if none are found."""
+    if universe == "SP500":
+        tickers = get_sp500_tickers()
+    elif universe == "NASDAQ":
+        tickers = get_nasdaq_tickers()
+    elif universe == "RUSSELL2000" or universe == "RUSSELL":
+        tickers = get_russell2000_tickers()
     else:
         logger.warning(f"Unknown universe: {universe}. Defaulting to S&P 500")
-        return get_sp500_tickers()
+        tickers = get_sp500_tickers()
+    if not tickers:
+        raise LookupError(f"No tickers found for {universe}")
+    return tuple(tickers)
 
 def get_batch_tickers(ticker_list: List[str], batch_size: int = 100) -> List[List[str]]:
     """
@@ -0,0 +1,228 @@
+"""
+Persistent SQLite cache for Yahoo Finance data.
+
+Info dicts and price histories change slowly, so screener runs read them
+from disk when a fresh copy exists instead of downloading them again.
+"""
+import pickle
+import sqlite3
+import time
+import logging
+from contextlib import closing
+from typing import Any, Dict, Iterable, Optional
+
+import pandas as pd
+import yfinance as yf
+
+from src.data.quote_summary import fetch_quote_summary
+from src.data.yf_util import get_ticker
+
+__all__ = ["cached_info", "cached_infos", "cached_statements", "cached_histories", "history_slice",
+           "INFO_TTL", "HISTORY_TTL", "STATEMENTS"]
+
+logger = logging.getLogger(__name__)
+
+CACHE_FILE = 'yf_cache.sqlite'
+
+# Seconds before cached entries go stale
+INFO_TTL = 86400  # 24 hours
+HISTORY_TTL = 3600  # 1 hour
+
+# Financial statements cached by cached_statements, by yf.Ticker attribute
+STATEMENTS = ('balance_sheet', 'income_stmt', 'cashflow')
+
+
+def cached_info(ticker: str, session=None, ttl: int = INFO_TTL) -> Dict[str, Any]:
+    """
+    Get the Yahoo Finance info dict for a ticker, from the cache if fresh.
+
+    Parameters
+    ----------
+    ticker : str
+        Stock ticker symbol
+    session : requests.Session, optional
+        HTTP session passed to ``yf.Ticker`` on a cache miss
+    ttl : int
+        Maximum age of a cached entry in seconds
+
+    Returns
+    -------
+    dict
+        The ticker's info dict
+    """
+    info = _get(ticker, 'info', '', ttl)
+    if info is None:
+        info = get_ticker(ticker, session=session, max_age=ttl).info
+        if info:
+            _put(ticker, 'info', '', info)
+    return info
+
+
+def cached_infos(tickers: Iterable[str], session=None, ttl: int = INFO_TTL) -> Dict[str, Dict[str, Any]]:
+    """
+    Get info dicts for several tickers, fetching stale ones via quoteSummary.
+
+    Tickers missing from the cache are fetched with
+    :func:`src.data.quote_summary.fetch_quote_summary` and stored
+    individually, under the same entries as :func:`cached_info`.
+
+    Parameters
+    ----------
+    tickers : iterable of str
+        Stock ticker symbols
+    session : requests.Session, optional
+        HTTP session used for the quoteSummary requests
+    ttl : int
+        Maximum age of a cached entry in seconds
+
+    Returns
+    -------
+    dict
+        Mapping of ticker to its info dict. Tickers that could not be
+        fetched are left out.
+    """
+    infos = {}
+    missing = []
+    for ticker in tickers:
+        info = _get(ticker, 'info', '', ttl)
+        if info is None:
+            missing.append(ticker)
+        else:
+            infos[ticker] = info
+
+    for ticker, info in fetch_quote_summary(missing, session=session).items():
+        _put(ticker, 'info', '', info)
+        infos[ticker] = info
+
+    return infos
+
+
+def cached_statements(ticker: str, session=None, ttl: int = INFO_TTL) -> Dict[str, Optional[pd.DataFrame]]:
+    """
+    Get a ticker's annual financial statements, from the cache if fresh.
+
+    Parameters
+    ----------
+    ticker : str
+        Stock ticker symbol
+    session : requests.Session, optional
+        HTTP session passed to ``yf.Ticker`` on a cache miss
+    ttl : int
+        Maximum age of a cached entry in seconds
+
+    Returns
+    -------
+    dict
+        Mapping of each name in ``STATEMENTS`` to its DataFrame, or None
+        if it could not be fetched
+    """
+    statements = {name: _get(ticker, name, '', ttl) for name in STATEMENTS}
+    missing = [name for name, statement in statements.items() if statement is None]
+    if missing:
+        stock = get_ticker(ticker, session=session, max_age=ttl)
+        for name in missing:
+            try:
+                statement = getattr(stock, name)
+            except Exception as e:
+                logger.debug(f"Failed to fetch {name} for {ticker}: {e}")
+                continue
+            if statement is not None and not statement.empty:
+                _put(ticker, name, '', statement)
+            statements[name] = statement
+    return statements
+
+
+def cached_histories(tickers: Iterable[str], period: str = "6mo",
+                     ttl: int = HISTORY_TTL) -> Dict[str, pd.DataFrame]:
+    """
+    Get price histories for several tickers, downloading only stale ones.
+
+    Tickers missing from the cache are fetched together in a single
+    ``yf.download`` request and stored individually.
+
+    Parameters
+    ----------
+    tickers : iterable of str
+        Stock ticker symbols
+    period : str
+        History period understood by yfinance, e.g. "6mo"
+    ttl : int
+        Maximum age of a cached entry in seconds
+
+    Returns
+    -------
+    dict
+        Mapping of ticker to its OHLCV DataFrame (empty if unavailable)
+    """
+    histories = {}
+    missing = []
+    for ticker in tickers:
+        hist = _get(ticker, 'history', period, ttl)
+        if hist is None:
+            missing.append(ticker)
+        else:
+            histories[ticker] = hist
+
+    if missing:
+        downloaded = yf.download(missing, period=period, group_by='ticker', threads=True,
+                                 progress=False, auto_adjust=False)
+        for ticker in missing:
+            hist = history_slice(downloaded, ticker)
+            if not hist.empty:
+                _put(ticker, 'history', period, hist)
+            histories[ticker] = hist
+
+    return histories
+
+
+def history_slice(histories: pd.DataFrame, ticker: str) -> pd.DataFrame:
+    """Slice one ticker's OHLCV frame out of a batched download."""
+    if isinstance(histories.columns, pd.MultiIndex):
+        if ticker not in histories.columns.get_level_values(0):
+            return pd.DataFrame()
+        return histories[ticker].dropna(how='all')
+    return histories.dropna(how='all')
+
+
+def _get(ticker: str, endpoint: str, key: str, ttl: int) -> Optional[Any]:
+    """Return a cached payload if one is younger than ``ttl`` seconds."""
+    try:
+        with closing(_connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT payload FROM yf_cache WHERE ticker = ? AND endpoint = ? AND key = ? AND fetched > ?",
+                (ticker.upper(), endpoint, key, time.time() - ttl)
+            ).fetchone()
+        return pickle.loads(row[0]) if row else None
+    except Exception as e:
+        logger.debug(f"Failed to read {endpoint} for {ticker} from cache: {e}")
+        return None
+
+
+def _put(ticker: str, endpoint: str, key: str, payload: Any) -> None:
+    """Store a payload in the cache, replacing any older entry."""
+    try:
+        with closing(_connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO yf_cache (ticker, endpoint, key, fetched, payload) VALUES (?, ?, ?, ?, ?)",
+                (ticker.upper(), endpoint, key, time.time(), pickle.dumps(payload))
+            )
+    except Exception as e:
+        logger.debug(f"Failed to cache {endpoint} for {ticker}: {e}")
+
+
+def _connect() -> sqlite3.Connection:
+    """Open the cache database, creating the table if needed."""
+    conn = sqlite3.connect(CACHE_FILE, timeout=30)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS yf_cache (
+            ticker TEXT,
+            endpoint TEXT,
+            key TEXT,
+            fetched REAL,
+            payload BLOB,
+            PRIMARY KEY (ticker, endpoint, key)
+        )
+        """
+    )
+    return conn
@@ -0,0 +1,40 @@
+"""
+Shared HTTP session for Yahoo Finance requests.
+
+One pooled session lets every ticker lookup reuse open connections instead
+of paying a fresh TLS handshake each time, and retries transient failures
+and rate limiting with backoff.
+"""
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+__all__ = ["SESSION", "make_session"]
+
+
+def make_session(pool_connections: int = 32, pool_maxsize: int = 64) -> requests.Session:
+    """
+    Create a requests session with connection pooling and retries.
+
+    Parameters
+    ----------
+    pool_connections : int
+        Number of hosts to keep connection pools for
+    pool_maxsize : int
+        Maximum open connections per host, enough for the screeners' fetch threads
+
+    Returns
+    -------
+    requests.Session
+        Session retrying 429 and 5xx gateway errors up to 3 times
+    """
+    retry = Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+# Shared by the screeners; safe to use from several threads for independent requests
+SESSION = make_session()
@@ -6,6 +6,7 @@ import pytest
 from unittest.mock import patch, Mock, MagicMock
 import json
 
+from src.execution import broker_alpaca
 from src.execution.broker_alpaca import (
     submit_bracket,
     cancel_symbol,
@@ -16,6 +17,13 @@ from src.execution.broker_alpaca import (
 )
 
 
+@pytest.fixture(autouse=True)
+def no_shared_clients(monkeypatch):
+    """Start every test without cached REST clients."""
+    monkeypatch.setattr(broker_alpaca, '_clients', {})
+    monkeypatch.setattr(broker_alpaca, '_positions_cache', None)
+
+
 @pytest.fixture
 def mock_env():
     """Set up mock environment variables for testing."""
@@ -46,6 +54,7 @@ def mock_alpaca_client():
     
     # Mock position object
     mock_position = Mock()
+    mock_position.symbol = "AAPL"
     mock_position._raw = {
         "symbol": "AAPL",
         "qty": "10",
@@ -73,6 +82,13 @@ def test_get_alpaca_client(mock_env):
         mock_rest.assert_called_once_with("test_key", "test_secret", APCA_API_BASE_URL_PAPER)
 
 
+def test_get_alpaca_client_reused(mock_env):
+    """Test the client is created once and shared between calls."""
+    with patch('src.execution.broker_alpaca.REST') as mock_rest:
+        assert _get_alpaca_client() is _get_alpaca_client()
+        mock_rest.assert_called_once()
+
+
 def test_get_alpaca_client_missing_credentials():
     """Test error when credentials are missing."""
     with patch.dict(os.environ, {}, clear=True):
@@ -189,7 +205,7 @@ def test_cancel_symbol_success(mock_env, mock_alpaca_client):
         result = cancel_symbol("AAPL")
         
         # Check that list_orders was called
-        mock_alpaca_client.list_orders.assert_called_once_with(status="open")
+        mock_alpaca_client.list_orders.assert_called_once_with(status="open", symbols=["AAPL"])
         
         # Check that cancel_order was called
         mock_alpaca_client.cancel_order.assert_called_once_with("test_order_id")
@@ -200,6 +216,24 @@ def test_cancel_symbol_success(mock_env, mock_alpaca_client):
         assert result[0]["symbol"] == "AAPL"
 
 
+def test_cancel_symbol_multiple_orders(mock_env, mock_alpaca_client):
+    """Test every open order for the symbol is canceled, in order."""
+    orders = []
+    for i in range(5):
+        order = Mock()
+        order.id = f"order_{i}"
+        order.symbol = "AAPL"
+        order._raw = {"id": f"order_{i}", "symbol": "AAPL"}
+        orders.append(order)
+    mock_alpaca_client.list_orders.return_value = orders
+    
+    with patch('src.execution.broker_alpaca._get_alpaca_client', return_value=mock_alpaca_client):
+        result = cancel_symbol("AAPL")
+    
+    assert [order["id"] for order in result] == [f"order_{i}" for i in range(5)]
+    assert mock_alpaca_client.cancel_order.call_count == 5
+
+
 def test_cancel_symbol_no_orders(mock_env, mock_alpaca_client):
     """Test cancellation when no orders exist for the symbol."""
     # Set up mock to return empty list
@@ -209,7 +243,7 @@ def test_cancel_symbol_no_orders(mock_env, mock_alpaca_client):
         result = cancel_symbol("AAPL")
         
         # Check that list_orders was called
-        mock_alpaca_client.list_orders.assert_called_once_with(status="open")
+        mock_alpaca_client.list_orders.assert_called_once_with(status="open", symbols=["AAPL"])
         
         # Check that cancel_order was not called
         mock_alpaca_client.cancel_order.assert_not_called()
@@ -247,8 +281,9 @@ def test_get_positions_symbol(mock_env, mock_alpaca_client):
     with patch('src.execution.broker_alpaca._get_alpaca_client', return_value=mock_alpaca_client):
         result = get_positions("AAPL")
         
-        # Check that get_position was called with the correct symbol
-        mock_alpaca_client.get_position.assert_called_once_with("AAPL")
+        # Check the position came from the bulk positions request
+        mock_alpaca_client.list_positions.assert_called_once()
+        mock_alpaca_client.get_position.assert_not_called()
         
         # Check the result
         assert result["symbol"] == "AAPL"
@@ -257,23 +292,21 @@ def test_get_positions_symbol(mock_env, mock_alpaca_client):
 
 def test_get_positions_symbol_not_found(mock_env, mock_alpaca_client):
     """Test retrieving a position that doesn't exist."""
-    # Create a mock APIError with a proper error message
-    class MockAPIError(Exception):
-        pass
-    
-    # Set up mock to raise APIError for non-existent position
-    mock_api_error = MockAPIError("position does not exist")
-    mock_alpaca_client.get_position.side_effect = mock_api_error
-    
     with patch('src.execution.broker_alpaca._get_alpaca_client', return_value=mock_alpaca_client):
-        with patch('src.execution.broker_alpaca.APIError', MockAPIError):
-            result = get_positions("MSFT")
-            
-            # Check that get_position was called with the correct symbol
-            mock_alpaca_client.get_position.assert_called_once_with("MSFT")
-            
-            # Check the result is an empty dict
-            assert result == {}
+        assert get_positions("MSFT") == {}
+
+
+def test_get_positions_cached(mock_env, mock_alpaca_client):
+    """Test several lookups share one request until an order invalidates it."""
+    with patch('src.execution.broker_alpaca._get_alpaca_client', return_value=mock_alpaca_client):
+        get_positions("AAPL")
+        get_positions("MSFT")
+        get_positions()
+        assert mock_alpaca_client.list_positions.call_count == 1
+        
+        submit_bracket(symbol="AAPL", qty=10, entry_price=150.0, take_profit_price=155.0, stop_loss_price=145.0)
+        get_positions("AAPL")
+        assert mock_alpaca_client.list_positions.call_count == 2
 
 
 def test_get_positions_api_error(mock_env):
@@ -8,7 +8,7 @@ import sqlite3
 from unittest.mock import patch, Mock
 from datetime import date
 
-from src.scoring.buffett import get_score, F_SCORE_THRESHOLD
+from src.scoring.buffett import get_score, F_SCORE_THRESHOLD, _get_price_data
 
 
 def test_get_score_aapl():
@@ -199,4 +199,24 @@ def test_cache_operations():
         
         # Verify commit and close were called
         assert mock_conn.commit.call_count >= 1
-        assert mock_conn.close.call_count >= 1 
\ No newline at end of file
+        assert mock_conn.close.call_count >= 1 
+
+
+@patch('src.scoring.buffett.yf.download')
+def test_get_price_data_atr_per_ticker(mock_download):
+    """Test each ticker gets its own close and 14-day ATR."""
+    import numpy as np
+    import pandas as pd
+    index = pd.date_range('2024-01-01', periods=20)
+    close = pd.DataFrame({'AAA': np.full(20, 10.0), 'BBB': np.full(20, 100.0)}, index=index)
+    mock_download.return_value = pd.concat({
+        'Close': close,
+        'High': close + pd.Series({'AAA': 1.0, 'BBB': 5.0}),
+        'Low': close - pd.Series({'AAA': 1.0, 'BBB': 5.0}),
+    }, axis=1)
+
+    result = _get_price_data(['AAA', 'BBB'])
+
+    assert result.loc['AAA', 'close'] == 10.0
+    assert result.loc['AAA', 'atr'] == pytest.approx(2.0)
+    assert result.loc['BBB', 'atr'] == pytest.approx(10.0)
@@ -23,4 +23,12 @@ def test_non_dict_yaml(tmp_path):
     bad_yaml = tmp_path / 'bad.yml'
     bad_yaml.write_text('- a\n- b\n- c\n')
     with pytest.raises(ConfigLoaderError):
-        load_config(str(bad_yaml)) 
\ No newline at end of file
+        load_config(str(bad_yaml))
+
+
+def test_python_tags_rejected(tmp_path):
+    # The fast loader is still a safe loader: arbitrary Python objects are refused
+    unsafe_yaml = tmp_path / 'unsafe.yml'
+    unsafe_yaml.write_text('strategy: !!python/object/apply:os.getcwd []\n')
+    with pytest.raises(ConfigLoaderError):
+        load_config(str(unsafe_yaml))
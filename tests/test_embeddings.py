@@ -14,6 +14,14 @@ from src.utils.embeddings import (
 )
 from src.llm.embeddings import fetch_fundamentals, explain_with_fingpt
 import pandas as pd
+import src.utils.yf_cache as yf_cache
+import src.data.yf_util as yf_util
+
+@pytest.fixture(autouse=True)
+def cache_file(tmp_path, monkeypatch):
+    """Point the Yahoo Finance cache at a temporary database, with no shared Ticker objects."""
+    monkeypatch.setattr(yf_cache, 'CACHE_FILE', str(tmp_path / 'yf_cache.sqlite'))
+    monkeypatch.setattr(yf_util, '_tickers', {})
 
 @pytest.fixture
 def mock_tokenizer():
@@ -210,9 +218,10 @@ def test_explain_with_fingpt(mock_fetch, mock_model, mock_tokenizer):
         'beta': 1.2
     }
     
-    mock_tokenizer.return_value = MagicMock()
+    mock_tokenizer.return_value = {'input_ids': [[1, 2, 3]]}
+    mock_tokenizer.pad.return_value = {'input_ids': MagicMock(), 'attention_mask': MagicMock()}
     mock_model.generate.return_value = [MagicMock()]
-    mock_tokenizer.decode.return_value = "This is a test explanation for AAPL stock."
+    mock_tokenizer.batch_decode.return_value = ["This is a test explanation for AAPL stock."]
     
     # Call function
     explanation = explain_with_fingpt('AAPL')
@@ -221,4 +230,4 @@ def test_explain_with_fingpt(mock_fetch, mock_model, mock_tokenizer):
     assert explanation == "This is a test explanation for AAPL stock."
     assert mock_fetch.called
     assert mock_model.generate.called
-    assert mock_tokenizer.decode.called 
\ No newline at end of file
+    assert mock_tokenizer.batch_decode.called
@@ -4,9 +4,11 @@ Tests for FMP API client functionality.
 import os
 import pytest
 import json
+import requests
 from unittest.mock import patch, Mock, call
 
-from src.data.fmp import fetch_fundamentals
+import src.data.fmp as fmp
+from src.data.fmp import fetch_fundamentals, fetch_fundamentals_many
 
 
 @pytest.fixture
@@ -43,11 +45,11 @@ def test_fetch_fundamentals_success(mock_env_api_key, monkeypatch):
     mock_response.status_code = 200
     mock_response.json.return_value = mock_data
     
-    # Mock requests.get
-    with patch('requests.get', return_value=mock_response):
-        with patch('requests_cache.install_cache'):  # Mock the cache installation
-            result = fetch_fundamentals("AAPL")
+    # Mock the module's cached session
+    with patch.object(fmp._SESSION, 'get', return_value=mock_response) as mock_get:
+        result = fetch_fundamentals("AAPL")
             
+    assert mock_get.call_args.kwargs['params'] == {'apikey': 'test_api_key', 'limit': 10}
     assert result == mock_data
     assert result[0]["symbol"] == "AAPL"
     assert "grossProfitMargin" in result[0]
@@ -60,71 +62,53 @@ def test_fetch_fundamentals_invalid_ticker(mock_env_api_key):
     mock_response.status_code = 200
     mock_response.json.return_value = []
     
-    with patch('requests.get', return_value=mock_response):
-        with patch('requests_cache.install_cache'):
-            with pytest.raises(RuntimeError, match="No data found for ticker: INVALID"):
-                fetch_fundamentals("INVALID")
+    with patch.object(fmp._SESSION, 'get', return_value=mock_response):
+        with pytest.raises(RuntimeError, match="No data found for ticker: INVALID"):
+            fetch_fundamentals("INVALID")
 
 
-def test_fetch_fundamentals_rate_limit(mock_env_api_key):
-    """Test rate limit handling with retries."""
-    # Create mocks for rate limited and successful responses
-    rate_limited_response = Mock()
-    rate_limited_response.status_code = 429
+def test_fetch_fundamentals_rate_limit():
+    """Test rate limits and unavailable responses are retried with backoff by the session."""
+    retry = fmp._SESSION.get_adapter("https://financialmodelingprep.com").max_retries
     
-    success_response = Mock()
-    success_response.status_code = 200
-    success_response.json.return_value = [{"symbol": "AAPL", "date": "2023-09-30"}]
-    
-    # Set up the requests.get mock to return rate limited responses first, then success
-    mock_get = Mock(side_effect=[rate_limited_response, rate_limited_response, success_response])
-    
-    with patch('requests.get', mock_get):
-        with patch('requests_cache.install_cache'):
-            with patch('time.sleep') as mock_sleep:
-                result = fetch_fundamentals("AAPL")
-                
-                # Verify sleep was called twice
-                assert mock_sleep.call_count == 2
-                
-                # Verify the result
-                assert result == [{"symbol": "AAPL", "date": "2023-09-30"}]
+    assert retry.total == 3
+    assert retry.backoff_factor == 0.5
+    assert set(retry.status_forcelist) == {429, 502, 503}
 
 
 def test_fetch_fundamentals_rate_limit_exceeded(mock_env_api_key):
     """Test error when rate limit is exceeded after max retries."""
-    # Create mocks for the rate limited responses
-    rate_limited_response1 = Mock()
-    rate_limited_response1.status_code = 429
-    
-    rate_limited_response2 = Mock()
-    rate_limited_response2.status_code = 429
-    
-    # The last one will trigger the exception
-    rate_limited_response3 = Mock()
-    rate_limited_response3.status_code = 429
-    
-    # Set up the side effect sequence
-    mock_get = Mock(side_effect=[
-        rate_limited_response1,
-        rate_limited_response2,
-        rate_limited_response3
-    ])
+    retry_error = requests.exceptions.RetryError("Max retries exceeded (too many 429 error responses)")
     
-    with patch('requests.get', mock_get):
-        with patch('requests_cache.install_cache'):
-            with patch('time.sleep') as mock_sleep:
-                # The error is raised on the 3rd retry (when retry_count == max_retries)
-                with pytest.raises(RuntimeError, match="Rate limit exceeded after 3 retries"):
-                    fetch_fundamentals("AAPL")
-                
-                # Only 2 sleeps happen because the 3rd attempt raises the exception
-                # before sleeping again
-                assert mock_sleep.call_count == 2
+    with patch.object(fmp._SESSION, 'get', side_effect=retry_error):
+        with pytest.raises(RuntimeError, match="Rate limit exceeded after 3 retries"):
+            fetch_fundamentals("AAPL")
+
+
+def test_fetch_fundamentals_request_error(mock_env_api_key):
+    """Test other request failures are reported as RuntimeError."""
+    with patch.object(fmp._SESSION, 'get', side_effect=requests.exceptions.ConnectionError("offline")):
+        with pytest.raises(RuntimeError, match="Failed to fetch data for AAPL: offline"):
+            fetch_fundamentals("AAPL")
 
 
 def test_missing_api_key():
     """Test error when API key is not set."""
     with patch.dict(os.environ, {}, clear=True):
         with pytest.raises(RuntimeError, match="FMP_KEY environment variable not set"):
-            fetch_fundamentals("AAPL") 
\ No newline at end of file
+            fetch_fundamentals("AAPL") 
+
+def test_fetch_fundamentals_many(mock_env_api_key):
+    """Test several tickers are fetched and failed ones left out."""
+    def get(url, params=None, timeout=None):
+        response = Mock()
+        ticker = url.rsplit('/', 1)[-1]
+        response.json.return_value = [] if ticker == "INVALID" else [{"symbol": ticker}]
+        return response
+    
+    with patch.object(fmp._SESSION, 'get', side_effect=get) as mock_get:
+        result = fetch_fundamentals_many(["AAPL", "INVALID", "MSFT"], years=5)
+    
+    assert result == {"AAPL": [{"symbol": "AAPL"}], "MSFT": [{"symbol": "MSFT"}]}
+    assert mock_get.call_count == 3
+    assert all(c.kwargs['params']['limit'] == 5 for c in mock_get.call_args_list)
@@ -6,7 +6,15 @@ from unittest.mock import patch, MagicMock
 import pandas as pd
 import numpy as np
 
-from src.llm.embeddings import fetch_fundamentals, explain_with_fingpt
+from src.llm.embeddings import fetch_fundamentals, explain_with_fingpt, explain_with_fingpt_batch
+import src.utils.yf_cache as yf_cache
+import src.data.yf_util as yf_util
+
+@pytest.fixture(autouse=True)
+def cache_file(tmp_path, monkeypatch):
+    """Point the Yahoo Finance cache at a temporary database, with no shared Ticker objects."""
+    monkeypatch.setattr(yf_cache, 'CACHE_FILE', str(tmp_path / 'yf_cache.sqlite'))
+    monkeypatch.setattr(yf_util, '_tickers', {})
 
 # Mock data
 @pytest.fixture
@@ -86,6 +94,24 @@ def test_fetch_fundamentals(mock_ticker_info, mock_income_stmt, mock_balance_she
         expected_fcf_growth = ((40000000 - 15000000) / (35000000 - 12000000) - 1) * 100
         assert abs(fundamentals['fcf_growth'] - expected_fcf_growth) < 1e-10
 
+def test_fetch_fundamentals_reads_from_disk(mock_ticker_info, mock_income_stmt, mock_balance_sheet, mock_cash_flow):
+    """Test a second fetch is served from the on-disk cache without requesting the data again."""
+    with patch('yfinance.Ticker') as mock_yf:
+        instance = mock_yf.return_value
+        instance.info = mock_ticker_info
+        instance.income_stmt = mock_income_stmt
+        instance.balance_sheet = mock_balance_sheet
+        instance.cashflow = mock_cash_flow
+        
+        first = fetch_fundamentals('AAPL')
+        # Drop the shared Ticker so only the disk cache can answer
+        yf_util._tickers.clear()
+        mock_yf.side_effect = Exception("API Error")
+        second = fetch_fundamentals('AAPL')
+    
+    assert second == first
+    assert second['pe_ratio'] == 25.5
+
 def test_fetch_fundamentals_error_handling():
     """Test error handling in fetch_fundamentals."""
     with patch('yfinance.Ticker', side_effect=Exception("API Error")):
@@ -125,9 +151,10 @@ def test_explain_with_fingpt(mock_fetch, mock_model, mock_tokenizer, mock_load_m
         'beta': 1.2
     }
     
-    mock_tokenizer.return_value = MagicMock()
+    mock_tokenizer.return_value = {'input_ids': [[1, 2, 3]]}
+    mock_tokenizer.pad.return_value = {'input_ids': MagicMock(), 'attention_mask': MagicMock()}
     mock_model.generate.return_value = [MagicMock()]
-    mock_tokenizer.decode.return_value = "This is a test explanation for AAPL stock."
+    mock_tokenizer.batch_decode.return_value = ["This is a test explanation for AAPL stock."]
     
     # Call function
     explanation = explain_with_fingpt('AAPL')
@@ -135,4 +162,84 @@ def test_explain_with_fingpt(mock_fetch, mock_model, mock_tokenizer, mock_load_m
     # Verify
     assert explanation == "This is a test explanation for AAPL stock."
     assert mock_fetch.called
-    assert mock_load_model.called 
\ No newline at end of file
+    assert mock_load_model.called 
+
+@patch('src.llm.embeddings.load_model')
+@patch('src.llm.embeddings.tokenizer')
+@patch('src.llm.embeddings.model')
+@patch('src.llm.embeddings.fetch_fundamentals')
+def test_explain_with_fingpt_batch(mock_fetch, mock_model, mock_tokenizer, mock_load_model):
+    """Test prompts are generated shortest first in batches and returned in the order given."""
+    mock_fetch.return_value = {key: 1.0 for key in [
+        'pe_ratio', 'pb_ratio', 'ps_ratio', 'ev_to_ebitda', 'profit_margin', 'operating_margin',
+        'roe', 'roa', 'revenue_growth', 'eps_growth', 'fcf_growth', 'current_ratio',
+        'quick_ratio', 'debt_to_equity', 'dividend_yield', 'payout_ratio']}
+    mock_tokenizer.return_value = {'input_ids': [[1, 2, 3], [1], [1, 2]]}
+    mock_tokenizer.pad.side_effect = lambda batch, return_tensors: {
+        'input_ids': batch['input_ids'], 'attention_mask': MagicMock()}
+    mock_model.generate.side_effect = lambda input_ids, **kwargs: input_ids
+    mock_tokenizer.batch_decode.side_effect = lambda outputs, skip_special_tokens: [
+        f"tokens {len(ids)}" for ids in outputs]
+    
+    explanations = explain_with_fingpt_batch(['AAPL', 'MSFT', 'GOOG'], batch_size=2)
+    
+    assert explanations == {'AAPL': 'tokens 3', 'MSFT': 'tokens 1', 'GOOG': 'tokens 2'}
+    assert [call.args[0] for call in mock_model.generate.call_args_list] == [[[1], [1, 2]], [[1, 2, 3]]] 
+    assert mock_model.generate.call_args.kwargs['max_new_tokens'] == 150
+
+def test_build_prompt_skips_missing_fundamentals():
+    """Test the prompt lists only known fundamentals as compact key=value pairs."""
+    from src.llm.embeddings import _build_prompt
+    prompt = _build_prompt('AAPL', {'pe_ratio': 28.123456, 'pb_ratio': 'N/A', 'roe': None,
+                                    'roa': float('nan'), 'debt_to_equity': 150, 'dividend_yield': 0})
+    
+    assert '\n' not in prompt
+    assert 'pe_ratio=28.12 debt_to_equity=150 dividend_yield=0' in prompt
+    assert 'pb_ratio' not in prompt and 'roe=' not in prompt and 'roa=' not in prompt
+
+@patch('src.llm.embeddings.AutoModelForCausalLM')
+@patch('src.llm.embeddings.AutoTokenizer')
+@patch('src.llm.embeddings.torch')
+def test_load_model_half_precision(mock_torch, mock_auto_tokenizer, mock_auto_model, monkeypatch):
+    """Test the model is loaded once in bf16 on CPU, ready for inference."""
+    from src.llm import embeddings
+    monkeypatch.setattr(embeddings, 'tokenizer', None)
+    monkeypatch.setattr(embeddings, 'model', None)
+    monkeypatch.setattr(embeddings, 'device', None)
+    mock_torch.cuda.is_available.return_value = False
+    mock_auto_tokenizer.from_pretrained.return_value.pad_token = None
+    
+    embeddings.load_model()
+    embeddings.load_model()
+    
+    mock_auto_model.from_pretrained.assert_called_once_with(
+        embeddings.MODEL_ID, torch_dtype=mock_torch.bfloat16, low_cpu_mem_usage=True)
+    mock_auto_model.from_pretrained.return_value.to.assert_called_once_with('cpu')
+    assert embeddings.model is mock_auto_model.from_pretrained.return_value.to.return_value.eval.return_value
+    assert embeddings.device == 'cpu'
+    assert embeddings.tokenizer.padding_side == 'left'
+
+@patch('src.llm.embeddings.AutoModelForCausalLM')
+@patch('src.llm.embeddings.ORTModelForCausalLM')
+@patch('src.llm.embeddings.AutoTokenizer')
+@patch('src.llm.embeddings.torch')
+def test_load_model_prefers_int8_onnx_on_cpu(mock_torch, mock_auto_tokenizer, mock_ort_model, mock_auto_model,
+                                             monkeypatch, tmp_path):
+    """Test an INT8 ONNX export is run with ONNX Runtime instead of PyTorch on CPU."""
+    from src.llm import embeddings
+    int8_dir = tmp_path / 'fingpt-onnx-int8'
+    int8_dir.mkdir()
+    (int8_dir / embeddings.ONNX_INT8_FILE).touch()
+    monkeypatch.setattr(embeddings, 'ONNX_INT8_MODEL_DIR', str(int8_dir))
+    monkeypatch.setattr(embeddings, 'ONNX_MODEL_DIR', str(tmp_path / 'fingpt-onnx'))
+    monkeypatch.setattr(embeddings, 'tokenizer', None)
+    monkeypatch.setattr(embeddings, 'model', None)
+    monkeypatch.setattr(embeddings, 'device', None)
+    mock_torch.cuda.is_available.return_value = False
+    
+    embeddings.load_model()
+    
+    mock_ort_model.from_pretrained.assert_called_once_with(
+        str(int8_dir), file_name=embeddings.ONNX_INT8_FILE, provider='CPUExecutionProvider')
+    assert embeddings.model is mock_ort_model.from_pretrained.return_value
+    assert not mock_auto_model.from_pretrained.called
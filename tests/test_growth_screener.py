@@ -0,0 +1,288 @@
+"""
+Tests for the small-cap growth screener.
+"""
+import pytest
+import numpy as np
+import pandas as pd
+from unittest.mock import patch
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import run_growth_screener
+from run_growth_screener import (find_growth_stocks, compute_metrics, compute_batch_metrics, prefilter_by_price,
+                                 generate_growth_memo, fetch_infos, prefilter_smallcap)
+from src.scoring.growth_numba import score_growth, score_growth_batch
+
+@pytest.fixture(autouse=True)
+def no_quote_summary():
+    """Send info lookups down the per-ticker fallback instead of quoteSummary"""
+    with patch('run_growth_screener.cached_infos', return_value={}) as mock_infos:
+        yield mock_infos
+
+def _histories(tickers, days=130):
+    """Build a batched download frame with rising prices for each ticker"""
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=days)
+    close = np.linspace(5, 10, days)
+    frames = {
+        ticker: pd.DataFrame({
+            'Open': close,
+            'High': close * 1.02,
+            'Low': close * 0.98,
+            'Close': close,
+            'Volume': np.full(days, 1_000_000.0)
+        }, index=index)
+        for ticker in tickers
+    }
+    return pd.concat(frames, axis=1)
+
+def _all_tickers(tickers, min_price, max_price):
+    return list(tickers)
+
+def _metrics(ticker, price, score):
+    return {
+        'ticker': ticker,
+        'name': f"{ticker} Corp",
+        'price': price,
+        'market_cap': 500_000_000.0,
+        'sector': 'Technology',
+        'industry': 'Software',
+        'momentum_3m': 10.0,
+        'momentum_1m': 5.0,
+        'volume_ratio': 1.2,
+        'volatility': 3.0,
+        'growth_score': score,
+        'revenue_growth': 20.0,
+        'earnings_growth': None,
+        'atr': 0.5
+    }
+
+@patch('run_growth_screener.generate_growth_memo')
+@patch('run_growth_screener.compute_batch_metrics')
+@patch('run_growth_screener.fetch_info')
+@patch('run_growth_screener.fetch_histories')
+@patch('run_growth_screener.prefilter_by_price', side_effect=_all_tickers)
+@patch('run_growth_screener.get_universe_tickers')
+def test_find_growth_stocks_filters_concurrent_results(mock_universe, mock_prefilter, mock_histories, mock_info,
+                                                       mock_compute, mock_memo):
+    """Test every ticker is fetched and only matching stocks reach the memo"""
+    mock_universe.return_value = ['AAA', 'BBB', 'CCC', 'DDD']
+    mock_histories.return_value = {t: _histories([t])[t] for t in ['AAA', 'BBB', 'CCC', 'DDD']}
+    prices = {'AAA': 10.0, 'BBB': 50.0, 'CCC': 15.0}
+    scores = {'AAA': 60.0, 'BBB': 90.0, 'CCC': 80.0}
+    mock_info.side_effect = lambda t: None if t == 'DDD' else {'shortName': t}
+    mock_compute.side_effect = lambda infos, histories, cutoffs: pd.DataFrame(
+        [_metrics(t, prices[t], scores[t]) for t in infos], index=list(infos))
+    mock_memo.return_value = "memo"
+
+    result = find_growth_stocks(max_price=20, min_price=1, min_growth_score=50, universe="SP500")
+
+    assert result == "memo"
+    mock_histories.assert_called_once_with(['AAA', 'BBB', 'CCC', 'DDD'])
+    assert sorted(call.args[0] for call in mock_info.call_args_list) == ['AAA', 'BBB', 'CCC', 'DDD']
+    infos, histories, cutoffs = mock_compute.call_args.args
+    assert list(infos) == ['AAA', 'BBB', 'CCC']
+    assert cutoffs[0] < cutoffs[1]
+    assert list(histories['AAA'].columns) == ['Open', 'High', 'Low', 'Close', 'Volume']
+    top_stocks = mock_memo.call_args.args[0]
+    assert list(top_stocks['ticker']) == ['CCC', 'AAA']
+    # Scores are downcast, but not the price and market cap used in thresholds
+    assert top_stocks['growth_score'].dtype == np.float32
+    assert top_stocks['price'].dtype == np.float64
+    assert top_stocks['market_cap'].dtype == np.float64
+
+@patch('run_growth_screener.compute_batch_metrics')
+@patch('run_growth_screener.fetch_info')
+@patch('run_growth_screener.fetch_histories')
+@patch('run_growth_screener.prefilter_by_price', side_effect=_all_tickers)
+@patch('run_growth_screener.get_universe_tickers', return_value=['AAA', 'BBB', 'CCC'])
+def test_find_growth_stocks_skips_info_outside_price_range(mock_universe, mock_prefilter, mock_histories, mock_info, mock_compute):
+    """Test info is only requested for stocks whose last close is in range"""
+    hist = _histories(['AAA'])['AAA']
+    mock_histories.return_value = {'AAA': hist, 'BBB': hist * 5, 'CCC': pd.DataFrame()}
+    mock_info.return_value = {'shortName': 'Triple A'}
+    mock_compute.return_value = pd.DataFrame(columns=['price', 'growth_score'])
+
+    find_growth_stocks(max_price=20, min_price=1, universe="SP500")
+
+    mock_info.assert_called_once_with('AAA')
+    assert list(mock_compute.call_args.args[0]) == ['AAA']
+
+@patch('run_growth_screener.fetch_info', return_value=None)
+@patch('run_growth_screener.fetch_histories')
+@patch('run_growth_screener.prefilter_by_price', side_effect=_all_tickers)
+@patch('run_growth_screener.get_universe_tickers', return_value=['AAA'])
+def test_find_growth_stocks_no_results(mock_universe, mock_prefilter, mock_histories, mock_info):
+    """Test the message returned when nothing matches"""
+    mock_histories.return_value = {'AAA': _histories(['AAA'])['AAA']}
+    assert find_growth_stocks(universe="SP500") == "No growth stocks found matching your criteria."
+
+def test_compute_metrics_from_history():
+    """Test metrics are computed from the supplied history without any requests"""
+    hist = _histories(['AAA'])['AAA']
+    info = {'shortName': 'Triple A', 'currentPrice': 0, 'marketCap': 1_000_000_000,
+            'revenueGrowth': 0.2, 'earningsGrowth': None}
+
+    metrics = compute_metrics('AAA', info, hist)
+
+    assert metrics['name'] == 'Triple A'
+    assert metrics['price'] == pytest.approx(hist['Close'].iloc[-1])
+    assert metrics['revenue_growth'] == pytest.approx(20.0)
+    assert pd.isna(metrics['earnings_growth'])
+    assert metrics['momentum_3m'] > 0
+    assert metrics['atr'] > 0
+    assert compute_metrics('AAA', info, pd.DataFrame()) is None
+
+def test_score_growth_components():
+    """Test each component of the growth score"""
+    # 30 (3m, capped) + 20 (1m, capped) + 15 (volume, capped) + 10 (price) + 20 (volatility)
+    # + 15 and 10 (fundamentals, capped)
+    assert score_growth(40.0, 25.0, 3.0, 10.0, 25.0, 50.0, 40.0) == pytest.approx(120.0)
+    # Only the price (2 points per dollar under $5) and volatility components
+    assert score_growth(-5.0, -1.0, 0.5, 2.0, 30.0, np.nan, np.nan) == pytest.approx(4.0 + 16.0)
+    # Missing fundamentals (NaN) score nothing
+    assert score_growth(10.0, 5.0, 1.2, 8.0, 3.0, 10.0, np.nan) == pytest.approx(
+        score_growth(10.0, 5.0, 1.2, 8.0, 3.0, np.nan, np.nan) + 5.0)
+
+def test_compute_metrics_matches_pandas():
+    """Test the array-based volatility, ATR and momentum against pandas"""
+    rng = np.random.default_rng(0)
+    hist = _histories(['AAA'])['AAA']
+    hist['Close'] = 10 + rng.normal(0, 0.5, len(hist)).cumsum() * 0.1
+    hist['High'] = hist['Close'] + rng.uniform(0, 0.3, len(hist))
+    hist['Low'] = hist['Close'] - rng.uniform(0, 0.3, len(hist))
+    info = {'currentPrice': 10.0}
+
+    metrics = compute_metrics('AAA', info, hist)
+
+    close_prev = hist['Close'].shift(1)
+    tr = pd.concat([hist['High'] - hist['Low'], (hist['High'] - close_prev).abs(),
+                    (hist['Low'] - close_prev).abs()], axis=1).max(axis=1)
+    assert metrics['atr'] == pytest.approx(tr.rolling(window=14).mean().iloc[-1])
+    assert metrics['volatility'] == pytest.approx(hist['Close'].pct_change().dropna().std() * 100)
+    cutoff = pd.Timestamp.now() - pd.Timedelta(days=30)
+    start = hist.loc[hist.index <= cutoff, 'Close'].iloc[-1]
+    assert metrics['momentum_1m'] == pytest.approx((hist['Close'].iloc[-1] / start - 1) * 100)
+
+def test_score_growth_batch_matches_scalar():
+    """Test the batch kernel scores each row like the scalar kernel"""
+    rows = [(40.0, 25.0, 3.0, 10.0, 25.0, 50.0, 40.0), (-5.0, -1.0, 0.5, 2.0, 30.0, np.nan, np.nan)]
+    columns = [np.array(column) for column in zip(*rows)]
+
+    assert list(score_growth_batch(*columns)) == pytest.approx([score_growth(*row) for row in rows])
+
+def test_compute_batch_metrics_matches_single_stock():
+    """Test a batch with uneven histories gives the same rows as one stock at a time"""
+    hist = _histories(['AAA'])['AAA']
+    histories = {'AAA': hist, 'BBB': hist.iloc[40:] * 1.5, 'CCC': hist.iloc[-10:], 'DDD': pd.DataFrame()}
+    infos = {t: {'shortName': t, 'currentPrice': 0, 'revenueGrowth': 0.1} for t in ['AAA', 'BBB', 'CCC', 'DDD']}
+
+    batch = compute_batch_metrics(infos, histories)
+
+    assert list(batch.index) == ['AAA', 'BBB', 'CCC']
+    for ticker in batch.index:
+        single = compute_metrics(ticker, infos[ticker], histories[ticker])
+        for column, value in single.items():
+            if isinstance(value, str):
+                assert batch.loc[ticker, column] == value
+            else:
+                assert batch.loc[ticker, column] == pytest.approx(value, nan_ok=True)
+    assert pd.isna(batch.loc['CCC', 'atr'])
+
+@patch('run_growth_screener.fetch_last_prices')
+def test_prefilter_by_price(mock_prices):
+    """Test stocks are kept by their quoted price, in universe order"""
+    mock_prices.return_value = {'AAA': 12.0, 'BBB': 35.0, 'CCC': 4.0}
+
+    # DDD has no quoted price, so it is left for the history price filter
+    assert prefilter_by_price(['CCC', 'BBB', 'AAA', 'DDD'], 1, 20) == ['CCC', 'AAA', 'DDD']
+
+    # Without any prices nothing is filtered out
+    mock_prices.return_value = {}
+    assert prefilter_by_price(['AAA', 'BBB'], 1, 20) == ['AAA', 'BBB']
+    mock_prices.side_effect = ValueError("rate limited")
+    assert prefilter_by_price(['AAA', 'BBB'], 1, 20) == ['AAA', 'BBB']
+
+def test_generate_growth_memo():
+    """Test the memo lists each stock with its position and formatted metrics"""
+    stocks_df = pd.DataFrame([_metrics('AAA', 10.0, 80.0), _metrics('BBB', 4.0, 60.0)], index=['AAA', 'BBB'])
+
+    memo = generate_growth_memo(stocks_df, buying_power=10000)
+
+    assert "### 1. AAA - AAA Corp - Growth Score: 80/100" in memo
+    assert "### 2. BBB - BBB Corp - Growth Score: 60/100" in memo
+    assert "- Suggested Position: 500 shares ($5,000.00)" in memo
+    assert "- Market Cap: $500.00M" in memo
+    assert "- Earnings Growth: N/A" in memo
+
+@patch('run_growth_screener.generate_growth_memo', return_value="memo")
+@patch('run_growth_screener.fetch_info', side_effect=lambda t: {'shortName': t, 'revenueGrowth': 0.5})
+@patch('run_growth_screener.fetch_histories',
+       side_effect=lambda batch: {t: _histories(['AAA'])['AAA'] for t in batch})
+@patch('run_growth_screener.prefilter_by_price', side_effect=_all_tickers)
+@patch('run_growth_screener.get_universe_tickers', return_value=[f"T{i:03d}" for i in range(250)])
+def test_find_growth_stocks_scores_batches_in_worker_processes(mock_universe, mock_prefilter, mock_histories,
+                                                               mock_info, mock_memo):
+    """Test every batch is scored when several batches run in the process pool"""
+    assert find_growth_stocks(max_price=20, min_price=1, min_growth_score=0, universe="SP500",
+                              max_stocks=300) == "memo"
+
+    top_stocks = mock_memo.call_args.args[0]
+    assert sorted(top_stocks['ticker']) == [f"T{i:03d}" for i in range(250)]
+
+def test_worker_gets_its_own_session(monkeypatch):
+    """Test a worker process replaces the HTTP session inherited from the parent"""
+    parent_session = run_growth_screener.SESSION
+    monkeypatch.setattr(run_growth_screener, 'SESSION', parent_session)
+
+    run_growth_screener._init_worker()
+
+    assert run_growth_screener.SESSION is not parent_session
+    run_growth_screener.SESSION.close()
+
+def test_compute_metrics_uses_supplied_cutoffs():
+    """Test momentum is measured from the closes on or before the given cutoffs"""
+    hist = _histories(['AAA'])['AAA']
+    cutoffs = (np.datetime64(hist.index[10]), np.datetime64(hist.index[-20] + pd.Timedelta(hours=12)))
+
+    metrics = compute_metrics('AAA', {}, hist, cutoffs)
+
+    end = hist['Close'].iloc[-1]
+    assert metrics['momentum_3m'] == pytest.approx((end / hist['Close'].iloc[10] - 1) * 100)
+    assert metrics['momentum_1m'] == pytest.approx((end / hist['Close'].iloc[-20] - 1) * 100)
+    # A cutoff before the history starts leaves no momentum
+    early = np.datetime64(hist.index[0] - pd.Timedelta(days=1))
+    assert compute_metrics('AAA', {}, hist, (early, early))['momentum_3m'] == 0
+
+@patch('run_growth_screener.fetch_info')
+def test_fetch_infos_falls_back_to_full_info(mock_info, no_quote_summary):
+    """Test only stocks quoteSummary could not return use the full info lookup"""
+    no_quote_summary.return_value = {'AAA': {'shortName': 'Triple A'}}
+    mock_info.side_effect = lambda t: None if t == 'CCC' else {'shortName': t}
+
+    assert fetch_infos(['AAA', 'BBB', 'CCC']) == {'AAA': {'shortName': 'Triple A'}, 'BBB': {'shortName': 'BBB'}}
+    mock_info.assert_any_call('BBB')
+    assert mock_info.call_count == 2
+
+@patch('run_growth_screener.fetch_market_caps')
+def test_prefilter_smallcap(mock_caps):
+    """Test stocks with a known market cap over the limit are dropped, unknown ones kept"""
+    mock_caps.return_value = {'AAA': 5e8, 'BBB': 3e10, 'CCC': 1.9e9}
+
+    assert prefilter_smallcap(['CCC', 'BBB', 'AAA', 'DDD']) == ['CCC', 'AAA', 'DDD']
+
+    # Without any market caps nothing is filtered out
+    mock_caps.return_value = {}
+    assert prefilter_smallcap(['AAA', 'DDD']) == ['AAA', 'DDD']
+
+@patch('run_growth_screener.fetch_histories', return_value={})
+@patch('run_growth_screener.prefilter_by_price', side_effect=_all_tickers)
+@patch('run_growth_screener.prefilter_smallcap', return_value=['AAA'])
+@patch('run_growth_screener.get_universe_tickers', return_value=['AAA', 'BBB'])
+def test_find_growth_stocks_smallcap_gate(mock_universe, mock_smallcap, mock_prefilter, mock_histories):
+    """Test the SMALLCAP universe screens ALL after the market-cap gate"""
+    find_growth_stocks(universe="SMALLCAP")
+
+    mock_universe.assert_called_once_with("ALL")
+    mock_smallcap.assert_called_once_with(['AAA', 'BBB'])
+    mock_histories.assert_called_once_with(['AAA'])
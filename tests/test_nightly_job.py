@@ -2,16 +2,22 @@
 Tests for nightly job functionality.
 """
 import os
+import gzip
 import json
 import pytest
 from unittest.mock import patch, MagicMock
 import pandas as pd
 from datetime import datetime
 
+from src.jobs import nightly_job
 from src.jobs.nightly_job import (
     load_config,
+    cached_smas,
     get_top_stocks,
     generate_memo,
+    write_memo,
+    explain_stocks,
+    submit_orders,
     post_to_slack,
     main
 )
@@ -47,6 +53,12 @@ def mock_config():
         }
     }
 
+@pytest.fixture(autouse=True)
+def sma_cache_dir(tmp_path, monkeypatch):
+    """Keep each test's cached SMAs apart."""
+    monkeypatch.setattr(nightly_job, 'SMA_CACHE_DIR', tmp_path / 'cache')
+    return tmp_path / 'cache'
+
 @pytest.fixture
 def mock_env_vars(monkeypatch):
     monkeypatch.setenv('SLACK_URL', 'https://hooks.slack.com/test')
@@ -70,12 +82,12 @@ def test_load_config(tmp_path):
     assert config['filters']['sma_200'] is True
 
 @patch('src.jobs.nightly_job.get_f_score')
-@patch('src.jobs.nightly_job.get_sma')
-def test_get_top_stocks(mock_get_sma, mock_get_f_score, mock_config):
+@patch('src.jobs.nightly_job.get_smas')
+def test_get_top_stocks(mock_get_smas, mock_get_f_score, mock_config):
     """Test stock filtering and ranking."""
     # Setup mocks
     mock_get_f_score.return_value = MOCK_F_SCORES
-    mock_get_sma.return_value = MOCK_SMA_DATA
+    mock_get_smas.return_value = MOCK_SMA_DATA
     
     # Get top stocks
     top_stocks = get_top_stocks(mock_config)
@@ -86,6 +98,49 @@ def test_get_top_stocks(mock_get_sma, mock_get_f_score, mock_config):
     assert all(score >= 7 for score in top_stocks['score'])
     assert all(symbol in expected for symbol in top_stocks.index)
 
+@patch('src.jobs.nightly_job.get_f_score', return_value=MOCK_F_SCORES)
+@patch('src.jobs.nightly_job.get_smas')
+def test_get_top_stocks_combined_filters(mock_get_smas, mock_get_f_score):
+    """Test both SMAs are fetched in one call, only for stocks that passed the earlier filters."""
+    smas = MOCK_SMA_DATA.assign(sma_50=110)
+    smas.loc[['AAPL', 'AMZN', 'NVDA'], 'sma_50'] = 90
+    mock_get_smas.return_value = smas
+    config = {'filters': {'f_score': 7, 'sma_200': True, 'sma_50': True, 'max_price': 150}}
+    
+    top_stocks = get_top_stocks(config)
+    
+    assert list(top_stocks.index) == ['AMZN', 'AAPL']
+    mock_get_smas.assert_called_once_with(['AAPL', 'MSFT', 'AMZN', 'META', 'TSLA'], [200, 50])
+
+@patch('src.jobs.nightly_job.get_f_score', return_value=MOCK_F_SCORES)
+@patch('src.jobs.nightly_job.cached_infos')
+def test_get_top_stocks_market_cap_filter(mock_infos, mock_get_f_score):
+    """Test the market-cap bounds, dropping stocks whose market cap can't be fetched."""
+    # TSLA's info couldn't be fetched
+    mock_infos.return_value = {'AAPL': {'marketCap': 3e12}, 'MSFT': {'marketCap': 2e11},
+                               'AMZN': {'marketCap': 5e10}, 'META': {'marketCap': 1e12}}
+    config = {'filters': {'f_score': 7, 'min_market_cap': 1e11, 'max_market_cap': 2e12}}
+    
+    top_stocks = get_top_stocks(config)
+    
+    assert sorted(top_stocks.index) == ['META', 'MSFT']
+    mock_infos.assert_called_once()
+    assert sorted(mock_infos.call_args.args[0]) == ['AAPL', 'AMZN', 'META', 'MSFT', 'TSLA']
+
+@patch('src.jobs.nightly_job.get_smas')
+def test_cached_smas_fetches_each_symbol_once_a_day(mock_get_smas, sma_cache_dir):
+    """Test SMAs saved earlier in the day are reused and only new symbols are fetched."""
+    mock_get_smas.side_effect = lambda symbols, windows: MOCK_SMA_DATA.loc[symbols]
+    
+    first = cached_smas(['AAPL', 'MSFT'], [200])
+    second = cached_smas(['MSFT', 'GOOG'], [200])
+    
+    assert [call.args[0] for call in mock_get_smas.call_args_list] == [['AAPL', 'MSFT'], ['GOOG']]
+    assert list(first.index) == ['AAPL', 'MSFT']
+    assert sorted(second.index) == ['GOOG', 'MSFT']
+    assert second.loc['GOOG', 'sma_200'] == 90
+    assert len(list(sma_cache_dir.glob('sma200_*.parquet'))) == 1
+
 def test_generate_memo():
     """Test memo generation."""
     # Create test data
@@ -110,6 +165,45 @@ def test_generate_memo():
     assert 'Test explanation 1' in memo
     assert 'MSFT (F-score: 7)' in memo
     assert 'Test explanation 2' in memo
+    assert memo.endswith("GOOG (F-score: 9)\nExplanation: Test explanation 3\n\n")
+
+def test_write_memo_matches_generate_memo(tmp_path):
+    """Test the memo streamed to a file is the same as the generated string."""
+    stocks = MOCK_F_SCORES.head(3)
+    memo_path = tmp_path / "memo.txt"
+    with open(memo_path, 'w') as f:
+        write_memo(stocks, MOCK_EXPLANATIONS, f)
+    
+    assert memo_path.read_text() == generate_memo(stocks, MOCK_EXPLANATIONS)
+
+@patch('src.jobs.nightly_job.explain_with_fingpt_batch')
+def test_explain_stocks(mock_explain):
+    """Test every stock is explained in one batched call, with a placeholder if that fails."""
+    mock_explain.side_effect = lambda symbols: {symbol: MOCK_EXPLANATIONS[symbol] for symbol in symbols}
+    
+    explanations = explain_stocks(['AAPL', 'GOOG', 'MSFT'])
+    
+    assert list(explanations) == ['AAPL', 'GOOG', 'MSFT']
+    assert explanations['AAPL'] == MOCK_EXPLANATIONS['AAPL']
+    mock_explain.assert_called_once_with(['AAPL', 'GOOG', 'MSFT'])
+    
+    mock_explain.side_effect = RuntimeError("model unavailable")
+    assert explain_stocks(['AAPL']) == {'AAPL': 'No explanation available'}
+    assert explain_stocks([]) == {}
+
+@patch('src.jobs.nightly_job.submit_bracket')
+def test_submit_orders_isolates_failures(mock_submit_bracket):
+    """Test a failed order is reported without stopping the others."""
+    def submit(symbol, *args):
+        if symbol == 'MSFT':
+            raise RuntimeError("Failed to submit bracket order")
+        return {'symbol': symbol}
+    mock_submit_bracket.side_effect = submit
+    orders = [('AAPL', 10, 100.0, 108.0, 96.0), ('MSFT', 5, 200.0, 212.0, 194.0), ('GOOG', 2, 300.0, 316.0, 292.0)]
+    
+    assert submit_orders(orders) == ['MSFT']
+    assert mock_submit_bracket.call_count == 3
+    mock_submit_bracket.assert_any_call('GOOG', 2, 300.0, 316.0, 292.0)
 
 @patch('requests.post')
 def test_post_to_slack(mock_post, mock_env_vars):
@@ -131,19 +225,20 @@ def test_post_to_slack(mock_post, mock_env_vars):
     # Verify request
     mock_post.assert_called_once()
     args, kwargs = mock_post.call_args
-    assert kwargs['json'] == summary
-    assert kwargs['headers'] == {'Content-Type': 'application/json'}
+    assert json.loads(gzip.decompress(kwargs['data'])) == summary
+    assert kwargs['headers'] == {'Content-Type': 'application/json', 'Content-Encoding': 'gzip'}
+    assert kwargs['timeout'] == 5
 
 @patch('src.jobs.nightly_job.get_f_score')
-@patch('src.jobs.nightly_job.get_sma')
-@patch('src.jobs.nightly_job.explain_with_fingpt')
+@patch('src.jobs.nightly_job.get_smas')
+@patch('src.jobs.nightly_job.explain_with_fingpt_batch')
 @patch('src.jobs.nightly_job.submit_bracket')
 @patch('src.jobs.nightly_job.post_to_slack')
 def test_main_dry_run(
     mock_post_slack,
     mock_submit_bracket,
     mock_explain,
-    mock_get_sma,
+    mock_get_smas,
     mock_get_f_score,
     mock_config,
     tmp_path,
@@ -152,8 +247,8 @@ def test_main_dry_run(
     """Test main function in dry-run mode."""
     # Setup mocks
     mock_get_f_score.return_value = MOCK_F_SCORES
-    mock_get_sma.return_value = MOCK_SMA_DATA
-    mock_explain.side_effect = lambda x: MOCK_EXPLANATIONS.get(x, 'No explanation')
+    mock_get_smas.return_value = MOCK_SMA_DATA
+    mock_explain.side_effect = lambda symbols: {s: MOCK_EXPLANATIONS.get(s, 'No explanation') for s in symbols}
     
     # Create test config
     config_path = tmp_path / "test_config.yml"
@@ -182,15 +277,15 @@ def test_main_dry_run(
         assert 'MSFT' in memo_content
 
 @patch('src.jobs.nightly_job.get_f_score')
-@patch('src.jobs.nightly_job.get_sma')
-@patch('src.jobs.nightly_job.explain_with_fingpt')
+@patch('src.jobs.nightly_job.get_smas')
+@patch('src.jobs.nightly_job.explain_with_fingpt_batch')
 @patch('src.jobs.nightly_job.submit_bracket')
 @patch('src.jobs.nightly_job.post_to_slack')
 def test_main_live(
     mock_post_slack,
     mock_submit_bracket,
     mock_explain,
-    mock_get_sma,
+    mock_get_smas,
     mock_get_f_score,
     mock_config,
     tmp_path,
@@ -199,8 +294,8 @@ def test_main_live(
     """Test main function in live mode."""
     # Setup mocks
     mock_get_f_score.return_value = MOCK_F_SCORES
-    mock_get_sma.return_value = MOCK_SMA_DATA
-    mock_explain.side_effect = lambda x: MOCK_EXPLANATIONS.get(x, 'No explanation')
+    mock_get_smas.return_value = MOCK_SMA_DATA
+    mock_explain.side_effect = lambda symbols: {s: MOCK_EXPLANATIONS.get(s, 'No explanation') for s in symbols}
     
     # Create test config
     config_path = tmp_path / "test_config.yml"
@@ -217,6 +312,9 @@ def test_main_live(
     
     # Verify results
     assert mock_submit_bracket.called  # Orders submitted
+    # $1,000 at risk over a 2-ATR stop of $4 is 250 shares of $100
+    mock_submit_bracket.assert_any_call('AAPL', 250, 100.0, 108.0, 96.0)
+    assert mock_post_slack.call_args.args[0]['positions']['AAPL'] == 250
     assert mock_post_slack.called  # Slack notification sent
     
     # Verify memo was written
@@ -228,10 +326,46 @@ def test_main_live(
         assert 'AAPL' in memo_content
         assert 'MSFT' in memo_content
 
+@patch('src.jobs.nightly_job.get_f_score')
+@patch('src.jobs.nightly_job.get_smas')
+@patch('src.jobs.nightly_job.explain_with_fingpt_batch')
+@patch('src.jobs.nightly_job.submit_bracket')
+@patch('src.jobs.nightly_job.post_to_slack')
+def test_main_live_skips_unsized_positions(
+    mock_post_slack,
+    mock_submit_bracket,
+    mock_explain,
+    mock_get_smas,
+    mock_get_f_score,
+    tmp_path,
+    mock_env_vars
+):
+    """Test main submits no order for a stock sized at zero shares."""
+    f_scores = MOCK_F_SCORES.copy()
+    f_scores.loc['MSFT', 'atr'] = 0
+    mock_get_f_score.return_value = f_scores
+    mock_get_smas.return_value = MOCK_SMA_DATA
+    mock_explain.side_effect = lambda symbols: {s: 'No explanation' for s in symbols}
+    
+    config_path = tmp_path / "test_config.yml"
+    config_path.write_text("""
+    strategy: test_strategy
+    filters:
+        f_score: 7
+        sma_200: true
+    """)
+    
+    with patch('sys.argv', ['nightly_job.py', '--config', str(config_path), '--live']):
+        main()
+    
+    submitted = [call.args[0] for call in mock_submit_bracket.call_args_list]
+    assert 'AAPL' in submitted
+    assert 'MSFT' not in submitted
+
 def test_get_top_stocks_empty(mock_config):
     """Test get_top_stocks returns empty DataFrame if no stocks pass filter."""
     with patch('src.jobs.nightly_job.get_f_score', return_value=pd.DataFrame({'score': [5, 6], 'close': [100, 100], 'atr': [2, 2]}, index=['AAA', 'BBB'])), \
-         patch('src.jobs.nightly_job.get_sma', return_value=pd.DataFrame({'close': [100, 100], 'sma_200': [110, 110]}, index=['AAA', 'BBB'])):
+         patch('src.jobs.nightly_job.get_smas', return_value=pd.DataFrame({'close': [100, 100], 'sma_200': [110, 110]}, index=['AAA', 'BBB'])):
         result = get_top_stocks(mock_config)
         assert result.empty
 
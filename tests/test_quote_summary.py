@@ -0,0 +1,124 @@
+"""
+Tests for the Yahoo Finance quoteSummary client.
+"""
+import pytest
+from unittest.mock import MagicMock
+import requests
+
+from src.data.quote_summary import fetch_quote_summary, fetch_market_caps, fetch_last_prices, fetch_quotes
+
+def _response(json=None, text="", status=200):
+    response = MagicMock()
+    response.json.return_value = json
+    response.text = text
+    response.raise_for_status.side_effect = requests.HTTPError(str(status)) if status >= 400 else None
+    return response
+
+def _session(summaries):
+    """Session serving a crumb and the given quoteSummary payloads by ticker"""
+    def get(url, params=None, timeout=None):
+        if url.endswith('getcrumb'):
+            return _response(text="abc123")
+        if url.endswith('/quote'):
+            symbols = params['symbols'].split(',')
+            return _response(json={'quoteResponse': {'result': [
+                {'symbol': t, params['fields']: summaries[t]} for t in symbols if t in summaries
+            ]}})
+        if 'quoteSummary' in url:
+            ticker = url.rsplit('/', 1)[-1]
+            if ticker not in summaries:
+                return _response(status=404)
+            assert params['crumb'] == "abc123"
+            return _response(json={'quoteSummary': {'result': [summaries[ticker]], 'error': None}})
+        return _response(status=404)
+    session = MagicMock()
+    session.get.side_effect = get
+    return session
+
+def test_fetch_quote_summary_flattens_modules():
+    """Test module fields are merged into one info-style dict of raw values, skipping missing ones"""
+    session = _session({
+        'AAPL': {
+            'price': {'shortName': 'Apple Inc.', 'regularMarketPrice': {'raw': 150.0, 'fmt': '150.00'},
+                      'marketCap': {}},
+            'assetProfile': {'sector': 'Technology', 'industry': 'Consumer Electronics'},
+            'summaryDetail': {'marketCap': {'raw': 2.5e12, 'fmt': '2.5T'}},
+            'financialData': {'revenueGrowth': {'raw': 0.08, 'fmt': '8%'}, 'earningsGrowth': {}}
+        }
+    })
+
+    infos = fetch_quote_summary(['AAPL', 'MISSING'], session=session)
+
+    assert list(infos) == ['AAPL']
+    info = infos['AAPL']
+    assert info['shortName'] == 'Apple Inc.'
+    assert info['regularMarketPrice'] == pytest.approx(150.0)
+    assert info['marketCap'] == pytest.approx(2.5e12)
+    assert info['sector'] == 'Technology'
+    assert info['revenueGrowth'] == pytest.approx(0.08)
+    # A field missing from every module is left out, as in yf.Ticker.info
+    assert 'earningsGrowth' not in info
+
+def test_fetch_quote_summary_empty():
+    """Test no requests are made without tickers"""
+    session = MagicMock()
+    assert fetch_quote_summary([], session=session) == {}
+    session.get.assert_not_called()
+
+def test_fetch_market_caps_batches_symbols(monkeypatch):
+    """Test market caps are requested QUOTE_BATCH_SIZE symbols at a time"""
+    monkeypatch.setattr('src.data.quote_summary.QUOTE_BATCH_SIZE', 2)
+    session = _session({'AAA': 5e8, 'BBB': 0, 'CCC': 3e10})
+
+    assert fetch_market_caps(['AAA', 'BBB', 'CCC'], session=session) == {'AAA': 5e8, 'CCC': 3e10}
+    quote_calls = [call for call in session.get.call_args_list if call.args[0].endswith('/quote')]
+    assert [call.kwargs['params']['symbols'] for call in quote_calls] == ['AAA,BBB', 'CCC']
+
+def test_fetch_last_prices():
+    """Test prices are read from the regularMarketPrice quote field"""
+    session = _session({'AAA': 12.5, 'BBB': None})
+
+    assert fetch_last_prices(['AAA', 'BBB', 'CCC'], session=session) == {'AAA': 12.5}
+    quote_call, = [call for call in session.get.call_args_list if call.args[0].endswith('/quote')]
+    assert quote_call.kwargs['params']['fields'] == 'regularMarketPrice'
+
+def test_fetch_quotes_requests_fields_with_crumb():
+    """Test whole quote records are returned for the requested fields"""
+    session = _session({'AAA': 'Triple A'})
+
+    assert fetch_quotes(['AAA', 'BBB'], ['shortName'], session=session) == {
+        'AAA': {'symbol': 'AAA', 'shortName': 'Triple A'}}
+    quote_call, = [call for call in session.get.call_args_list if call.args[0].endswith('/quote')]
+    assert quote_call.kwargs['params'] == {'symbols': 'AAA,BBB', 'fields': 'shortName', 'crumb': 'abc123'}
+
+def test_crumb_fetched_once_per_session():
+    """Test repeated calls on one session reuse its crumb"""
+    session = _session({'AAA': {'price': {'shortName': 'Triple A'}}})
+
+    fetch_quote_summary(['AAA'], session=session)
+    fetch_quote_summary(['AAA'], session=session)
+
+    crumb_calls = [call for call in session.get.call_args_list if call.args[0].endswith('getcrumb')]
+    assert len(crumb_calls) == 1
+
+def test_fetch_quotes_retries_failed_batch(caplog):
+    """Test a failed batch is retried with a new crumb, and logged if it keeps failing"""
+    session = _session({'AAA': 'Triple A'})
+    serve = session.get.side_effect
+    failures = {'/quote': 1}
+    def get(url, params=None, timeout=None):
+        if url.endswith('/quote') and failures['/quote']:
+            failures['/quote'] -= 1
+            return _response(status=401)
+        return serve(url, params=params, timeout=timeout)
+    session.get.side_effect = get
+
+    assert fetch_quotes(['AAA'], ['shortName'], session=session) == {
+        'AAA': {'symbol': 'AAA', 'shortName': 'Triple A'}}
+    crumb_calls = [call for call in session.get.call_args_list if call.args[0].endswith('getcrumb')]
+    assert len(crumb_calls) == 2
+
+    failures['/quote'] = 2
+    with caplog.at_level('WARNING', logger='src.data.quote_summary'):
+        assert fetch_quotes(['AAA'], ['shortName'], session=session) == {}
+    assert "Batch quote request for 1 symbols failed" in caplog.text
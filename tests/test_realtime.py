@@ -2,12 +2,21 @@
 Tests for realtime data streaming functionality.
 """
 import os
+import json
+import time
+import queue
+import asyncio
 import pytest
+import aiohttp
+import pandas as pd
 from unittest.mock import patch, Mock, MagicMock
 from datetime import datetime
+from types import SimpleNamespace
 
 # Import only the Yahoo fallback function to test directly
-from src.data.realtime import _fallback_to_yahoo
+from src.data import realtime
+from src.data.realtime import (Bar, _fallback_to_yahoo, _backoff, _process_message, connect_alpaca_websocket,
+                               connect_alpaca_websocket_batches_async, shutdown, BACKOFF_CAP)
 
 
 @pytest.fixture
@@ -20,68 +29,44 @@ def mock_env_api_keys():
         yield
 
 
+def _minute_bars(tickers, closes):
+    """Batched 1-minute download with a (ticker, field) column per ticker."""
+    frames = {ticker: pd.DataFrame({'Close': [close - 1, close], 'Volume': [500, 1000]})
+              for ticker, close in zip(tickers, closes)}
+    return pd.concat(frames, axis=1)
+
+
 def test_fallback_to_yahoo():
     """Test Yahoo Finance fallback functionality."""
-    # Create a mock for yfinance Ticker
-    mock_ticker = Mock()
-    mock_history = Mock()
-    
-    # Configure the mock to return test data
-    mock_history.empty = False
-    mock_history.iloc = MagicMock()
-    mock_history.iloc.__getitem__.return_value = {'Close': 150.0, 'Volume': 1000}
+    with patch('src.data.realtime.yf.download', return_value=_minute_bars(['AAPL'], [150.0])):
+        result = next(_fallback_to_yahoo(['AAPL']))
     
-    mock_ticker.history.return_value = mock_history
+    # Verify the result is the latest bar
+    assert result.symbol == 'AAPL'
+    assert result.price == 150.0
+    assert result.volume == 1000
+
+
+def test_fallback_to_yahoo_single_ticker_flat_columns():
+    """Test a single-ticker download without a ticker column level."""
+    flat = _minute_bars(['AAPL'], [150.0])['AAPL']
+    with patch('src.data.realtime.yf.download', return_value=flat):
+        result = next(_fallback_to_yahoo(['AAPL']))
     
-    with patch('yfinance.Ticker', return_value=mock_ticker), \
-         patch('time.sleep', side_effect=StopIteration):  # Stop after first iteration
-        
-        try:
-            generator = _fallback_to_yahoo(['AAPL'])
-            result = next(generator)
-            
-            # Verify the result
-            assert result['symbol'] == 'AAPL'
-            assert result['price'] == 150.0
-            assert result['volume'] == 1000
-            
-        except StopIteration:
-            pass  # Expected to stop after first iteration due to our mock
+    assert result.price == 150.0
 
 
 def test_fallback_to_yahoo_multiple_tickers():
-    """Test Yahoo Finance fallback with multiple tickers."""
-    # Create a mock for yfinance Ticker
-    mock_ticker = Mock()
-    mock_history = Mock()
-    
-    # Configure the mock to return test data
-    mock_history.empty = False
-    mock_history.iloc = MagicMock()
-    mock_history.iloc.__getitem__.return_value = {'Close': 150.0, 'Volume': 1000}
-    
-    mock_ticker.history.return_value = mock_history
+    """Test Yahoo Finance fallback with multiple tickers in one request."""
+    tickers = ['AAPL', 'MSFT', 'GOOGL']
+    with patch('src.data.realtime.yf.download', return_value=_minute_bars(tickers, [150.0, 300.0, 120.0])) \
+            as mock_download:
+        generator = _fallback_to_yahoo(tickers)
+        results = [next(generator) for _ in tickers]
     
-    with patch('yfinance.Ticker', return_value=mock_ticker), \
-         patch('time.sleep', side_effect=StopIteration):  # Stop after processing tickers
-        
-        try:
-            generator = _fallback_to_yahoo(['AAPL', 'MSFT', 'GOOGL'])
-            
-            # Get the first ticker's data
-            result1 = next(generator)
-            assert result1['symbol'] == 'AAPL'
-            
-            # Get the second ticker's data
-            result2 = next(generator)
-            assert result2['symbol'] == 'MSFT'
-            
-            # Get the third ticker's data
-            result3 = next(generator)
-            assert result3['symbol'] == 'GOOGL'
-            
-        except StopIteration:
-            pass  # Expected to stop after processing all tickers
+    assert [(r.symbol, r.price) for r in results] == [('AAPL', 150.0), ('MSFT', 300.0), ('GOOGL', 120.0)]
+    mock_download.assert_called_once()
+    assert mock_download.call_args.args[0] == tickers
 
 
 def test_fallback_to_yahoo_empty_response():
@@ -140,4 +125,162 @@ def test_fallback_to_yahoo_exception_handling():
         generator = mock_fallback(['AAPL'])
         # Since there's an exception, the generator should not yield anything
         with pytest.raises(StopIteration):
-            next(generator) 
\ No newline at end of file
+            next(generator) 
+
+def _bar_message(symbol, close):
+    """An Alpaca websocket message holding one 1-minute bar."""
+    return json.dumps([{'T': 'b', 'S': symbol, 't': 1700000000000000000, 'c': close, 'v': 100}])
+
+
+def test_process_message_bars():
+    """Test a bar message is parsed and other messages are ignored."""
+    bars = _process_message(_bar_message('AAPL', 150.0))
+    
+    assert bars == [Bar(1700000000000000000, 'AAPL', 150.0, 100)]
+    assert _process_message(json.dumps([{'T': 'success', 'msg': 'authenticated'}])) == []
+    assert _process_message('not json') == []
+
+
+class FakeWebSocket:
+    """Stands in for an aiohttp websocket that receives the given text messages."""
+    
+    def __init__(self, messages):
+        self.messages = messages
+        self.sent = []
+        self.received = 0
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        return False
+    
+    async def send_json(self, data, dumps=json.dumps):
+        self.sent.append(json.loads(dumps(data)))
+    
+    async def _receive(self):
+        for message in self.messages:
+            self.received += 1
+            yield SimpleNamespace(type=aiohttp.WSMsgType.TEXT, data=message)
+    
+    def __aiter__(self):
+        return self._receive()
+
+
+def test_connect_alpaca_websocket_yields_bars(mock_env_api_keys):
+    """Test bars are yielded as messages arrive, after authenticating and subscribing."""
+    ws = FakeWebSocket([json.dumps([{'T': 'success', 'msg': 'authenticated'}]),
+                        _bar_message('AAPL', 150.0), _bar_message('MSFT', 300.0)])
+    session = MagicMock()
+    session.__aenter__.return_value = session
+    session.ws_connect.return_value = ws
+    
+    with patch('src.data.realtime.aiohttp.ClientSession', return_value=session):
+        stream = connect_alpaca_websocket(['AAPL', 'MSFT'], retries=0)
+        bars = [next(stream), next(stream)]
+        stream.close()
+    
+    assert [(bar.symbol, bar.price) for bar in bars] == [('AAPL', 150.0), ('MSFT', 300.0)]
+    assert ws.sent[0] == {'action': 'auth', 'key': 'test_key', 'secret': 'test_secret'}
+    assert ws.sent[1] == {'action': 'subscribe', 'bars': ['AAPL', 'MSFT']}
+
+
+def test_connect_alpaca_websocket_reads_ahead(mock_env_api_keys):
+    """Test the websocket keeps being read while the caller holds on to a bar."""
+    ws = FakeWebSocket([_bar_message('AAPL', price) for price in [150.0, 151.0, 152.0]])
+    session = MagicMock()
+    session.__aenter__.return_value = session
+    session.ws_connect.return_value = ws
+    
+    with patch('src.data.realtime.aiohttp.ClientSession', return_value=session):
+        stream = connect_alpaca_websocket(['AAPL'], retries=0)
+        next(stream)
+        deadline = time.monotonic() + 5
+        while ws.received < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        bars = [next(stream), next(stream)]
+        stream.close()
+    
+    assert ws.received == 3
+    assert [bar.price for bar in bars] == [151.0, 152.0]
+
+
+def test_connect_alpaca_websocket_batches(mock_env_api_keys):
+    """Test the bars of one message are yielded together as a batch."""
+    message = json.dumps([{'T': 'b', 'S': symbol, 't': 1700000000000000000, 'c': close, 'v': 100}
+                          for symbol, close in [('AAPL', 150.0), ('MSFT', 300.0)]])
+    session = MagicMock()
+    session.__aenter__.return_value = session
+    session.ws_connect.return_value = FakeWebSocket([message])
+    
+    async def first_batch():
+        stream = connect_alpaca_websocket_batches_async(['AAPL', 'MSFT'], retries=0)
+        batch = await stream.__anext__()
+        await stream.aclose()
+        return batch
+    
+    with patch('src.data.realtime.aiohttp.ClientSession', return_value=session):
+        batch = asyncio.run(first_batch())
+    
+    assert [bar.symbol for bar in batch] == ['AAPL', 'MSFT']
+    assert [bar.ts for bar in batch] == [datetime.fromtimestamp(1700000000)] * 2
+
+
+def test_connect_alpaca_websocket_raw_timestamps(mock_env_api_keys):
+    """Test as_datetime=False leaves Alpaca's nanosecond timestamps unconverted."""
+    session = MagicMock()
+    session.__aenter__.return_value = session
+    session.ws_connect.return_value = FakeWebSocket([_bar_message('AAPL', 150.0)])
+    
+    with patch('src.data.realtime.aiohttp.ClientSession', return_value=session):
+        stream = connect_alpaca_websocket(['AAPL'], retries=0, as_datetime=False)
+        bar = next(stream)
+        stream.close()
+    
+    assert bar.ts == 1700000000000000000
+
+
+def test_connect_alpaca_websocket_without_credentials_uses_yahoo():
+    """Test the stream falls back to Yahoo Finance when there are no Alpaca keys."""
+    with patch.dict(os.environ, {}, clear=True), \
+         patch('src.data.realtime.yf.download', return_value=_minute_bars(['AAPL'], [150.0])):
+        stream = connect_alpaca_websocket(['AAPL'])
+        bar = next(stream)
+        stream.close()
+    
+    assert (bar.symbol, bar.price) == ('AAPL', 150.0)
+
+
+def test_shutdown_stops_waiting_stream():
+    """Test shutdown() ends a stream waiting for its next Yahoo Finance poll right away."""
+    with patch.dict(os.environ, {}, clear=True), \
+         patch('src.data.realtime.yf.download', return_value=_minute_bars(['AAPL'], [150.0])) as mock_download:
+        stream = connect_alpaca_websocket(['AAPL'])
+        next(stream)
+        start = time.monotonic()
+        shutdown()
+        assert list(stream) == []
+    
+    assert time.monotonic() - start < 5
+    mock_download.assert_called_once()
+    assert not realtime._stop_events
+
+
+
+def test_pump_drops_oldest_batches_when_consumer_lags():
+    """Test a full queue keeps the newest batches and always ends with None."""
+    async def stream():
+        for batch in (['b1'], ['b2'], ['b3']):
+            yield batch
+
+    batches = queue.Queue(maxsize=2)
+    asyncio.run(realtime._pump(stream(), batches))
+    
+    assert [batches.get_nowait() for _ in range(batches.qsize())] == [['b3'], None]
+
+def test_backoff_full_jitter():
+    """Test reconnect delays are drawn between zero and the capped exponential."""
+    with patch('src.data.realtime.random.uniform', side_effect=lambda low, high: (low, high)):
+        assert _backoff(0) == (0, 1.0)
+        assert _backoff(3) == (0, 8.0)
+        assert _backoff(10) == (0, BACKOFF_CAP)
@@ -2,7 +2,7 @@
 Tests for risk management and position sizing module.
 """
 import pytest
-from src.risk.position import RiskManager, position_size
+from src.risk.position import RiskManager, position_size, position_sizes
 
 def test_position_size_legacy():
     """Test legacy position_size function."""
@@ -47,6 +47,21 @@ class TestRiskManager:
         # Check position value cap
         assert position['dollar_amount'] <= 5000  # 5% of 100000
     
+    def test_calculate_position_sizes(self, risk_manager):
+        """Test batch sizing: the risk budget, the position-value cap and a zero ATR."""
+        positions = risk_manager.calculate_position_sizes(
+            ["AAPL", "F", "FLAT"], [150, 10, 50], [3, 0.05, 0])
+        
+        # $1,000 risk over a $6 stop is 166 shares, capped at $5,000 of AAPL
+        assert positions["AAPL"]['shares'] == 33
+        assert positions["AAPL"]['dollar_amount'] == 4950
+        # $1,000 risk over a $0.10 stop is 10,000 shares, capped at 500
+        assert positions["F"]['shares'] == 500
+        assert positions["F"]['risk_amount'] == pytest.approx(50)
+        assert positions["FLAT"]['shares'] == 0
+        assert positions["FLAT"]['risk_pct'] == 0
+        assert positions["AAPL"] == risk_manager.calculate_position_size("AAPL", 150, 3)
+    
     def test_calculate_take_profit(self, risk_manager):
         """Test take profit calculation."""
         entry_price = 100
@@ -147,3 +162,23 @@ class TestRiskManager:
         # Price moves down, stop should not change
         new_stop = risk_manager.calculate_trailing_stop("AAPL", 95, 2.0)
         assert new_stop == 90  # Stop should remain the same
+
+
+def test_position_sizes_matches_scalar():
+    """Test vectorized position sizing agrees with position_size."""
+    prices = [100, 50, 200, 10]
+    atrs = [2, 1, 4, 0]
+    
+    sizes = position_sizes(prices, atrs, account_size=10000, risk_pct=0.01)
+    
+    expected = [position_size(price=p, atr=a, account_size=10000, risk_pct=0.01)
+                for p, a in zip(prices, atrs)]
+    assert sizes.tolist() == pytest.approx(expected)
+    assert sizes[3] == 0  # Zero ATR yields no position
+
+
+def test_position_sizes_skips_invalid_atr():
+    """Test missing and negative ATRs size no position instead of a NaN or short one."""
+    sizes = position_sizes([100, 100, 100], [float('nan'), -2, 2], account_size=10000, risk_pct=0.01)
+    
+    assert sizes.tolist() == [0, 0, 2500]
@@ -4,20 +4,33 @@ Test file for Streamlit application functionality.
 import pytest
 import pandas as pd
 import numpy as np
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, ANY
 
 # Import from app/main.py
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app.main
+import src.data.yf_util as yf_util
 from app.main import (
     get_stocks_data,
     calculate_position_sizes,
     parse_custom_tickers,
     format_large_number,
-    get_stock_chart
+    format_large_number_vec,
+    _render_chart,
+    get_stock_charts,
+    get_histories,
+    _ticker_history,
+    top_stocks_table,
+    TOP_TABLE_COLUMNS
 )
 
+@pytest.fixture(autouse=True)
+def clear_ticker_cache(monkeypatch):
+    """Drop shared Ticker objects so each test sees its own mocks"""
+    monkeypatch.setattr(yf_util, '_tickers', {})
+
 def test_parse_custom_tickers():
     """Test parsing custom ticker inputs"""
     # Test comma separated
@@ -62,6 +75,12 @@ def test_format_large_number():
     assert format_large_number(None) == "N/A"
     assert format_large_number(np.nan) == "N/A"
 
+def test_format_large_number_vec_matches_scalar():
+    """Test the column formatter agrees with format_large_number"""
+    values = pd.Series([2_500_000_000, -1_500_000, 2_500, 25.5, np.nan, 0])
+    
+    assert format_large_number_vec(values) == [format_large_number(v) for v in values]
+
 @patch('app.main.get_f_score')
 def test_calculate_position_sizes(mock_get_f_score):
     """Test calculation of position sizes"""
@@ -94,8 +113,7 @@ def test_calculate_position_sizes(mock_get_f_score):
     assert positions['ZERO']['shares'] == 0
 
 @patch('app.main.yf.Ticker')
-@patch('app.main.plt')
-def test_get_stock_chart(mock_plt, mock_ticker):
+def test_render_chart(mock_ticker):
     """Test stock chart generation"""
     # Mock the ticker and history data
     mock_ticker_instance = MagicMock()
@@ -108,21 +126,204 @@ def test_get_stock_chart(mock_plt, mock_ticker):
     mock_ticker_instance.history.return_value = mock_hist
     mock_ticker.return_value = mock_ticker_instance
     
-    # Mock the plot and figure
-    mock_fig = MagicMock()
-    mock_plt.subplots.return_value = (mock_fig, MagicMock())
-    
     # Test the function
-    result = get_stock_chart('AAPL')
+    result = _render_chart('AAPL')
     
     # Verify ticker was called correctly
-    mock_ticker.assert_called_once_with('AAPL')
+    mock_ticker.assert_called_once_with('AAPL', session=ANY)
     mock_ticker_instance.history.assert_called_once_with(period='6mo')
     
-    # Verify result is a string (base64 encoded image)
-    assert isinstance(result, str)
+    # Verify result is raw PNG bytes
+    assert isinstance(result, bytes)
+    assert result.startswith(b'\x89PNG')
     
     # Test empty history
     mock_ticker_instance.history.return_value = pd.DataFrame()
-    result = get_stock_chart('EMPTY')
-    assert result is None 
\ No newline at end of file
+    result = _render_chart('EMPTY')
+    assert result is None 
+
+@patch('app.main.fetch_quotes', return_value={})
+@patch('app.main.yf.Ticker')
+@patch('app.main.get_f_score')
+@patch('app.main.get_sp500_tickers')
+def test_get_stocks_data_fetches_metrics(mock_sp500, mock_get_f_score, mock_ticker, mock_fetch_quotes):
+    """Test per-ticker metadata is merged onto the F-scores"""
+    mock_sp500.return_value = ['AAPL', 'MSFT', 'BAD']
+    mock_get_f_score.return_value = pd.DataFrame({
+        'score': [8, 9, 7],
+        'close': [100.0, 200.0, 50.0],
+        'atr': [2.0, 4.0, 1.0]
+    }, index=['AAPL', 'MSFT', 'BAD'])
+
+    def make_ticker(symbol, **kwargs):
+        if symbol == 'BAD':
+            raise ValueError("lookup failed")
+        ticker = MagicMock()
+        ticker.info = {'shortName': f"{symbol} Inc.", 'marketCap': 1_000_000}
+        return ticker
+    mock_ticker.side_effect = make_ticker
+
+    result = get_stocks_data(universe="SP500", min_f_score=5)
+
+    # Sorted by score with metrics aligned to each ticker
+    assert list(result.index) == ['MSFT', 'AAPL', 'BAD']
+    assert result.loc['AAPL', 'name'] == "AAPL Inc."
+    assert result.loc['MSFT', 'close'] == 200.0
+    # A failed lookup leaves the row in place without metadata
+    assert pd.isna(result.loc['BAD', 'name'])
+
+
+@patch('app.main.yf.download')
+def test_get_histories_single_request(mock_download):
+    """Test batched history download is sliced per ticker"""
+    index = pd.date_range('2023-01-01', periods=3)
+    columns = pd.MultiIndex.from_product([['AAPL', 'MSFT'], ['Close', 'Volume']])
+    mock_download.return_value = pd.DataFrame(
+        [[103, 10, 203, 20], [104, 11, 204, 21], [105, 12, 205, 22]],
+        index=index, columns=columns
+    )
+
+    histories = get_histories(('AAPL', 'MSFT'), period='6mo')
+
+    mock_download.assert_called_once()
+    assert list(mock_download.call_args[0][0]) == ['AAPL', 'MSFT']
+    assert list(_ticker_history(histories, 'MSFT')['Close']) == [203, 204, 205]
+    assert _ticker_history(histories, 'MISSING').empty
+
+
+@patch('app.main.yf.Ticker')
+def test_render_chart_with_history(mock_ticker):
+    """Test a pre-fetched history is plotted without a network request"""
+    hist = pd.DataFrame({
+        'Close': np.linspace(100, 110, 60)
+    }, index=pd.date_range('2023-01-01', periods=60))
+
+    result = _render_chart('PREFETCHED', hist=hist)
+
+    mock_ticker.assert_not_called()
+    assert isinstance(result, bytes)
+
+
+@patch('app.main.yf.Ticker')
+def test_ticker_objects_are_reused(mock_ticker):
+    """Test the dashboard shares Ticker objects through get_ticker"""
+    mock_ticker.return_value.info = {'shortName': 'Apple Inc.'}
+    assert app.main._fetch_info('AAPL')['name'] == 'Apple Inc.'
+    app.main._fetch_info('AAPL')
+    mock_ticker.assert_called_once_with('AAPL', session=app.main._yf_session)
+
+
+def test_chart_figure_is_reused():
+    """Test consecutive charts on one thread draw on the same figure"""
+    _render_chart('REUSE1', demo=True)
+    fig = app.main._chart_local.fig
+    _render_chart('REUSE2', demo=True)
+    assert app.main._chart_local.fig is fig
+    # Each render starts from a cleared axes
+    assert len(app.main._chart_local.ax.lines) == 1
+
+
+@patch('app.main.yf.download')
+@patch('app.main.yf.Ticker')
+def test_get_stock_charts_downloads_only_on_cache_miss(mock_ticker, mock_download):
+    """Test charts are drawn from one batched download, then replayed from the cache"""
+    dates = pd.date_range('2024-01-01', periods=5)
+    mock_download.return_value = pd.concat({
+        'AAA': pd.DataFrame({'Close': [1.0, 2.0, 3.0, 4.0, 5.0]}, index=dates),
+        'BBB': pd.DataFrame({'Close': [np.nan] * 5}, index=dates),
+    }, axis=1)
+    get_stock_charts.clear()
+    get_histories.clear()
+
+    charts = get_stock_charts(('AAA', 'BBB'), date_bucket='2024-01-05')
+    assert get_stock_charts(('AAA', 'BBB'), date_bucket='2024-01-05') == charts
+
+    assert list(charts) == ['AAA', 'BBB']
+    assert charts['AAA'].startswith(b'\x89PNG')
+    assert charts['BBB'] is None
+    mock_download.assert_called_once()
+    mock_ticker.assert_not_called()
+    get_stock_charts.clear()
+
+@patch('app.main.fetch_quotes', return_value={})
+@patch('app.main.yf.Ticker')
+@patch('app.main.get_f_score')
+@patch('app.main.get_nasdaq_tickers')
+def test_get_stocks_data_filter_change_reuses_fetches(mock_nasdaq, mock_get_f_score, mock_ticker, mock_fetch_quotes):
+    """Test changing filters does not recompute scores or refetch metadata"""
+    mock_nasdaq.return_value = ['AAPL', 'MSFT']
+    mock_get_f_score.return_value = pd.DataFrame({
+        'score': [8, 9],
+        'close': [100.0, 200.0],
+        'atr': [2.0, 4.0]
+    }, index=['AAPL', 'MSFT'])
+    mock_ticker.return_value.info = {'shortName': 'Test Co.'}
+
+    get_stocks_data(universe="NASDAQ", min_price=50)
+    result = get_stocks_data(universe="NASDAQ", min_price=150)
+
+    assert list(result.index) == ['MSFT']
+    assert mock_get_f_score.call_count == 1
+    assert mock_ticker.call_count == 2
+
+
+@patch('app.main.get_universe_tickers')
+def test_universe_tickers_cached_unless_empty(mock_get_universe):
+    """Test index membership is cached, but failed lookups are retried"""
+    mock_get_universe.return_value = []
+    assert app.main._universe_tickers("RUSSELL2000") == ()
+
+    mock_get_universe.return_value = ['IWM1', 'IWM2']
+    assert app.main._universe_tickers("RUSSELL2000") == ('IWM1', 'IWM2')
+    assert app.main._universe_tickers("RUSSELL2000") == ('IWM1', 'IWM2')
+    assert mock_get_universe.call_count == 2
+
+
+@patch('app.main.yf.Ticker')
+@patch('app.main.get_f_score')
+@patch('app.main.get_universe_tickers')
+def test_get_stocks_data_uses_bulk_quotes(mock_get_universe, mock_get_f_score, mock_ticker):
+    """Test batch quotes are used first with per-ticker info as a fallback"""
+    mock_get_universe.return_value = ['AAPL', 'MSFT']
+    mock_get_f_score.return_value = pd.DataFrame({
+        'score': [8, 9],
+        'close': [100.0, 200.0],
+        'atr': [2.0, 4.0]
+    }, index=['AAPL', 'MSFT'])
+    mock_ticker.return_value.info = {'shortName': 'Fallback Co.'}
+
+    quotes = {'AAPL': {'symbol': 'AAPL', 'shortName': 'Apple Inc.', 'marketCap': 3_000_000}}
+    with patch('app.main.fetch_quotes', return_value=quotes) as mock_fetch_quotes:
+        result = get_stocks_data(universe="ALL")
+
+    mock_fetch_quotes.assert_called_once()
+    assert sorted(mock_fetch_quotes.call_args.args[0]) == ['AAPL', 'MSFT']
+    assert mock_fetch_quotes.call_args.args[1] == app.main.QUOTE_FIELDS
+    assert mock_fetch_quotes.call_args.kwargs == {'session': app.main._yf_session}
+    assert result.loc['AAPL', 'name'] == 'Apple Inc.'
+    assert result.loc['AAPL', 'market_cap'] == 3_000_000
+    # MSFT was missing from the batch response, so it used Ticker.info
+    mock_ticker.assert_called_once_with('MSFT', session=ANY)
+    assert result.loc['MSFT', 'name'] == 'Fallback Co.'
+
+
+def test_top_stocks_table():
+    """Test the top-stocks table merges positions and formats values"""
+    stocks_df = pd.DataFrame({
+        'score': [8, 7],
+        'close': [100.0, 50.0],
+        'atr': [2.0, 1.0],
+        'market_cap': [2_500_000_000, np.nan]
+    }, index=['AAPL', 'MSFT'])
+    positions = calculate_position_sizes(stocks_df, 10000, 0.01)
+
+    table = top_stocks_table(stocks_df, positions)
+    data = table.data
+
+    assert list(data.columns) == list(TOP_TABLE_COLUMNS.values())
+    assert data.loc['AAPL', 'Shares'] == 25
+    html = table.to_html()
+    assert "$2.50B" in html
+    assert "8/9" in html
+    # Columns missing from the input render as N/A
+    assert "N/A" in html
@@ -4,7 +4,8 @@ Tests for technical indicators module.
 import pytest
 import pandas as pd
 import numpy as np
-from src.technical.core import sma, rsi, atr
+from unittest.mock import patch
+from src.technical.core import sma, rolling_mean, rsi, atr, get_smas
 
 
 def test_sma_matches_pandas_rolling():
@@ -22,6 +23,19 @@ def test_sma_matches_pandas_rolling():
     pd.testing.assert_series_equal(sma_result, pandas_result)
 
 
+def test_rolling_mean_matches_pandas_rolling():
+    """Test that the NumPy moving average matches pandas, including NaN gaps."""
+    data = pd.Series([10, 11, np.nan, 13, 14, 15, 16, 17, 18, 19, 20], dtype=float)
+    
+    result = rolling_mean(data.to_numpy(), window=3)
+    expected = data.rolling(window=3).mean().to_numpy()
+    
+    np.testing.assert_allclose(result, expected)
+    
+    # Shorter than the window yields all NaN
+    assert np.isnan(rolling_mean([1.0, 2.0], window=5)).all()
+
+
 def test_rsi_range_is_0_100():
     """Test that RSI values are always between 0 and 100."""
     # Create test data with both up and down movements
@@ -49,6 +63,19 @@ def test_atr_nonnegative():
     assert (atr_result >= 0).all()
 
 
+def test_atr_matches_row_wise_max():
+    """Test ATR against the true range taken as a row-wise DataFrame max."""
+    high = pd.Series([11.0, 12.5, 12.0, 14.0, 15.5, 15.0])
+    low = pd.Series([9.0, 10.0, 10.5, 12.0, 13.0, 13.5])
+    close = pd.Series([10.0, 12.0, 11.0, 13.5, 14.0, 14.5])
+    
+    previous_close = close.shift(1)
+    tr = pd.concat([high - low, (high - previous_close).abs(), (low - previous_close).abs()], axis=1).max(axis=1)
+    expected = tr.rolling(window=3).mean().dropna()
+    
+    pd.testing.assert_series_equal(atr(high, low, close, window=3), expected)
+
+
 def test_invalid_window_raises():
     """Test that invalid window sizes raise ValueError."""
     data = pd.Series([10, 11, 12, 13, 14])
@@ -60,10 +87,31 @@ def test_invalid_window_raises():
     with pytest.raises(ValueError):
         sma(data, window=0)
     
+    # Test rolling mean with invalid window
+    with pytest.raises(ValueError):
+        rolling_mean(data.to_numpy(), window=0)
+    
     # Test RSI with invalid window
     with pytest.raises(ValueError):
         rsi(data, window=0)
     
     # Test ATR with invalid window
     with pytest.raises(ValueError):
-        atr(high, low, close, window=0) 
\ No newline at end of file
+        atr(high, low, close, window=0) 
+
+
+def test_get_smas_matches_rolling_from_one_download():
+    """Test every SMA comes from one download and matches the last pandas rolling mean."""
+    rng = np.random.default_rng(0)
+    closes = pd.DataFrame(rng.uniform(50, 150, size=(250, 2)), columns=['AAA', 'BBB'])
+    closes.iloc[-30, 1] = np.nan  # A missing close leaves BBB without a full window
+    prices = pd.concat({'Close': closes}, axis=1)
+    
+    with patch('src.technical.core.yf.download', return_value=prices) as mock_download:
+        result = get_smas(['AAA', 'BBB'], (200, 50))
+    
+    mock_download.assert_called_once()
+    pd.testing.assert_series_equal(result['close'], closes.iloc[-1], check_names=False)
+    for window in (200, 50):
+        expected = closes.rolling(window).mean().iloc[-1]
+        pd.testing.assert_series_equal(result[f'sma_{window}'], expected, check_names=False)
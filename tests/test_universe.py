@@ -5,6 +5,7 @@ import pytest
 from unittest.mock import patch, MagicMock
 import pandas as pd
 
+import src.utils.universe
 from src.utils.universe import (
     get_sp500_tickers,
     get_nasdaq_tickers,
@@ -12,6 +13,11 @@ from src.utils.universe import (
     get_batch_tickers
 )
 
+@pytest.fixture(autouse=True)
+def clear_universe_cache():
+    """Forget memoized universes so each test sees its own mocks"""
+    src.utils.universe._cached_universe_tickers.cache_clear()
+
 @patch('src.utils.universe.pd.read_html')
 def test_get_sp500_tickers(mock_read_html):
     """Test fetching S&P 500 tickers."""
@@ -96,6 +102,34 @@ def test_get_universe_tickers(mock_russell, mock_nasdaq, mock_sp500):
     default_tickers = get_universe_tickers("INVALID")
     assert default_tickers == ['AAPL', 'MSFT', 'JNJ']
 
+@patch('src.utils.universe.get_sp500_tickers')
+def test_get_universe_tickers_memoized(mock_sp500):
+    """Test universes are fetched once, but failed lookups are retried."""
+    mock_sp500.return_value = []
+    assert get_universe_tickers("SP500") == []
+    
+    mock_sp500.return_value = ['AAPL', 'MSFT']
+    assert get_universe_tickers("SP500") == ['AAPL', 'MSFT']
+    
+    # Served from the cache, and callers get their own copy
+    tickers = get_universe_tickers("SP500")
+    tickers.append('GOOG')
+    assert get_universe_tickers("SP500") == ['AAPL', 'MSFT']
+    assert mock_sp500.call_count == 2
+
+@patch('src.utils.universe.get_sp500_tickers', return_value=['AAPL', 'JNJ'])
+@patch('src.utils.universe.get_nasdaq_tickers', return_value=['AAPL', 'GOOG'])
+@patch('src.utils.universe.get_russell2000_tickers')
+def test_get_universe_tickers_all_retries_failed_index(mock_russell, mock_nasdaq, mock_sp500):
+    """Test a partial ALL universe is not memoized when one index fails."""
+    mock_russell.return_value = []
+    assert set(get_universe_tickers("ALL")) == {'AAPL', 'JNJ', 'GOOG'}
+    
+    mock_russell.return_value = ['XYZ']
+    assert set(get_universe_tickers("ALL")) == {'AAPL', 'JNJ', 'GOOG', 'XYZ'}
+    assert mock_sp500.call_count == 1
+    assert mock_russell.call_count == 2
+
 def test_get_batch_tickers():
     """Test batching tickers."""
     # Create a list of tickers
@@ -0,0 +1,280 @@
+"""
+Tests for the Buffett value screener.
+"""
+import time
+import pytest
+import pandas as pd
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import run_value_screener
+from run_value_screener import (find_value_stocks, fetch_last_closes, fetch_raw_metrics, get_value_metrics,
+                                score_dataframe, generate_value_memo, io_time, reset_stats, RAW_METRIC_COLUMNS,
+                                _STATS)
+
+@pytest.fixture(autouse=True)
+def results_file(tmp_path, monkeypatch):
+    """Stream screener results to a temporary Parquet file"""
+    path = tmp_path / 'cache' / 'screener_raw.parquet'
+    monkeypatch.setattr(run_value_screener, 'RAW_RESULTS_FILE', str(path))
+    return path
+
+def _raw(ticker, price, roe=0.18, pe_ratio=12.0, **overrides):
+    raw = {
+        'ticker': ticker,
+        'name': f"{ticker} Corp",
+        'price': price,
+        'market_cap': 50_000_000_000,
+        'sector': 'Financial Services',
+        'industry': 'Insurance',
+        'pe_ratio': pe_ratio,
+        'pb_ratio': 1.5,
+        'debt_to_equity': 0.4,
+        'current_ratio': 1.6,
+        'roe': roe,
+        'roa': 0.08,
+        'gross_margin': 0.45,
+        'operating_margin': 0.22,
+        'profit_margin': 0.16,
+        'free_cash_flow_yield': 6.0,
+        'revenue_growth': 0.08
+    }
+    raw.update(overrides)
+    return raw
+
+@patch('run_value_screener.generate_value_memo', return_value="memo")
+@patch('run_value_screener.fetch_raw_metrics')
+@patch('run_value_screener.fetch_last_closes', return_value={})
+@patch('run_value_screener.get_universe_tickers', return_value=['AAA', 'BBB', 'CCC', 'DDD'])
+def test_find_value_stocks_filters_concurrent_results(mock_universe, mock_closes, mock_metrics, mock_memo):
+    """Test every ticker is fetched and only matching stocks reach the memo"""
+    prices = {'AAA': 100.0, 'BBB': 150.0, 'CCC': 150.0}
+    roes = {'AAA': 0.09, 'BBB': 0.01, 'CCC': 0.25}
+    # A missing ratio and a non-numeric one are stored as NaN
+    mock_metrics.side_effect = lambda t, **kwargs: None if t == 'DDD' else _raw(
+        t, prices[t], roe=roes[t], roa=None, pb_ratio='Infinity' if t == 'AAA' else 'n/a',
+        debt_to_equity=2.0 if t == 'BBB' else 0.4)
+
+    result = find_value_stocks(max_price=200, min_buffett_score=70)
+
+    assert result == "memo"
+    # Closes are only fetched for the stocks whose info has no price
+    mock_closes.assert_not_called()
+    assert mock_metrics.call_args.kwargs == {'min_price': None, 'max_price': 200, 'min_score': 70}
+    assert sorted(call.args[0] for call in mock_metrics.call_args_list) == ['AAA', 'BBB', 'CCC', 'DDD']
+    top_stocks = mock_memo.call_args.args[0]
+    assert list(top_stocks['ticker']) == ['CCC', 'AAA']
+    assert list(top_stocks['roa']) == [0, 0]
+    assert list(top_stocks['pb_ratio'].isna()) == [True, False]
+    assert top_stocks['ticker'].dtype == "string[pyarrow]"
+
+@patch('run_value_screener.generate_value_memo', return_value="memo")
+@patch('run_value_screener.fetch_raw_metrics')
+@patch('run_value_screener.get_universe_tickers', return_value=['AAA', 'BAD', 'CCC'])
+def test_find_value_stocks_skips_ticker_that_raises(mock_universe, mock_metrics, mock_memo):
+    """Test an error computing one stock's metrics is counted, not fatal to the screen"""
+    def metrics(t, **kwargs):
+        if t == 'BAD':
+            raise TypeError("unsupported operand type(s) for /: 'str' and 'float'")
+        return _raw(t, 100.0, roe=0.25)
+    mock_metrics.side_effect = metrics
+
+    result = find_value_stocks(max_price=200, min_buffett_score=70)
+
+    assert result == "memo"
+    assert list(mock_memo.call_args.args[0]['ticker']) == ['AAA', 'CCC']
+    assert _STATS['failed'] == 1
+
+@patch('run_value_screener.WRITE_BATCH_SIZE', 2)
+@patch('run_value_screener.generate_value_memo', return_value="memo")
+@patch('run_value_screener.fetch_raw_metrics', side_effect=lambda t, **kwargs: _raw(t, 100.0, roe=0.025 * (ord(t) - 64)))
+@patch('run_value_screener.fetch_last_closes', return_value={})
+@patch('run_value_screener.get_universe_tickers', return_value=['A', 'B', 'C', 'D', 'E'])
+def test_find_value_stocks_streams_batches(mock_universe, mock_closes, mock_metrics, mock_memo, results_file):
+    """Test every batch is scored into the results file and read back by score"""
+    assert find_value_stocks(min_buffett_score=None, max_stocks=3) == "memo"
+
+    written = pd.read_parquet(results_file)
+    assert list(written['ticker']) == ['A', 'B', 'C', 'D', 'E']
+    assert list(written.columns) == RAW_METRIC_COLUMNS + run_value_screener.SCORE_COLUMNS
+    top_stocks = mock_memo.call_args.args[0]
+    assert list(top_stocks['ticker'])[:2] == ['E', 'D']
+    assert top_stocks['buffett_score'].is_monotonic_decreasing
+
+@patch('run_value_screener.fetch_raw_metrics', side_effect=lambda t, **kwargs: _raw(t, 100.0))
+@patch('run_value_screener.fetch_last_closes', return_value={})
+@patch('run_value_screener.get_universe_tickers', return_value=['AAA'])
+def test_find_value_stocks_memo_prints_integer_scores(mock_universe, mock_closes, mock_metrics):
+    """Test component scores read back from the results file print as whole points"""
+    memo = find_value_stocks(min_buffett_score=None)
+
+    assert ("- Financial Strength: 21/25\n- Profitability: 20/25\n"
+            "- Moat/Competitive Advantage: 22/25\n- Valuation: 18/25\n") in memo
+
+@patch('run_value_screener.fetch_raw_metrics', return_value=None)
+@patch('run_value_screener.fetch_last_closes', return_value={})
+@patch('run_value_screener.get_universe_tickers', return_value=['AAA'])
+def test_find_value_stocks_no_results(mock_universe, mock_closes, mock_metrics):
+    """Test the message returned when nothing matches"""
+    assert find_value_stocks() == "No value stocks found matching your criteria."
+
+def test_io_time_accumulates_across_threads():
+    """Test time in io_time blocks is summed, including from several threads"""
+    def wait(_):
+        with io_time():
+            time.sleep(0.01)
+
+    reset_stats()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(wait, range(4)))
+    assert _STATS['io_s'] >= 0.04
+    assert _STATS['compute_s'] == 0.0
+
+@patch('run_value_screener.fetch_raw_metrics', return_value=None)
+@patch('run_value_screener.fetch_last_closes', return_value={})
+@patch('run_value_screener.get_universe_tickers', return_value=['AAA'])
+def test_find_value_stocks_reports_time_split(mock_universe, mock_closes, mock_metrics, capsys):
+    """Test the run ends with the time spent in requests vs scoring"""
+    find_value_stocks()
+    assert "in requests" in capsys.readouterr().out.splitlines()[-1]
+
+@patch('run_value_screener.yf.download')
+def test_fetch_last_closes(mock_download):
+    """Test the latest close of each stock is taken from one batched download"""
+    closes = pd.DataFrame({'AAA': [10.0, 12.0], 'BBB': [30.0, None], 'CCC': [None, None]},
+                          index=pd.date_range('2024-01-01', periods=2))
+    mock_download.return_value = pd.concat({'Close': closes}, axis=1)
+
+    assert fetch_last_closes(['AAA', 'BBB', 'CCC']) == {'AAA': 12.0, 'BBB': 30.0}
+    mock_download.side_effect = ValueError("rate limited")
+    assert fetch_last_closes(['AAA']) == {}
+
+@patch('run_value_screener.cached_statements', return_value={'balance_sheet': None, 'income_stmt': None,
+                                                            'cashflow': None})
+@patch('run_value_screener.cached_info', return_value={'shortName': 'Triple A', 'marketCap': 2e9, 'sector': None})
+def test_get_value_metrics_price_from_lookup(mock_info, mock_statements):
+    """Test a missing price in the info dict comes from the price lookup"""
+    metrics = get_value_metrics('AAA', price_lookup={'AAA': 42.0})
+    assert list(fetch_raw_metrics('AAA', price_lookup={'AAA': 42.0})) == RAW_METRIC_COLUMNS
+
+    assert metrics['name'] == 'Triple A'
+    assert metrics['sector'] == 'Unknown'
+    assert metrics['price'] == pytest.approx(42.0)
+
+@patch('run_value_screener.fetch_last_closes', return_value={'AAA': 42.0})
+@patch('run_value_screener.cached_statements', return_value={'balance_sheet': None, 'income_stmt': None,
+                                                            'cashflow': None})
+@patch('run_value_screener.cached_info')
+def test_fetch_raw_metrics_fetches_close_only_without_price(mock_info, mock_statements, mock_closes):
+    """Test a close is downloaded only for a stock whose info has no price"""
+    mock_info.return_value = {'currentPrice': 10.0, 'marketCap': 5e9}
+    assert fetch_raw_metrics('BBB')['price'] == pytest.approx(10.0)
+    mock_closes.assert_not_called()
+
+    mock_info.return_value = {'marketCap': 5e9}
+    assert fetch_raw_metrics('AAA')['price'] == pytest.approx(42.0)
+    mock_closes.assert_called_once_with(['AAA'])
+
+@patch('run_value_screener.cached_statements')
+@patch('run_value_screener.cached_info', side_effect=requests.ConnectionError("reset"))
+def test_fetch_raw_metrics_network_error(mock_info, mock_statements):
+    """Test a failed request skips the stock"""
+    assert fetch_raw_metrics('AAA', price_lookup={}) is None
+    mock_statements.assert_not_called()
+
+@patch('run_value_screener.cached_statements', side_effect=AttributeError("'NoneType' object has no attribute 'get'"))
+@patch('run_value_screener.cached_info', return_value={'currentPrice': 10.0, 'marketCap': 5e9})
+def test_fetch_raw_metrics_yfinance_error(mock_info, mock_statements):
+    """Test any error raised by yfinance while fetching skips the stock"""
+    assert fetch_raw_metrics('AAA', price_lookup={}) is None
+
+@patch('run_value_screener.cached_statements', return_value={'balance_sheet': None, 'income_stmt': None,
+                                                            'cashflow': pd.DataFrame({'x': [1.0]}, index=['Free Cash Flow'])})
+@patch('run_value_screener.cached_info', return_value={'marketCap': 'n/a', 'currentPrice': 10.0})
+def test_fetch_raw_metrics_calculation_error_propagates(mock_info, mock_statements):
+    """Test errors outside the network calls are not swallowed"""
+    with pytest.raises(TypeError):
+        fetch_raw_metrics('AAA', price_lookup={})
+
+@patch('run_value_screener.cached_statements')
+@patch('run_value_screener.cached_info', return_value={'currentPrice': 500.0, 'marketCap': 5e10})
+def test_fetch_raw_metrics_skips_statements_out_of_price_range(mock_info, mock_statements):
+    """Test a stock outside the price range is dropped before its statements are fetched"""
+    assert fetch_raw_metrics('AAA', price_lookup={}, max_price=200) is None
+    mock_statements.assert_not_called()
+
+@patch('run_value_screener.cached_statements')
+@patch('run_value_screener.cached_info', return_value={'currentPrice': 50.0, 'marketCap': 5e8, 'returnOnEquity': 0.01})
+def test_fetch_raw_metrics_skips_statements_below_score_ceiling(mock_info, mock_statements):
+    """Test a stock that can't reach the minimum score whatever its statements is dropped early"""
+    assert fetch_raw_metrics('AAA', price_lookup={}, min_score=70) is None
+    mock_statements.assert_not_called()
+
+@patch('run_value_screener.cached_statements', return_value={
+    'balance_sheet': pd.DataFrame({'x': [3.0, 2.0]}, index=['Total Current Assets', 'Total Current Liabilities']),
+    'income_stmt': None, 'cashflow': pd.DataFrame({'x': [4e9]}, index=['Free Cash Flow'])})
+@patch('run_value_screener.cached_info', return_value={'currentPrice': 150.0, 'marketCap': 5e10})
+def test_fetch_raw_metrics_within_filters(mock_info, mock_statements):
+    """Test the statement metrics are added for a stock passing the cheap checks"""
+    raw = fetch_raw_metrics('AAA', price_lookup={}, min_price=100, max_price=200, min_score=0)
+    assert raw['current_ratio'] == pytest.approx(1.5)
+    assert raw['free_cash_flow_yield'] == pytest.approx(8.0)
+
+@patch('run_value_screener.cached_statements', return_value={
+    'balance_sheet': pd.DataFrame(), 'income_stmt': None,
+    'cashflow': pd.DataFrame({'2024': [5e9, -1e9], '2023': [9e9, -9e9]},
+                             index=['Operating Cash Flow', 'Capital Expenditures'])})
+@patch('run_value_screener.cached_info', return_value={'currentPrice': 150.0, 'marketCap': 5e10})
+def test_fetch_raw_metrics_fcf_from_operating_cash_flow(mock_info, mock_statements):
+    """Test FCF falls back to the latest operating cash flow less capex"""
+    raw = fetch_raw_metrics('AAA', price_lookup={})
+    assert raw['current_ratio'] == 0
+    assert raw['free_cash_flow_yield'] == pytest.approx(8.0)
+
+def test_score_dataframe_ladders():
+    """Test the score components on and around the ladder thresholds"""
+    df = pd.DataFrame([
+        _raw('AAA', 100.0),
+        # Weak on every measure, with a missing P/B and a loss-making P/E
+        _raw('BBB', 10.0, roe=None, pe_ratio=-5.0, pb_ratio=None, debt_to_equity=2.0, current_ratio=0.5,
+             gross_margin=0.0, operating_margin=0.0, profit_margin=0.0, free_cash_flow_yield=0.0,
+             revenue_growth=0.0, market_cap=5e8, sector='Technology', industry='Widgets'),
+        # Exactly on the thresholds
+        _raw('CCC', 50.0, roe=0.20, pe_ratio=10.0, pb_ratio=1.0, debt_to_equity=0.3, current_ratio=2.0,
+             gross_margin=0.5, operating_margin=0.25, profit_margin=0.2, free_cash_flow_yield=7.0,
+             revenue_growth=0.1, market_cap=1e11)
+    ])
+
+    scored = score_dataframe(df)
+
+    # 8 + 4 + 5 + 4 | 8 + 8 + 4 | 4 + 4 + 4 + 5 + 5 | 8 + 4 + 6
+    assert list(scored['financial_strength_score']) == [21, 0, 24]
+    assert list(scored['profitability_score']) == [20, 0, 25]
+    assert list(scored['moat_score']) == [22, 1, 25]
+    assert list(scored['valuation_score']) == [18, 0, 23]
+    assert list(scored['buffett_score']) == [81, 1, 97]
+    assert scored.loc[0, 'roe'] == pytest.approx(18.0)
+    assert scored.loc[1, 'roe'] == 0
+
+def test_generate_value_memo():
+    """Test the memo lists each stock with its allocation and formatted metrics"""
+    stocks_df = score_dataframe(pd.DataFrame([
+        _raw('AAA', 100.0),
+        _raw('BBB', 40.0, pe_ratio=float('inf'), market_cap=5e8, free_cash_flow_yield=None)
+    ]))
+
+    memo = generate_value_memo(stocks_df, buying_power=10000)
+
+    assert "### 1. AAA - AAA Corp - Buffett Score: 81/100" in memo
+    assert "- Market Cap: $50.00B" in memo
+    assert "- Market Cap: $500.00M" in memo
+    assert "- P/E Ratio: 12.0" in memo
+    assert "- P/E Ratio: N/A" in memo
+    assert "- Free Cash Flow Yield: N/A" in memo
+    weight = 81 / stocks_df['buffett_score'].sum()
+    assert f"**Suggested Position:** {int(10000 * weight / 100.0)} shares" in memo
+    assert f"**Portfolio Allocation:** {weight * 100:.1f}% of capital" in memo
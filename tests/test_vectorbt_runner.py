@@ -0,0 +1,57 @@
+"""
+Tests for the vectorbt backtest runner's signal construction.
+"""
+import pytest
+import numpy as np
+import pandas as pd
+
+import src.backtest.vectorbt_runner as runner
+from src.backtest.vectorbt_runner import build_factor_df, build_factor_frames
+
+def _ohlc(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame({
+        'open': close,
+        'high': close + rng.uniform(0, 2, n),
+        'low': close - rng.uniform(0, 2, n),
+        'close': close,
+        'volume': 1_000_000.0,
+        'score': rng.integers(0, 10, n)
+    }, index=pd.bdate_range('2015-01-01', periods=n))
+
+def _expected(df, thr=7):
+    """The signals defined with pandas rolling windows and ffill"""
+    df = df.copy()
+    df['sma_200'] = df['close'].rolling(200).mean()
+    prev_close = df['close'].shift()
+    tr = np.fmax(np.fmax(df['high'] - df['low'], (df['high'] - prev_close).abs()), (df['low'] - prev_close).abs())
+    df['atr'] = tr.rolling(14).mean()
+    df['entry'] = (df['score'] >= thr) & (df['close'] > df['sma_200'])
+    df['exit_sma'] = df['close'] < df['sma_200']
+    df['entry_price'] = df['close'].where(df['entry']).ffill()
+    df['atr_stop'] = df['entry_price'] - 2 * df['atr']
+    df['exit_atr'] = df['close'] < df['atr_stop']
+    df['exit'] = df['exit_sma'] | df['exit_atr']
+    return df
+
+@pytest.mark.parametrize('numba_available', [True, False])
+@pytest.mark.parametrize('n', [10, 600])
+def test_build_factor_df_matches_pandas(monkeypatch, numba_available, n):
+    """Test the compiled and array signal paths against the pandas definitions"""
+    monkeypatch.setattr(runner, 'NUMBA_AVAILABLE', numba_available and runner.NUMBA_AVAILABLE)
+    df = _ohlc(n)
+
+    pd.testing.assert_frame_equal(build_factor_df(df), _expected(df), check_dtype=False, rtol=1e-9)
+
+def test_build_factor_frames_aligns_symbols():
+    """Test the wide frames have one column per symbol on the union of dates"""
+    long, short = _ohlc(300, seed=1), _ohlc(250, seed=2)
+    short.index = long.index[-250:]
+
+    close, entries, exits = build_factor_frames({'AAA': long, 'BBB': short})
+
+    assert list(close.columns) == ['AAA', 'BBB']
+    assert close['BBB'].isna().sum() == 50
+    assert entries.dtypes.eq(bool).all() and exits.dtypes.eq(bool).all()
+    assert entries['BBB'].equals(build_factor_df(short)['entry'].reindex(long.index, fill_value=False))
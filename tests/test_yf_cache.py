@@ -0,0 +1,93 @@
+"""
+Tests for the persistent Yahoo Finance cache.
+"""
+import pytest
+from unittest.mock import patch, PropertyMock
+import pandas as pd
+
+import src.utils.yf_cache as yf_cache
+import src.data.yf_util as yf_util
+from src.utils.yf_cache import cached_info, cached_infos, cached_statements, cached_histories, history_slice
+
+@pytest.fixture(autouse=True)
+def cache_file(tmp_path, monkeypatch):
+    """Point the cache at a temporary database, with no shared Ticker objects"""
+    monkeypatch.setattr(yf_cache, 'CACHE_FILE', str(tmp_path / 'yf_cache.sqlite'))
+    monkeypatch.setattr(yf_util, '_tickers', {})
+
+def _history(close):
+    return pd.DataFrame({
+        'Open': close,
+        'High': close,
+        'Low': close,
+        'Close': close,
+        'Volume': close
+    }, index=pd.date_range('2024-01-01', periods=len(close)))
+
+@patch('src.utils.yf_cache.yf.Ticker')
+def test_cached_info_reads_from_disk(mock_ticker):
+    """Test the info dict is only requested once while fresh"""
+    mock_ticker.return_value.info = {'shortName': 'Apple Inc.', 'currentPrice': 150.0}
+
+    assert cached_info('AAPL') == {'shortName': 'Apple Inc.', 'currentPrice': 150.0}
+    assert cached_info('AAPL') == {'shortName': 'Apple Inc.', 'currentPrice': 150.0}
+    mock_ticker.assert_called_once_with('AAPL', session=None)
+
+    # A zero TTL treats the cached entry as stale
+    cached_info('AAPL', ttl=0)
+    assert mock_ticker.call_count == 2
+
+@patch('src.utils.yf_cache.yf.Ticker')
+def test_cached_statements_reads_from_disk(mock_ticker):
+    """Test statements are fetched once while fresh and failures are not cached"""
+    balance_sheet = PropertyMock(return_value=pd.DataFrame({'2023': [1.0]}, index=['Total Current Assets']))
+    income_stmt = PropertyMock(return_value=pd.DataFrame())
+    cashflow = PropertyMock(side_effect=ValueError("no data"))
+    stock_type = type(mock_ticker.return_value)
+    stock_type.balance_sheet, stock_type.income_stmt, stock_type.cashflow = balance_sheet, income_stmt, cashflow
+
+    first = cached_statements('AAPL')
+    second = cached_statements('AAPL')
+
+    assert first['balance_sheet'].loc['Total Current Assets', '2023'] == 1.0
+    assert first['income_stmt'].empty
+    assert first['cashflow'] is None
+    assert second['balance_sheet'].equals(first['balance_sheet'])
+    # The empty and failed statements are requested again, from the same Ticker; the balance sheet is not
+    assert (balance_sheet.call_count, income_stmt.call_count, cashflow.call_count) == (1, 2, 2)
+    assert mock_ticker.call_count == 1
+
+@patch('src.utils.yf_cache.fetch_quote_summary')
+def test_cached_infos_fetches_only_missing(mock_fetch):
+    """Test cached info dicts are reused and the rest fetched via quoteSummary"""
+    mock_fetch.return_value = {'AAPL': {'shortName': 'Apple Inc.'}}
+    assert cached_infos(['AAPL', 'NONE']) == {'AAPL': {'shortName': 'Apple Inc.'}}
+
+    mock_fetch.return_value = {}
+    assert cached_infos(['AAPL', 'NONE']) == {'AAPL': {'shortName': 'Apple Inc.'}}
+    assert mock_fetch.call_args.args[0] == ['NONE']
+    # Shares entries with cached_info
+    assert cached_info('AAPL') == {'shortName': 'Apple Inc.'}
+
+@patch('src.utils.yf_cache.yf.download')
+def test_cached_histories_downloads_only_missing(mock_download):
+    """Test cached tickers are served from disk and the rest batched"""
+    mock_download.return_value = pd.concat({'AAPL': _history([1.0, 2.0]), 'MSFT': _history([3.0, 4.0])}, axis=1)
+    first = cached_histories(['AAPL', 'MSFT'])
+
+    mock_download.return_value = pd.concat({'GOOG': _history([5.0, 6.0]), 'NONE': _history([None, None])}, axis=1)
+    second = cached_histories(['AAPL', 'GOOG', 'NONE'])
+
+    assert list(first['MSFT']['Close']) == [3.0, 4.0]
+    assert list(second['AAPL']['Close']) == [1.0, 2.0]
+    assert list(second['GOOG']['Close']) == [5.0, 6.0]
+    assert second['NONE'].empty
+    assert mock_download.call_args_list[1].args[0] == ['GOOG', 'NONE']
+
+def test_history_slice():
+    """Test slicing batched and single-ticker downloads"""
+    batched = pd.concat({'AAPL': _history([1.0, 2.0])}, axis=1)
+
+    assert list(history_slice(batched, 'AAPL')['Close']) == [1.0, 2.0]
+    assert history_slice(batched, 'MSFT').empty
+    assert list(history_slice(_history([1.0, 2.0]), 'AAPL')['Close']) == [1.0, 2.0]
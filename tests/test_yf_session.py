@@ -0,0 +1,14 @@
+"""
+Tests for the shared Yahoo Finance HTTP session.
+"""
+from src.utils.yf_session import SESSION, make_session
+
+def test_session_pools_and_retries():
+    """Test HTTPS requests go through a pooled adapter that retries rate limiting"""
+    adapter = make_session(pool_connections=4, pool_maxsize=8).get_adapter("https://query2.finance.yahoo.com")
+
+    assert adapter._pool_connections == 4
+    assert adapter._pool_maxsize == 8
+    assert adapter.max_retries.total == 3
+    assert 429 in adapter.max_retries.status_forcelist
+    assert SESSION.get_adapter("https://query2.finance.yahoo.com").max_retries.total == 3
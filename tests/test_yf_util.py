@@ -0,0 +1,46 @@
+"""
+Tests for the shared yfinance helpers.
+"""
+import pytest
+from unittest.mock import patch
+
+import src.data.yf_util as yf_util
+from src.data.yf_util import get_ticker
+
+@pytest.fixture(autouse=True)
+def no_shared_tickers(monkeypatch):
+    """Start each test without shared Ticker objects"""
+    monkeypatch.setattr(yf_util, '_tickers', {})
+
+@patch('src.data.yf_util.yf.Ticker')
+def test_get_ticker_reuses_objects(mock_ticker):
+    """Test Ticker objects are shared per symbol and session until too old"""
+    session = object()
+
+    assert get_ticker('aapl') is get_ticker('AAPL')
+    assert mock_ticker.call_count == 1
+    get_ticker('AAPL', session=session)
+    mock_ticker.assert_called_with('AAPL', session=session)
+    assert mock_ticker.call_count == 2
+
+    # A caller wanting fresher data gets a new Ticker
+    get_ticker('AAPL', max_age=0)
+    assert mock_ticker.call_count == 3
+
+    with patch('src.data.yf_util.time.monotonic', return_value=1e12):
+        get_ticker('AAPL')
+    assert mock_ticker.call_count == 4
+
+
+@patch('src.data.yf_util.MAX_TICKERS', 2)
+@patch('src.data.yf_util.yf.Ticker')
+def test_get_ticker_evicts_least_recently_used(mock_ticker):
+    """Test only the most recently used Ticker objects are kept"""
+    get_ticker('AAA')
+    get_ticker('BBB')
+    get_ticker('AAA')
+    get_ticker('CCC')
+
+    assert [symbol for symbol, _ in yf_util._tickers] == ['AAA', 'CCC']
+    get_ticker('AAA')
+    assert mock_ticker.call_count == 3